@@ -0,0 +1,214 @@
+"""
+Audio ingestion for the voice emotion paths
+PCM/float WAV files (what the app writes to temp/) are read without librosa:
+- The RIFF header is sniffed, the file memory-mapped and the samples viewed
+  with np.frombuffer - only the frames inside the duration cap are touched
+- Resampling happens only when the file is not already at the target rate,
+  through soxr (a librosa dependency) or scipy's polyphase filter
+Anything else (webm, mp3, 24-bit or compressed WAV) falls back to librosa.load.
+decode_audio does the same for audio received in memory (binary frames), plus
+headerless s16le/f32le PCM.
+Every load reports decode_ms so the saving is visible in the results.
+"""
+
+import io
+import sys
+import mmap
+import time
+import struct
+from math import gcd
+
+from lazy_imports import timed_import
+
+TARGET_SR = 16000
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (format tag, bits per sample) -> (numpy dtype, scale to [-1, 1], offset)
+_SAMPLE_LAYOUTS = {
+    (WAVE_FORMAT_PCM, 8): ("u1", 1.0 / 128.0, -128.0),
+    (WAVE_FORMAT_PCM, 16): ("<i2", 1.0 / 32768.0, 0.0),
+    (WAVE_FORMAT_PCM, 32): ("<i4", 1.0 / 2147483648.0, 0.0),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): ("<f4", 1.0, 0.0),
+    (WAVE_FORMAT_IEEE_FLOAT, 64): ("<f8", 1.0, 0.0),
+}
+
+# Headerless PCM accepted in binary frames -> WAV layout
+RAW_PCM_FORMATS = {
+    "s16le": (WAVE_FORMAT_PCM, 16),
+    "f32le": (WAVE_FORMAT_IEEE_FLOAT, 32),
+}
+
+
+def parse_wav_header(buffer):
+    """Parse a RIFF/WAVE header in a bytes-like buffer: dict with format, channels, sample_rate, bits, data offset/size - or None"""
+    size = len(buffer)
+    if size < 12 or bytes(buffer[:4]) != b"RIFF" or bytes(buffer[8:12]) != b"WAVE":
+        return None
+
+    try:
+        info = None
+        position = 12
+        while position + 8 <= size:
+            chunk_id, chunk_size = struct.unpack_from("<4sI", buffer, position)
+            position += 8
+
+            if chunk_id == b"fmt ":
+                format_tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", buffer, position)
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                    format_tag = struct.unpack_from("<H", buffer, position + 24)[0]  # first bytes of the sub-format GUID
+                info = {"format": format_tag, "channels": channels, "sample_rate": sample_rate, "bits": bits}
+            elif chunk_id == b"data":
+                if info is None:
+                    return None
+                info["data_offset"] = position
+                # Streaming writers leave 0 or 0xFFFFFFFF here - trust the buffer size instead
+                available = size - position
+                info["data_size"] = available if chunk_size in (0, 0xFFFFFFFF) else min(chunk_size, available)
+                return info
+            position += chunk_size + (chunk_size % 2)
+    except struct.error:
+        return None
+    return None
+
+
+def sniff_wav(path):
+    """parse_wav_header for a file on disk"""
+    try:
+        with open(path, "rb") as handle:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return parse_wav_header(mapped)
+    except (OSError, ValueError):
+        return None
+
+
+def resample(y, source_sr, target_sr):
+    """Band-limited resampling: soxr when available, else scipy's polyphase filter"""
+    np = timed_import("numpy")
+    if source_sr == target_sr or len(y) == 0:
+        return y
+    try:
+        soxr = timed_import("soxr")
+        return soxr.resample(y, source_sr, target_sr).astype(np.float32, copy=False)
+    except ImportError:
+        signal = timed_import("scipy.signal")
+        factor = gcd(int(source_sr), int(target_sr))
+        return signal.resample_poly(y, target_sr // factor, source_sr // factor).astype(np.float32, copy=False)
+
+
+def _wav_samples(buffer, info, duration):
+    """Mono float32 samples from the data chunk described by `info`"""
+    np = timed_import("numpy")
+    dtype, scale, offset = _SAMPLE_LAYOUTS[(info["format"], info["bits"])]
+    channels = max(1, info["channels"])
+    frame_bytes = np.dtype(dtype).itemsize * channels
+
+    frames = info["data_size"] // frame_bytes
+    if duration is not None:
+        frames = min(frames, int(duration * info["sample_rate"]))
+    if frames <= 0:
+        return np.zeros(0, dtype=np.float32)
+
+    samples = np.frombuffer(buffer, dtype=dtype, count=frames * channels, offset=info["data_offset"])
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    # The float32 conversion is the only copy - a memory map can be closed right after
+    y = samples.astype(np.float32)
+    del samples
+
+    if offset:
+        y += offset
+    if scale != 1.0:
+        y *= scale
+    return y
+
+
+def _finish(y, source_sr, sr, decoder, start_time, resample_here=True):
+    """(y, sr, info) - librosa already resamples while decoding, so it passes resample_here=False"""
+    resampled = source_sr is None or source_sr != sr
+    if resampled and resample_here:
+        y = resample(y, source_sr, sr)
+    decode_ms = (time.perf_counter() - start_time) * 1000.0
+    return y, sr, {
+        "decoder": decoder,
+        "source_sr": source_sr,
+        "resampled": resampled,
+        "decode_ms": round(decode_ms, 3)
+    }
+
+
+def load_audio(path, sr=TARGET_SR, duration=None):
+    """
+    Mono float32 samples at `sr`, like librosa.load(path, sr=sr, mono=True, duration=duration)
+    Returns (y, sr, info) where info has decoder, source_sr, resampled and decode_ms.
+    """
+    start_time = time.perf_counter()
+    info = None
+    try:
+        with open(path, "rb") as handle:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                info = parse_wav_header(mapped)
+                if info is not None and (info["format"], info["bits"]) in _SAMPLE_LAYOUTS:
+                    y = _wav_samples(mapped, info, duration)
+                    return _finish(y, info["sample_rate"], sr, "wav_mmap", start_time)
+    except ValueError:
+        pass  # empty file: cannot be mapped, let librosa report it
+
+    librosa = timed_import("librosa")
+    y, _ = librosa.load(path, sr=sr, mono=True, duration=duration)
+    return _finish(y, info["sample_rate"] if info else None, sr, "librosa", start_time, resample_here=False)
+
+
+def decode_audio(data, sr=TARGET_SR, duration=None, pcm_format=None, sample_rate=None, channels=1):
+    """
+    load_audio for audio already in memory (a binary frame body)
+    WAV bytes are parsed in place; raw s16le/f32le PCM needs `pcm_format` and
+    `sample_rate` (default: sr). Other containers go through librosa via BytesIO.
+    """
+    start_time = time.perf_counter()
+    info = parse_wav_header(data)
+    if info is not None and (info["format"], info["bits"]) in _SAMPLE_LAYOUTS:
+        return _finish(_wav_samples(data, info, duration), info["sample_rate"], sr, "wav_bytes", start_time)
+
+    if info is None and pcm_format in RAW_PCM_FORMATS:
+        format_tag, bits = RAW_PCM_FORMATS[pcm_format]
+        source_sr = int(sample_rate or sr)
+        raw = {"format": format_tag, "bits": bits, "channels": int(channels or 1), "sample_rate": source_sr,
+               "data_offset": 0, "data_size": len(data)}
+        return _finish(_wav_samples(data, raw, duration), source_sr, sr, "raw_pcm", start_time)
+
+    librosa = timed_import("librosa")
+    y, _ = librosa.load(io.BytesIO(bytes(data)), sr=sr, mono=True, duration=duration)
+    return _finish(y, info["sample_rate"] if info else None, sr, "librosa_bytes", start_time, resample_here=False)
+
+
+def main():
+    """Compare the fast path with librosa.load: python audio_io.py <file.wav> [duration]"""
+    if len(sys.argv) < 2:
+        print("Usage: python audio_io.py <audio_file> [duration_seconds]")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    np = timed_import("numpy")
+    librosa = timed_import("librosa")
+
+    y, sr, info = load_audio(path, duration=duration)
+    start_time = time.perf_counter()
+    reference, _ = librosa.load(path, sr=TARGET_SR, mono=True, duration=duration)
+    librosa_ms = (time.perf_counter() - start_time) * 1000.0
+
+    length = min(len(y), len(reference))
+    print({
+        **info,
+        "librosa_ms": round(librosa_ms, 3),
+        "samples": len(y),
+        "librosa_samples": len(reference),
+        "max_abs_diff": float(np.max(np.abs(y[:length] - reference[:length]))) if length else 0.0
+    })
+
+
+if __name__ == "__main__":
+    main()
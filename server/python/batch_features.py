@@ -0,0 +1,284 @@
+"""
+Batched (multi-clip) voice feature extraction
+The single-clip paths take one 1-D signal at a time. Here clips are bucketed by
+length, padded into one 2-D array per bucket, and each feature is computed with
+array ops across the batch, so per-call Python and numpy dispatch overhead is
+paid per bucket instead of per clip (batch rescoring, windowed streams).
+Padding is chosen so that every clip's own frames hold exactly what the
+single-clip code frames, and padded frames never enter a clip's statistics:
+- batch_pitch_contours: pitch_engine.pitch_contour for many clips, their
+  frames gathered into shared autocorrelation passes
+- batch_fast_spectral_features: EmotionDetector._spectral_features' values
+  (energy, pitch + pitch_stats, index centroid, zcr) for decoded clips
+- batch_stft_features: SpectralFeatureEngine's |STFT| features (centroid,
+  bandwidth, rolloff, contrast) for many clips, each clip centre-padded with
+  the installed librosa's feature pad_mode, as the engine's own STFT is
+Frames go through the FFTs in passes of FRAMES_PER_PASS, so peak memory is
+bounded by the pass, not the batch.
+"""
+
+from lazy_imports import timed_import
+from pitch_engine import (FRAME_LENGTH as PITCH_FRAME_LENGTH, HOP_LENGTH as PITCH_HOP_LENGTH, MIN_LAG,
+                          MAX_LAG, VOICING_THRESHOLD, CHUNK_FRAMES, framed_autocorrelation, pitch_summary)
+from spectral_features import N_FFT, HOP_LENGTH, feature_pad_mode
+from voice_activity import trim_to_speech
+
+MAX_BATCH = 64
+MAX_PADDING = 0.25      # a bucket's longest clip is at most this much longer than its shortest
+FRAMES_PER_PASS = CHUNK_FRAMES  # frames per batched FFT pass - small passes stay in cache
+SAMPLES_PER_PASS = FRAMES_PER_PASS * PITCH_FRAME_LENGTH  # whole-clip FFTs per pass
+FRAMES_PER_GROUP = 8 * FRAMES_PER_PASS  # |STFT| frames per feature call (~8 MB of float32 magnitudes)
+STFT_FEATURES = ("spectral_centroid", "spectral_bandwidth", "spectral_rolloff", "spectral_contrast")
+
+
+def length_buckets(lengths, max_batch=MAX_BATCH, max_padding=MAX_PADDING):
+    """Clip indices grouped by similar length, shortest first, so padding stays small"""
+    order = sorted(range(len(lengths)), key=lambda index: lengths[index])
+    buckets, current = [], []
+    for index in order:
+        if current and (len(current) >= max_batch or lengths[index] > lengths[current[0]] * (1.0 + max_padding)):
+            buckets.append(current)
+            current = []
+        current.append(index)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def pad_clips(clips, width):
+    """(B x width) float32, each clip zero-padded on the right"""
+    np = timed_import("numpy")
+    batch = np.zeros((len(clips), width), dtype=np.float32)
+    for row, clip in enumerate(clips):
+        batch[row, :len(clip)] = clip
+    return batch
+
+
+def _frames(batch, frame_length, hop_length):
+    """(B x F x frame_length) strided view of every row's frames (no copy)"""
+    np = timed_import("numpy")
+    return np.lib.stride_tricks.sliding_window_view(batch, frame_length, axis=1)[:, ::hop_length]
+
+
+# -- pitch ------------------------------------------------------------------------
+
+def _pitch_frame_count(length):
+    """Frames pitch_engine.frame_signal cuts from a clip of this length"""
+    if length < PITCH_FRAME_LENGTH:
+        return 1
+    return 1 + -(-(length - PITCH_FRAME_LENGTH) // PITCH_HOP_LENGTH)
+
+
+def batch_pitch_contours(clips, sr):
+    """pitch_engine.pitch_contour for every clip, frames of many clips per autocorrelation pass"""
+    np = timed_import("numpy")
+    if not clips:
+        return []
+    counts = [_pitch_frame_count(len(clip)) for clip in clips]
+    width = (max(counts) - 1) * PITCH_HOP_LENGTH + PITCH_FRAME_LENGTH
+    frames = _frames(pad_clips(clips, width), PITCH_FRAME_LENGTH, PITCH_HOP_LENGTH)
+
+    # Each clip's own frames only, gathered across clips into passes
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    acf = np.empty((offsets[-1], MAX_LAG + 1), dtype=np.float32)
+    pending, pending_frames, written = [], 0, 0
+    for row, count in enumerate(counts + [None]):
+        if count is not None:
+            pending.append(frames[row, :count])
+            pending_frames += count
+        if pending and (count is None or pending_frames >= FRAMES_PER_PASS):
+            acf[written:written + pending_frames] = framed_autocorrelation(np.concatenate(pending), MAX_LAG)
+            written += pending_frames
+            pending, pending_frames = [], 0
+
+    search = acf[:, MIN_LAG:MAX_LAG]
+    best_lag = np.argmax(search, axis=1) + MIN_LAG
+    peak = search[np.arange(len(search)), best_lag - MIN_LAG]
+    energy = acf[:, 0]
+    strength = np.divide(peak, energy, out=np.zeros_like(peak), where=energy > 1e-8)
+    voiced = strength > VOICING_THRESHOLD
+    f0 = np.zeros(len(acf), dtype=np.float32)
+    f0[:] = np.where(voiced, sr / best_lag.astype(np.float32), 0.0)
+
+    lags = np.arange(MAX_LAG + 1, dtype=np.float32)
+    contours = []
+    for index, clip in enumerate(clips):
+        start, end = offsets[index], offsets[index + 1]
+        # Accumulated in pitch_contour's chunks and order, so the clip pitch is the same bit for bit
+        acf_sum = np.zeros(MAX_LAG + 1, dtype=np.float64)
+        for chunk in range(start, end, CHUNK_FRAMES):
+            acf_sum += acf[chunk:min(chunk + CHUNK_FRAMES, end)].sum(axis=0, dtype=np.float64)
+        clip_length = max(len(clip), MAX_LAG + 1)
+        summed = (acf_sum.astype(np.float32) * (PITCH_FRAME_LENGTH / (PITCH_FRAME_LENGTH - lags))
+                  * ((clip_length - lags) / clip_length))
+        clip_lag = int(np.argmax(summed[MIN_LAG:MAX_LAG])) + MIN_LAG
+        contours.append({
+            "f0": f0[start:end],
+            "voiced": voiced[start:end],
+            "times": (np.arange(end - start, dtype=np.float32) * PITCH_HOP_LENGTH + PITCH_FRAME_LENGTH / 2) / sr,
+            "pitch": float(sr / clip_lag)
+        })
+    return contours
+
+
+# -- fast spectral rules' features ------------------------------------------------
+
+def _index_centroids(group, sr, threshold=0.01, default=1000.0):
+    """pitch_engine.index_spectral_centroid of equal-length rows, one rfft for the group"""
+    np = timed_import("numpy")
+    n = group.shape[1]
+    if n == 0:
+        return [default] * len(group)
+
+    rows = max(1, SAMPLES_PER_PASS // n)
+    above = np.concatenate([np.abs(np.fft.rfft(group[start:start + rows], axis=1)) > threshold
+                            for start in range(0, len(group), rows)])
+    has_nyquist = n % 2 == 0
+    pairs = np.count_nonzero(above[:, 1:-1] if has_nyquist else above[:, 1:], axis=1)
+    dc = above[:, 0]
+    nyquist = above[:, -1] if has_nyquist else np.zeros(len(group), dtype=bool)
+
+    centroids = []
+    for row_pairs, row_dc, row_nyquist in zip(pairs.tolist(), dc.tolist(), nyquist.tolist()):
+        count = 2 * row_pairs + row_dc + row_nyquist
+        if count == 0:
+            centroids.append(default)
+            continue
+        index_sum = n * row_pairs + (n // 2 if row_nyquist else 0)
+        centroids.append(float(index_sum / count) * sr / n)
+    return centroids
+
+
+def batch_fast_spectral_features(clips, sr, trim=True):
+    """
+    EmotionDetector._spectral_features' feature dict for each decoded clip
+    (speech-trimmed first, as there, unless trim=False)
+    """
+    np = timed_import("numpy")
+    clips = [np.asarray(clip, dtype=np.float32) for clip in clips]
+    reports = [None] * len(clips)
+    if trim:
+        trimmed = [trim_to_speech(clip, sr) for clip in clips]
+        clips = [clip for clip, _ in trimmed]
+        reports = [report for _, report in trimmed]
+
+    lengths = [len(clip) for clip in clips]
+    energy = [0.0] * len(clips)
+    zcr = [0.0] * len(clips)
+    contours = [None] * len(clips)
+    for bucket in length_buckets(lengths):
+        bucket_clips = [clips[index] for index in bucket]
+        bucket_lengths = np.array([lengths[index] for index in bucket])
+        batch = pad_clips(bucket_clips, int(bucket_lengths.max()))
+
+        # Squares and sign changes for the whole bucket at once; padding is masked out of
+        # the crossing counts, and each clip's power is reduced over its own samples only,
+        # because float32 pairwise sums over a zero-padded row round differently
+        squares = batch ** 2
+        power = [np.mean(squares[position, :length]) for position, length in enumerate(bucket_lengths)]
+        changes = np.abs(np.diff(np.sign(batch), axis=1))
+        changes[np.arange(changes.shape[1])[None, :] >= (bucket_lengths - 1)[:, None]] = 0.0
+        # A clip of 0 or 1 samples has no sign changes to average: nan, as np.mean of none gives
+        crossings = np.where(bucket_lengths > 1,
+                             changes.sum(axis=1) / np.maximum(bucket_lengths - 1, 1).astype(np.float32),
+                             np.float32(np.nan))
+
+        pitched = [position for position in range(len(bucket)) if bucket_lengths[position] > 50]
+        pitched_contours = batch_pitch_contours([bucket_clips[position] for position in pitched], sr)
+        for position, contour in zip(pitched, pitched_contours):
+            contours[bucket[position]] = contour
+        for position, index in enumerate(bucket):
+            energy[index] = float(np.sqrt(power[position]))
+            zcr[index] = float(crossings[position])
+
+    # The index centroid is an FFT over the whole clip: batched over clips of equal length
+    centroids = [None] * len(clips)
+    by_length = {}
+    for index, length in enumerate(lengths):
+        by_length.setdefault(length, []).append(index)
+    for length, indices in by_length.items():
+        group = np.stack([clips[index] for index in indices])
+        for index, centroid in zip(indices, _index_centroids(group, sr)):
+            centroids[index] = centroid
+
+    results = []
+    for index in range(len(clips)):
+        features = {"voice_activity": reports[index]} if trim else {}
+        features["energy"] = energy[index]
+        if contours[index] is not None:
+            features["pitch_stats"] = pitch_summary(contours[index])
+        features["pitch"] = float(contours[index]["pitch"]) if contours[index] is not None else 0.0
+        features["spectral_centroid"] = centroids[index]
+        features["zcr"] = zcr[index]
+        results.append(features)
+    return results
+
+
+
+# -- |STFT| features (IEMOCAP engine) ---------------------------------------------
+
+def _stft_groups(frame_counts):
+    """Consecutive clip indices holding at most FRAMES_PER_GROUP frames (at least one clip each)"""
+    groups, current, frames = [], [], 0
+    for index, count in enumerate(frame_counts):
+        if current and frames + count > FRAMES_PER_GROUP:
+            groups.append(current)
+            current, frames = [], 0
+        current.append(index)
+        frames += count
+    if current:
+        groups.append(current)
+    return groups
+
+
+def batch_stft_features(clips, sr, names=STFT_FEATURES, keep_magnitude=False, n_fft=N_FFT, hop_length=HOP_LENGTH):
+    """
+    {feature name: value} per clip, as SpectralFeatureEngine(clip, sr) computes them, for the
+    names among STFT_FEATURES, plus the clip's |STFT| itself under "stft" if keep_magnitude
+    (for an engine that still builds power / mel features from it). The frames of many clips
+    share each rfft pass and each librosa feature call; spectral_contrast is called per clip,
+    because its dB conversion is relative to the loudest frame of the call. Empty clips get {}
+    (the engine handles them itself).
+    """
+    np = timed_import("numpy")
+    librosa = timed_import("librosa")
+    names = [name for name in STFT_FEATURES if name in names]
+    clips = [np.asarray(clip, dtype=np.float32) for clip in clips]
+    results = [{} for _ in clips]
+    usable = [index for index, clip in enumerate(clips) if len(clip)]
+    if not (names or keep_magnitude) or not usable:
+        return results
+
+    # librosa.stft(center=True): the clip padded by n_fft // 2 each side, the periodic Hann
+    # window applied in float64, the rfft stored as complex64 in a Fortran-ordered matrix -
+    # so |STFT| and the reductions over its frequency axis match bit for bit
+    pad_mode = feature_pad_mode()
+    window = librosa.filters.get_window("hann", n_fft, fftbins=True)
+    padded = {index: np.pad(clips[index], n_fft // 2, mode=pad_mode) for index in usable}
+    counts = [1 + len(clips[index]) // hop_length for index in usable]
+
+    for group in _stft_groups(counts):
+        indices = [usable[position] for position in group]
+        offsets = np.concatenate(([0], np.cumsum([counts[position] for position in group])))
+        frames = np.concatenate([_frames(padded[index][None], n_fft, hop_length)[0] for index in indices])
+        magnitude = np.empty((len(frames), n_fft // 2 + 1), dtype=np.float32)
+        for start in range(0, len(frames), FRAMES_PER_PASS):
+            spectrum = np.fft.rfft(frames[start:start + FRAMES_PER_PASS] * window, axis=1)
+            magnitude[start:start + len(spectrum)] = np.abs(spectrum.astype(np.complex64))
+        magnitude = magnitude.T  # (bins x frames), Fortran-ordered like librosa.stft's result
+
+        # Per-frame features: one call over every clip's frames
+        frame_wise = {}
+        for name in names:
+            if name != "spectral_contrast":
+                frame_wise[name] = getattr(librosa.feature, name)(S=magnitude, sr=sr)
+        for position, index in enumerate(indices):
+            start, end = offsets[position], offsets[position + 1]
+            for name, values in frame_wise.items():
+                results[index][name] = values[:, start:end].copy()
+            if keep_magnitude:
+                results[index]["stft"] = magnitude[:, start:end]
+            if "spectral_contrast" in names:
+                results[index]["spectral_contrast"] = librosa.feature.spectral_contrast(
+                    S=magnitude[:, start:end], sr=sr)
+    return results
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Offline re-scoring of archived recordings across CPU cores
+Re-runs voice emotion over a directory (e.g. temp/) or a manifest after the
+rules or thresholds change:
+- Decode + feature extraction + scoring run in a process pool; each worker
+  builds its detector once and takes files in small chunks, scored as one
+  batch (batched spectral features for voice, batched Wav2Vec2 for IEMOCAP)
+- Results stream to JSONL as chunks complete, or to Parquet (pyarrow,
+  optional) as closed part files of PARQUET_PART_ROWS rows
+- Every file whose row is safely on disk is appended to a checkpoint, so an
+  interrupted or killed run resumes where it stopped; rows with an error are
+  written but not checkpointed, so a rerun retries them (the newest row for a
+  path wins)
+- Progress and files/s go to stderr, a JSON summary to stdout
+
+Usage:
+    python batch_rescore.py temp/ --output rescored.jsonl
+    python batch_rescore.py sessions.txt --analyzer iemocap --profile full --output rescored.parquet
+A manifest lists one audio path per line (relative to the manifest), or JSON
+objects with "audio_path"/"path"; blank lines and # comments are skipped.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+AUDIO_EXTENSIONS = (".wav", ".webm", ".mp3", ".ogg", ".m4a", ".flac")
+ANALYZERS = ("voice", "iemocap")
+PARQUET_PART_ROWS = 2048
+PROGRESS_SECONDS = 5.0
+
+
+def collect_inputs(source):
+    """Audio files under a directory (sorted), or the entries of a manifest file"""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(AUDIO_EXTENSIONS))
+        return sorted(paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, "r", encoding="utf-8") as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                line = entry.get("audio_path") or entry.get("path") or ""
+                if not line:
+                    continue
+            paths.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return paths
+
+
+# -- worker processes -------------------------------------------------------------
+
+_worker = {}
+
+
+def _init_worker(analyzer, profile, threads):
+    """Build the detector once per process; keep each process to `threads` math threads"""
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(variable, str(threads))
+    # Detector logging goes to stderr; keep worker chatter out of the progress lines
+    sys.stdout = sys.stderr
+
+    if analyzer == "iemocap":
+        from iemocap_emotion_detector import EnhancedEmotionDetector
+        detector = EnhancedEmotionDetector()
+        detector.load_model()
+    else:
+        from emotion_detector import EmotionDetector
+        detector = EmotionDetector()
+    _worker.update(analyzer=analyzer, profile=profile, detector=detector)
+
+
+def _row(path, result, processing_ms):
+    return {
+        "path": path,
+        "emotion": result.get("emotion"),
+        "confidence": result.get("confidence"),
+        "method": result.get("method"),
+        "error": result.get("error"),
+        "processing_ms": round(processing_ms, 3),
+        "result": result
+    }
+
+
+def _score_chunk(paths):
+    """Rows for one chunk of files; failures become rows with an error"""
+    detector = _worker["detector"]
+    started = time.perf_counter()
+    try:
+        if _worker["analyzer"] == "iemocap":
+            results = detector.detect_speech_emotion_batch(paths, _worker["profile"])
+        else:
+            results = detector.detect_voice_emotion_batch(paths)
+    except Exception as e:
+        results = [{"emotion": "neutral", "confidence": 0.0, "error": str(e)} for _ in paths]
+    per_file_ms = (time.perf_counter() - started) * 1000.0 / max(1, len(paths))
+    return [_row(path, result, per_file_ms) for path, result in zip(paths, results)]
+
+
+# -- output -----------------------------------------------------------------------
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.path = path
+        self.parts = [path]
+        self.handle = open(path, "a", encoding="utf-8")
+
+    def write(self, rows):
+        """Append rows; returns the paths now safely on disk"""
+        for row in rows:
+            self.handle.write(json.dumps(row) + "\n")
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        return [row["path"] for row in rows]
+
+    def close(self):
+        self.handle.close()
+        return []
+
+
+class ParquetWriter:
+    """
+    Part files of PARQUET_PART_ROWS rows; the full result is kept as a JSON string column
+    A Parquet file is unreadable until its footer is written on close, so every part is
+    written to a temporary name, closed and renamed before its rows count as written -
+    a crash loses at most the rows still pending, and those are not checkpointed
+    """
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow (pip install pyarrow) - or write .jsonl")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.schema = pyarrow.schema([
+            ("path", pyarrow.string()),
+            ("emotion", pyarrow.string()),
+            ("confidence", pyarrow.float64()),
+            ("method", pyarrow.string()),
+            ("error", pyarrow.string()),
+            ("processing_ms", pyarrow.float64()),
+            ("result", pyarrow.string()),
+        ])
+        # Parquet files cannot be appended to: the first part is `path`, later ones
+        # (and a resumed run's) are <stem>.partN<ext>
+        self.path = path
+        self.parts = []
+        self.pending = []
+
+    def _next_part_path(self):
+        stem, extension = os.path.splitext(self.path)
+        candidate, part = self.path, 1
+        while os.path.exists(candidate):
+            candidate = f"{stem}.part{part}{extension}"
+            part += 1
+        return candidate
+
+    def write(self, rows):
+        self.pending.extend(rows)
+        if len(self.pending) < PARQUET_PART_ROWS:
+            return []
+        return self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return []
+        columns = {name: [row[name] for row in self.pending] for name in self.schema.names if name != "result"}
+        columns["result"] = [json.dumps(row["result"]) for row in self.pending]
+        table = self.pa.Table.from_pydict(columns, schema=self.schema)
+
+        part_path = self._next_part_path()
+        temp_path = f"{part_path}.tmp"
+        self.pq.write_table(table, temp_path)
+        with open(temp_path, "rb") as handle:
+            os.fsync(handle.fileno())
+        os.replace(temp_path, part_path)
+        self.parts.append(part_path)
+
+        written = [row["path"] for row in self.pending]
+        self.pending = []
+        return written
+
+    def close(self):
+        return self._flush()
+
+
+def open_writer(path):
+    return ParquetWriter(path) if path.lower().endswith(".parquet") else JsonlWriter(path)
+
+
+class Checkpoint:
+    """Append-only list of finished paths next to the output"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as handle:
+                self.done = {line.rstrip("\n") for line in handle if line.strip()}
+        self.handle = open(path, "a", encoding="utf-8")
+
+    def mark(self, paths):
+        if not paths:
+            return
+        self.handle.write("".join(f"{path}\n" for path in paths))
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        self.done.update(paths)
+
+    def close(self):
+        self.handle.close()
+
+
+# -- driver -----------------------------------------------------------------------
+
+def rescore(paths, output, analyzer="voice", profile=None, workers=None, chunk_size=4,
+            checkpoint_path=None, threads_per_worker=1):
+    """Score paths into output, skipping those already in the checkpoint; returns the summary"""
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    chunk_size = max(1, int(chunk_size))
+    writer = open_writer(output)
+    checkpoint = Checkpoint(checkpoint_path or f"{output}.checkpoint")
+    todo = [path for path in paths if path not in checkpoint.done]
+    skipped = len(paths) - len(todo)
+    chunks = [todo[start:start + chunk_size] for start in range(0, len(todo), chunk_size)]
+
+    print(f"📂 {len(paths)} files: {skipped} already done, {len(todo)} to score "
+          f"({analyzer}, {workers} workers x {chunk_size} files per task)", file=sys.stderr)
+
+    processed = errors = 0
+    failed = set()  # written with an error: left out of the checkpoint so a rerun retries them
+    started = last_report = time.perf_counter()
+    interrupted = False
+
+    def report(final=False):
+        elapsed = time.perf_counter() - started
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        label = "✅ Done" if final else "⏱️"
+        print(f"{label} {processed}/{len(todo)} files, {errors} errors, {rate:.1f} files/s", file=sys.stderr)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(analyzer, profile, threads_per_worker)) as pool:
+            queued = iter(chunks)
+            inflight = set()
+            try:
+                while True:
+                    # Keep every worker busy without queueing the whole archive
+                    while len(inflight) < workers * 2:
+                        chunk = next(queued, None)
+                        if chunk is None:
+                            break
+                        inflight.add(pool.submit(_score_chunk, chunk))
+                    if not inflight:
+                        break
+
+                    finished, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        rows = future.result()
+                        processed += len(rows)
+                        errors += sum(1 for row in rows if row["error"])
+                        failed.update(row["path"] for row in rows if row["error"])
+                        checkpoint.mark([path for path in writer.write(rows) if path not in failed])
+
+                    if time.perf_counter() - last_report >= PROGRESS_SECONDS:
+                        last_report = time.perf_counter()
+                        report()
+            except KeyboardInterrupt:
+                interrupted = True
+                print("🛑 Interrupted - finished files are checkpointed, rerun to resume", file=sys.stderr)
+                for future in inflight:
+                    future.cancel()
+    finally:
+        checkpoint.mark([path for path in writer.close() if path not in failed])
+        checkpoint.close()
+
+    elapsed = time.perf_counter() - started
+    report(final=True)
+    return {
+        "files": len(paths),
+        "skipped": skipped,
+        "processed": processed,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "files_per_second": round(processed / elapsed, 3) if elapsed > 0 else 0.0,
+        "output": writer.path,
+        "parts": writer.parts,
+        "checkpoint": checkpoint.path,
+        "interrupted": interrupted
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score archived recordings with the voice emotion analyzers")
+    parser.add_argument("source", help="directory of recordings, or a manifest (one path or JSON object per line)")
+    parser.add_argument("--output", required=True, help="results file: .jsonl, or .parquet (needs pyarrow)")
+    parser.add_argument("--analyzer", choices=ANALYZERS, default="voice",
+                        help="voice: fast spectral rules (emotion_detector.py); iemocap: enhanced analysis")
+    parser.add_argument("--profile", choices=("fast", "standard", "full"), default=None,
+                        help="IEMOCAP feature profile (default: IEMOCAP_FEATURE_PROFILE or standard)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=4, help="files per worker task (default: 4)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="math threads per worker (default: 1)")
+    parser.add_argument("--checkpoint", default=None, help="finished-file list (default: <output>.checkpoint)")
+    args = parser.parse_args()
+
+    try:
+        paths = collect_inputs(args.source)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": f"Cannot read {args.source}: {e}"}))
+        sys.exit(1)
+
+    summary = rescore(paths, args.output, args.analyzer, args.profile, args.workers, args.chunk_size,
+                      args.checkpoint, args.threads_per_worker)
+    print(json.dumps(summary, indent=2))
+    if summary["interrupted"]:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Persistent spaCy context extraction for text_with_context requests
+Loads en_core_web_sm once with only what context extraction needs
+- Keeps tok2vec, tagger, attribute_ruler, lemmatizer and NER (POS, lemmas, entities)
+- Excludes the dependency parser and sentence segmenter
+- Batches through nlp.pipe and keeps a small LRU cache of extracted contexts
+"""
+
+import sys
+import time
+
+from result_cache import LRUResultCache
+from lazy_imports import timed_import
+
+SPACY_MODEL = "en_core_web_sm"
+# Nothing in context extraction reads dependencies or sentence boundaries
+EXCLUDED_COMPONENTS = ["parser", "senter"]
+
+
+def simple_context(text):
+    """Fallback when spaCy is unavailable: first few longer words"""
+    return [word for word in text.split() if len(word) > 3][:5]
+
+
+class ContextExtractor:
+    def __init__(self, model_name=SPACY_MODEL, cache=None):
+        self.model_name = model_name
+        self.nlp = None
+        self.load_error = None
+        self.load_seconds = 0.0
+        self.cache = cache or LRUResultCache(max_entries=1024, max_bytes=2 * 1024 * 1024)
+
+    def load(self):
+        """Load the slimmed pipeline once; later calls are no-ops"""
+        if self.nlp is not None or self.load_error is not None:
+            return self.nlp is not None
+
+        try:
+            start_time = time.perf_counter()
+            spacy = timed_import("spacy")
+            self.nlp = spacy.load(self.model_name, exclude=EXCLUDED_COMPONENTS)
+            self.load_seconds = time.perf_counter() - start_time
+            print(f"✅ spaCy {self.model_name} loaded in {self.load_seconds:.2f}s "
+                  f"(pipes: {', '.join(self.nlp.pipe_names)})", file=sys.stderr)
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"Context extraction unavailable, using word fallback: {e}", file=sys.stderr)
+
+        return self.nlp is not None
+
+    def _context_from_doc(self, doc):
+        # Extract entities and important words
+        entities = [ent.text for ent in doc.ents]
+        important_words = [token.lemma_ for token in doc
+                           if token.pos_ in ['NOUN', 'VERB', 'ADJ']
+                           and not token.is_stop
+                           and len(token.text) > 2]
+
+        # Combine and deduplicate context (order kept stable for caching)
+        return list(dict.fromkeys(entities + important_words))
+
+    def extract(self, text):
+        return self.extract_many([text])[0]
+
+    def extract_many(self, texts):
+        """Context lists for many texts - cache hits skip spaCy, misses go through nlp.pipe"""
+        contexts = [None] * len(texts)
+        missing = []
+
+        for index, text in enumerate(texts):
+            cached = self.cache.get(text or "")
+            if cached is not None:
+                contexts[index] = cached
+            else:
+                missing.append(index)
+
+        if not missing:
+            return contexts
+
+        if not self.load():
+            for index in missing:
+                contexts[index] = simple_context(texts[index] or "")
+            return contexts
+
+        try:
+            docs = self.nlp.pipe([texts[index] or "" for index in missing], batch_size=max(1, len(missing)))
+            for index, doc in zip(missing, docs):
+                context = self._context_from_doc(doc)
+                self.cache.put(texts[index] or "", context)
+                contexts[index] = context
+        except Exception as context_error:
+            print(f"Context extraction failed: {context_error}", file=sys.stderr)
+            for index in missing:
+                contexts[index] = simple_context(texts[index] or "")
+
+        return contexts
+
+    def stats(self):
+        return {
+            "model": self.model_name,
+            "loaded": self.nlp is not None,
+            "pipes": list(self.nlp.pipe_names) if self.nlp is not None else [],
+            "load_seconds": self.load_seconds,
+            "error": self.load_error,
+            "cache": self.cache.stats()
+        }
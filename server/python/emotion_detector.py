@@ -12,22 +12,29 @@ import sys
 import json
 import warnings
 import gc
-import torch
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-import librosa
-import numpy as np
-import tempfile
 import os
-from transformers.utils import logging as transformers_logging
+from lazy_imports import timed_import, import_report
+from text_backends import get_text_backend, load_text_classifier
+from text_chunking import long_text_mode, split_into_windows, aggregate_scores
+from context_extractor import ContextExtractor
+from pitch_engine import pitch_contour, pitch_summary, index_spectral_centroid
+from audio_io import load_audio
+from voice_activity import trim_to_speech, trim_profile
+from feature_cache import get_feature_cache
+from batch_features import batch_fast_spectral_features
+from parallel_branches import run_branches
+from concurrent.futures import ThreadPoolExecutor
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings("ignore")
-# Suppress transformers info/debug logs to prevent stdout pollution
-transformers_logging.set_verbosity_error()
+# torch / transformers / librosa / numpy are imported on first use (lazy_imports.py):
+# a voice call never loads transformers and a text call never loads librosa
 
 # Global model cache to avoid reloading
 _TEXT_MODEL_CACHE = None
 _DEVICE_CACHE = None
+# Slimmed spaCy pipeline shared by every text_with_context call in this process
+_CONTEXT_EXTRACTOR = ContextExtractor()
 
 class EmotionDetector:
     def __init__(self):
@@ -38,7 +45,8 @@ class EmotionDetector:
         # FORCE CPU for emotion detection (training compatibility)
         _DEVICE_CACHE = -1  # Force CPU
         print("[DEBUG] Using CPU (forced for training compatibility)", file=sys.stderr)
-        if torch.cuda.is_available():
+        torch = sys.modules.get("torch")  # only report, never import it just for this
+        if torch is not None and torch.cuda.is_available():
             print(f"[DEBUG] GPU available ({torch.cuda.get_device_name(0)}) but using CPU", file=sys.stderr)
             
         self.device = _DEVICE_CACHE
@@ -58,27 +66,11 @@ class EmotionDetector:
             
             try:
                 print("[DEBUG] Loading RoBERTa GoEmotions model (first time)...", file=sys.stderr)
-                # Use optimized settings for faster loading
-                import os
-                import contextlib
+                # EMOTION_TEXT_BACKEND picks fp32 torch (default), torch_int8 or onnx
+                backend = get_text_backend()
+                print(f"[DEBUG] Text inference backend: {backend}", file=sys.stderr)
+                self.text_model = load_text_classifier(backend)
                 
-                with open(os.devnull, 'w') as devnull:
-                    with contextlib.redirect_stdout(devnull):
-                        # Optimized pipeline settings
-                        self.text_model = pipeline(
-                            "text-classification",
-                            model="SamLowe/roberta-base-go_emotions",
-                            tokenizer="SamLowe/roberta-base-go_emotions",
-                            device=self.device,
-                            return_all_scores=True,
-                            # Performance optimizations
-                            model_kwargs={
-                                "torch_dtype": torch.float16 if self.device == 0 else torch.float32,
-                                "low_cpu_mem_usage": True,
-                                "use_cache": True
-                            }
-                        )
-                        
                 # Cache the model globally for subsequent uses
                 _TEXT_MODEL_CACHE = self.text_model
                 print("[DEBUG] ✅ Text emotion model loaded and cached", file=sys.stderr)
@@ -97,9 +89,10 @@ class EmotionDetector:
         print("[DEBUG] Voice model loading skipped for performance - using spectral analysis", file=sys.stderr)
         self.voice_model = "fast_spectral"
     
-    def detect_text_emotion(self, text, language="en"):
+    def detect_text_emotion(self, text, language="en", chunked=None, aggregate=None):
         """
         OPTIMIZED: Detect emotion from text using RoBERTa GoEmotions
+        chunked/aggregate default to EMOTION_LONG_TEXT / EMOTION_CHUNK_AGGREGATE
         Returns: {emotion: str, confidence: float, all_scores: dict}
         """
         try:
@@ -107,37 +100,36 @@ class EmotionDetector:
             if not text or len(text.strip()) < 2:
                 return {"emotion": "neutral", "confidence": 0.5, "all_scores": {}}
             
-            # Load model (uses cache if available)
-            self.load_text_model()
-            
-            if self.text_model is None:
-                return {"emotion": "neutral", "confidence": 0.5, "all_scores": {}, "error": "Model not loaded"}
-            
             print(f"Analyzing text emotion: {text[:50]}...", file=sys.stderr)
             
-            # Optimized text preprocessing
-            processed_text = text.strip()[:512]  # Limit length for speed
+            # Optimized text preprocessing: first 512 chars, or every overlapping
+            # 512-char window when long-text chunking is enabled
+            if chunked is None:
+                chunked = long_text_mode() == "chunked"
+            windows = [text.strip()[:512]]  # Limit length for speed
+            if chunked:
+                windows = split_into_windows(text, max_chars=512,
+                                             overlap_chars=int(os.environ.get("EMOTION_CHUNK_OVERLAP", "128"))) or windows
             
-            # Get emotion scores with timeout protection
             try:
-                results = self.text_model(processed_text)
+                window_scores = self._score_windows(windows)
             except Exception as model_error:
                 print(f"Model inference error: {model_error}", file=sys.stderr)
                 return {"emotion": "neutral", "confidence": 0.5, "error": str(model_error)}
             
-            # Fast processing of results
-            emotion_scores = {}
-            top_emotion = {"label": "neutral", "score": 0.0}
+            if window_scores is None:
+                return {"emotion": "neutral", "confidence": 0.5, "all_scores": {}, "error": "Model not loaded"}
             
-            if isinstance(results, list) and len(results) > 0:
-                scores = results[0] if isinstance(results[0], list) else results
-                
-                # Vectorized processing for speed
-                for item in scores:
-                    if isinstance(item, dict) and "label" in item and "score" in item:
-                        emotion_scores[item["label"]] = item["score"]
-                        if item["score"] > top_emotion["score"]:
-                            top_emotion = item
+            if len(windows) == 1:
+                emotion_scores = window_scores[0]
+            else:
+                aggregate = aggregate or os.environ.get("EMOTION_CHUNK_AGGREGATE", "mean")
+                emotion_scores = aggregate_scores(window_scores, [len(window) for window in windows], aggregate)
+            
+            top_emotion = {"label": "neutral", "score": 0.0}
+            for label, score in emotion_scores.items():
+                if score > top_emotion["score"]:
+                    top_emotion = {"label": label, "score": score}
             
             # Fast emotion mapping (reduced set for performance)
             emotion_mapping = {
@@ -160,6 +152,8 @@ class EmotionDetector:
                 "all_scores": emotion_scores,
                 "raw_label": top_emotion["label"]
             }
+            if len(windows) > 1:
+                result["chunks"] = len(windows)
             
             print(f"✅ Text emotion detected: {result['emotion']} ({result['confidence']:.3f})", file=sys.stderr)
             return result
@@ -168,6 +162,33 @@ class EmotionDetector:
             print(f"❌ Text emotion detection error: {e}", file=sys.stderr)
             return {"emotion": "neutral", "confidence": 0.5, "all_scores": {}, "error": str(e)}
     
+    def detect_text_emotion_with_context(self, text, language="en"):
+        """Text emotion plus spaCy context (entities, content lemmas)"""
+        result = self.detect_text_emotion(text, language)
+        result["context"] = _CONTEXT_EXTRACTOR.extract(text or "")
+        return result
+    
+    def _score_windows(self, windows):
+        """Raw {label: score} per window - distinct windows run through the model as one batch
+        (no result cache here: this CLI lives for one call; emotion_server.py keeps the LRU cache)"""
+        # Load model (uses cache if available)
+        self.load_text_model()
+        
+        if self.text_model is None:
+            return None
+        
+        distinct = list(dict.fromkeys(windows))
+        results = self.text_model(distinct, batch_size=len(distinct))
+        scores_by_window = {}
+        for window, output in zip(distinct, results):
+            scores = output[0] if output and isinstance(output[0], list) else output
+            scores_by_window[window] = {
+                item["label"]: item["score"] for item in scores
+                if isinstance(item, dict) and "label" in item and "score" in item
+            }
+        
+        return [scores_by_window[window] for window in windows]
+    
     def detect_voice_emotion(self, audio_path):
         """
         OPTIMIZED: Fast voice emotion detection using spectral analysis
@@ -193,77 +214,143 @@ class EmotionDetector:
         Analyzes pitch, energy, and spectral features with performance optimizations
         """
         try:
-            # Fast audio loading with limitations for speed
-            y, sr = librosa.load(audio_path, duration=10.0, sr=16000)  # Limit duration and sample rate
-            
-            if len(y) == 0:
-                return {"emotion": "neutral", "confidence": 0.5, "error": "Empty audio"}
-            
-            # Fast feature extraction (vectorized operations)
-            features = {}
-            
-            # Quick energy analysis (RMS)
-            rms = np.sqrt(np.mean(y**2))
-            features["energy"] = float(rms)
-            
-            # Fast pitch estimation (simplified)
-            autocorr = np.correlate(y, y, mode='full')
-            autocorr = autocorr[len(autocorr)//2:]
-            
-            # Find pitch (simplified method for speed)
-            pitch_estimate = 0
-            if len(autocorr) > 50:
-                pitch_estimate = np.argmax(autocorr[20:200]) + 20  # Rough pitch detection
-                pitch_estimate = sr / pitch_estimate if pitch_estimate > 0 else 0
-            
-            features["pitch"] = float(pitch_estimate)
-            
-            # Fast spectral analysis 
-            fft = np.abs(np.fft.fft(y))
-            spectral_centroid = float(np.mean(np.where(fft > 0.01)[0])) * sr / len(fft) if np.any(fft > 0.01) else 1000
-            features["spectral_centroid"] = spectral_centroid
-            
-            # Zero crossing rate (fast)
-            zcr = float(np.mean(np.abs(np.diff(np.sign(y)))))
-            features["zcr"] = zcr
-            
-            # OPTIMIZED emotion detection rules (simplified for speed)
-            emotion = "neutral"
-            confidence = 0.6
-            
-            # High energy emotions
-            if features["energy"] > 0.1:
-                if features["pitch"] > 200:
-                    emotion = "joy" if features["zcr"] < 0.8 else "anger"
-                    confidence = 0.7
-                else:
-                    emotion = "anger"
-                    confidence = 0.65
-            
-            # Low energy emotions  
-            elif features["energy"] < 0.05:
-                emotion = "sadness"
-                confidence = 0.65
-            
-            # High variability = stress/fear
-            elif features["zcr"] > 1.0:
-                emotion = "fear"
-                confidence = 0.6
-            
-            result = {
-                "emotion": emotion,
-                "confidence": confidence,
-                "features": features,
-                "method": "fast_spectral"
-            }
+            # Same content analyzed before: features straight from the cache (feature_cache.py)
+            cache = get_feature_cache()
+            key = cache.key_for_file(audio_path, f"spectral:{trim_profile()}")
+            cached = cache.get(key)
+            if cached is not None:
+                summary, _, tier = cached
+                features, audio_info = summary["features"], dict(summary["audio_info"], decode_ms=0.0)
+            else:
+                features, audio_info = self._spectral_features(audio_path)
+                if features is None:
+                    return {"emotion": "neutral", "confidence": 0.5, "error": "Empty audio"}
+                cache.put(key, {"features": features, "audio_info": audio_info})
+                tier = "miss"
             
-            print(f"✅ Fast voice emotion: {emotion} ({confidence:.3f})", file=sys.stderr)
-            return result
+            return self._spectral_result(features, audio_info, tier)
             
         except Exception as e:
             print(f"❌ Fast spectral analysis error: {e}", file=sys.stderr)
             return {"emotion": "neutral", "confidence": 0.5, "error": str(e)}
     
+    def _spectral_result(self, features, audio_info, tier):
+        """Fast spectral rules over extracted features -> voice emotion result"""
+        # OPTIMIZED emotion detection rules (simplified for speed)
+        emotion = "neutral"
+        confidence = 0.6
+        
+        # High energy emotions
+        if features["energy"] > 0.1:
+            if features["pitch"] > 200:
+                emotion = "joy" if features["zcr"] < 0.8 else "anger"
+                confidence = 0.7
+            else:
+                emotion = "anger"
+                confidence = 0.65
+        
+        # Low energy emotions  
+        elif features["energy"] < 0.05:
+            emotion = "sadness"
+            confidence = 0.65
+        
+        # High variability = stress/fear
+        elif features["zcr"] > 1.0:
+            emotion = "fear"
+            confidence = 0.6
+        
+        result = {
+            "emotion": emotion,
+            "confidence": confidence,
+            "features": features,
+            "decode_ms": audio_info["decode_ms"],
+            "decoder": audio_info["decoder"],
+            "feature_cache": tier,
+            "method": "fast_spectral"
+        }
+        
+        print(f"✅ Fast voice emotion: {emotion} ({confidence:.3f})", file=sys.stderr)
+        return result
+    
+    def detect_voice_emotion_batch(self, audio_paths):
+        """
+        detect_voice_emotion for many files: cache misses are decoded, then their
+        features come from one batched extraction (batch_features.py)
+        Returns one result per path, in order
+        """
+        results = [None] * len(audio_paths)
+        pending = []  # (index, cache key, audio_info, samples)
+        sr = 16000
+        cache = get_feature_cache()
+        profile = f"spectral:{trim_profile()}"
+        self.load_voice_model()
+        
+        for index, audio_path in enumerate(audio_paths):
+            try:
+                if not os.path.exists(audio_path):
+                    results[index] = {"emotion": "neutral", "confidence": 0.5, "error": "Audio file not found"}
+                    continue
+                key = cache.key_for_file(audio_path, profile)
+                cached = cache.get(key)
+                if cached is not None:
+                    summary, _, tier = cached
+                    results[index] = self._spectral_result(
+                        summary["features"], dict(summary["audio_info"], decode_ms=0.0), tier)
+                    continue
+                y, sr, audio_info = load_audio(audio_path, sr=sr, duration=10.0)
+                if len(y) == 0:
+                    results[index] = {"emotion": "neutral", "confidence": 0.5, "error": "Empty audio"}
+                    continue
+                pending.append((index, key, audio_info, y))
+            except Exception as e:
+                print(f"❌ Voice emotion detection error: {e}", file=sys.stderr)
+                results[index] = {"emotion": "neutral", "confidence": 0.5, "error": str(e)}
+        
+        if pending:
+            print(f"Fast voice emotion analysis: batch of {len(pending)} files", file=sys.stderr)
+            batch = batch_fast_spectral_features([y for _, _, _, y in pending], sr)
+            for (index, key, audio_info, _), features in zip(pending, batch):
+                cache.put(key, {"features": features, "audio_info": audio_info})
+                results[index] = self._spectral_result(features, audio_info, "miss")
+        return results
+    
+    def _spectral_features(self, audio_path):
+        """(features, audio_info) for the fast spectral rules - (None, None) for empty audio"""
+        np = timed_import("numpy")
+        
+        # Fast audio loading with limitations for speed (audio_io.py: mmap for 16 kHz WAV)
+        y, sr, audio_info = load_audio(audio_path, sr=16000, duration=10.0)
+        
+        if len(y) == 0:
+            return None, None
+        
+        # Speech regions only (voice_activity.py) - silence would drag energy down
+        y, voice_activity = trim_to_speech(y, sr)
+        
+        # Fast feature extraction (vectorized operations)
+        features = {"voice_activity": voice_activity}
+        
+        # Quick energy analysis (RMS)
+        rms = np.sqrt(np.mean(y**2))
+        features["energy"] = float(rms)
+        
+        # Frame-wise FFT autocorrelation pitch (pitch_engine.py), same 20-200 lag range
+        pitch_estimate = 0.0
+        if len(y) > 50:
+            contour = pitch_contour(y, sr)
+            pitch_estimate = contour["pitch"]
+            features["pitch_stats"] = pitch_summary(contour)
+        
+        features["pitch"] = float(pitch_estimate)
+        
+        # Fast spectral analysis (half-spectrum rfft)
+        features["spectral_centroid"] = index_spectral_centroid(y, sr)
+        
+        # Zero crossing rate (fast)
+        zcr = float(np.mean(np.abs(np.diff(np.sign(y)))))
+        features["zcr"] = zcr
+        return features, audio_info
+    
     def combine_emotions(self, text_result, voice_result, text_weight=0.7, voice_weight=0.3):
         """
         OPTIMIZED: Fast combination of text and voice emotion detection results
@@ -327,7 +414,7 @@ def main():
     try:
         if len(sys.argv) < 2:
             print("Usage: python emotion_detector.py <mode> [args...]")
-            print("Modes: text, voice, combined")
+            print("Modes: text, text_with_context, voice, combined")
             sys.exit(1)
         
         mode = sys.argv[1]
@@ -345,6 +432,18 @@ def main():
             result = detector.detect_text_emotion(text, language)
             print(json.dumps(result))
         
+        elif mode == "text_with_context":
+            # Text emotion + context extraction (used by emotionService.ts)
+            if len(sys.argv) < 3:
+                print("Usage: python emotion_detector.py text_with_context <text> [language]")
+                sys.exit(1)
+            
+            text = sys.argv[2]
+            language = sys.argv[3] if len(sys.argv) > 3 else "en"
+            
+            result = detector.detect_text_emotion_with_context(text, language)
+            print(json.dumps(result))
+        
         elif mode == "voice":
             # Voice emotion detection
             if len(sys.argv) < 3:
@@ -365,15 +464,22 @@ def main():
             audio_path = sys.argv[3]
             language = sys.argv[4] if len(sys.argv) > 4 else "en"
             
-            text_result = detector.detect_text_emotion(text, language)
-            voice_result = detector.detect_voice_emotion(audio_path)
+            # Text (model load + RoBERTa) and voice (decode + spectral analysis) are
+            # independent - run them side by side
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="emotion-branch") as executor:
+                results, timings = run_branches(executor, {
+                    "text": lambda: detector.detect_text_emotion(text, language),
+                    "voice": lambda: detector.detect_voice_emotion(audio_path)
+                })
+            text_result, voice_result = results["text"], results["voice"]
             combined_result = detector.combine_emotions(text_result, voice_result)
             
             # Return comprehensive results
             output = {
                 "combined": combined_result,
                 "text": text_result,
-                "voice": voice_result
+                "voice": voice_result,
+                "timings": timings
             }
             print(json.dumps(output))
         
@@ -381,6 +487,8 @@ def main():
             print(f"Unknown mode: {mode}")
             sys.exit(1)
         
+        print(f"[DEBUG] Import times: {import_report()}", file=sys.stderr)
+        
         # Optimized cleanup - keep model cached for subsequent calls
         # Only clear if explicitly requested
         if os.environ.get("EMOTION_CLEAR_CACHE", "false").lower() == "true":
@@ -389,7 +497,9 @@ def main():
             if hasattr(detector, 'voice_model') and detector.voice_model:
                 del detector.voice_model
             gc.collect()
-            torch.cuda.empty_cache() if torch.cuda.is_available() else None
+            torch = sys.modules.get("torch")
+            if torch is not None and torch.cuda.is_available():
+                torch.cuda.empty_cache()
         
     except Exception as e:
         error_result = {"emotion": "neutral", "confidence": 0.5, "error": str(e)}
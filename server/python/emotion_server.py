@@ -5,48 +5,131 @@ High-performance emotion detection service that keeps models loaded in memory
 - Text: roberta-base-go_emotions (27 emotions including stress/anxiety)
 - Voice: Fast spectral analysis for performance  
 - Server: Persistent process with JSON API over stdin/stdout
+  (binary frames from frame_protocol.py carry audio in-band on the same stream)
 """
 
 import sys
 import json
 import warnings
 import gc
-import torch
-from transformers import pipeline
-import librosa
-import numpy as np
 import os
-from transformers.utils import logging as transformers_logging
+import argparse
+from lazy_imports import IMPORT_TIMES, timed_import, import_report
+from server_readiness import warmup_runs, run_warmup, emit_ready
+from result_cache import LRUResultCache, text_cache_key
+from feature_cache import get_feature_cache
+from text_backends import get_text_backend, load_text_classifier
+from text_chunking import long_text_mode, split_into_windows, aggregate_scores
+from context_extractor import ContextExtractor
+from worker_pool import PreforkWorkerPool, prefork_supported
+from socket_server import SocketEmotionServer, parse_listen_address
+from voice_stream import VoiceStream, classify_energy_zcr
+from audio_io import load_audio, decode_audio
+from parallel_branches import run_branches
+from frame_protocol import BODY_KEY, FrameError, encode_frame, read_message, binary_stream
 import signal
 import threading
 import time
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings("ignore")
-transformers_logging.set_verbosity_error()
+
+# torch/transformers/librosa/numpy are imported lazily (lazy_imports.py) and only
+# for the modes this server is started with
+SERVER_MODES = ("text", "text_with_context", "voice", "combined")
+TEXT_MODES = {"text", "text_with_context", "combined"}
+VOICE_MODES = {"voice", "combined"}
+# Live voice sessions; available whenever "voice" is enabled
+STREAM_MODES = ("stream_open", "stream_push", "stream_close")
+
+# Representative inputs for the warm-up phase (short chat lines plus one longer message)
+WARMUP_TEXTS = [
+    "Hello, how are you today?",
+    "I'm fine",
+    "I am so stressed about my exams next week and I can't sleep.",
+    "I finally said the whole sentence without stopping, I'm so happy!",
+    "Sometimes I feel nervous when I have to order food at a restaurant, and then I avoid "
+    "going out with my friends because I'm scared they will notice me stuttering."
+]
 
 class PersistentEmotionDetector:
-    def __init__(self):
+    def __init__(self, modes=None):
+        self.modes = set(modes or SERVER_MODES)
         self.text_model = None
         self.device = None
         self.model_loaded = False
         self.running = True
         
+        # Micro-batching for text requests: collect for up to
+        # EMOTION_BATCH_WINDOW_MS or EMOTION_BATCH_SIZE items, whichever comes first
+        self.batch_window_ms = float(os.environ.get("EMOTION_BATCH_WINDOW_MS", "5"))
+        self.batch_max_size = max(1, int(os.environ.get("EMOTION_BATCH_SIZE", "32")))
+        self.batch_stats = {"batches": 0, "items": 0, "max_batch": 0, "inference_seconds": 0.0}
+        self.started_at = time.time()
+        
+        # Repeated phrases ("I'm fine", greetings) are answered from an LRU cache
+        # sized by EMOTION_CACHE_MAX_ENTRIES / EMOTION_CACHE_MAX_MB / EMOTION_CACHE_TTL
+        self.text_cache = LRUResultCache.from_env("EMOTION_CACHE")
+        # Voice features by audio content, shared with the other voice analyzers in this process
+        self.feature_cache = get_feature_cache()
+        self.text_backend = get_text_backend()
+        
+        # Long messages: EMOTION_LONG_TEXT=chunked classifies every overlapping
+        # 512-char window in one batch instead of truncating to the first one
+        self.long_text_mode = long_text_mode()
+        self.chunk_overlap_chars = int(os.environ.get("EMOTION_CHUNK_OVERLAP", "128"))
+        
+        # Requests carrying an "id" run on this pool and are answered as soon as
+        # they finish; requests without one keep strict in-order replies
+        self.worker_threads = max(1, int(os.environ.get("EMOTION_WORKER_THREADS", "4")))
+        self.executor = ThreadPoolExecutor(max_workers=self.worker_threads, thread_name_prefix="emotion-worker")
+        # Combined mode runs its voice branch here while the text branch runs on the
+        # request's own thread (a separate pool, so nested submits cannot deadlock)
+        self.branch_threads = max(1, int(os.environ.get("EMOTION_BRANCH_THREADS", "2")))
+        self.branch_executor = ThreadPoolExecutor(max_workers=self.branch_threads, thread_name_prefix="emotion-branch")
+        self.output_lock = threading.Lock()
+        # Set by socket_server.SocketEmotionServer in --listen mode
+        self.listener = None
+        
+        # Streaming voice sessions (voice_stream.py), evicted after
+        # EMOTION_STREAM_IDLE_SECONDS without a push
+        self.voice_streams = {}
+        self.stream_lock = threading.Lock()
+        self.stream_counter = 0
+        self.max_streams = max(1, int(os.environ.get("EMOTION_MAX_STREAMS", "64")))
+        self.stream_idle_seconds = float(os.environ.get("EMOTION_STREAM_IDLE_SECONDS", "120"))
+        
         # FORCE CPU for emotion detection (training compatibility)
         print("💻 Forcing CPU mode for emotion detection (training compatibility)", file=sys.stderr)
         self.device = -1  # Force CPU usage
         
-        if torch.cuda.is_available():
-            gpu_name = torch.cuda.get_device_name(0)
-            gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1024**3
-            print(f"🎮 GPU Available: {gpu_name} ({gpu_memory:.1f}GB) - but using CPU", file=sys.stderr)
-        
         print("� Emotion detection will use CPU for stability and training compatibility", file=sys.stderr)
         
         print(f"� Persistent Emotion Server - Attempting device: {'GPU' if self.device == 0 else 'CPU'}", file=sys.stderr)
+        print(f"🧩 Enabled modes: {', '.join(mode for mode in SERVER_MODES if mode in self.modes)}", file=sys.stderr)
         
-        # Load model at startup
-        self.load_text_model()
+        # Load only what the enabled modes need
+        load_start = time.perf_counter()
+        if self.modes & TEXT_MODES:
+            self.load_text_model()
+        
+        # spaCy context pipeline is loaded once here, not per text_with_context request
+        self.context_extractor = ContextExtractor()
+        if "text_with_context" in self.modes:
+            self.context_extractor.load()
+        
+        if self.modes & VOICE_MODES:
+            timed_import("numpy")
+            timed_import("librosa")
+        
+        # Weight loading time excludes the heavy imports it triggered
+        self.import_seconds = sum(IMPORT_TIMES.values())
+        self.load_seconds = max(0.0, time.perf_counter() - load_start - self.import_seconds)
+        self.warmup_summary = None
+        print(f"⏱️ Import times: {import_report()}", file=sys.stderr)
         
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self.shutdown_handler)
@@ -56,6 +139,75 @@ class PersistentEmotionDetector:
         print("🛑 Shutting down emotion detection server...", file=sys.stderr)
         self.running = False
         
+    def warm_up(self, runs=None):
+        """Run representative inferences for every enabled mode before reporting ready"""
+        runs = warmup_runs("EMOTION") if runs is None else runs
+        steps = []
+        
+        # Straight to the model/pipeline, and voice without the feature cache: warm-up never
+        # fills the result caches, and every run really decodes and extracts
+        if self.model_loaded and self.modes & TEXT_MODES:
+            steps.append(lambda: self.text_model(WARMUP_TEXTS[:1], batch_size=1))
+            steps.append(lambda: self.text_model(WARMUP_TEXTS, batch_size=len(WARMUP_TEXTS)))
+        if "text_with_context" in self.modes and self.context_extractor.nlp is not None:
+            steps.append(lambda: list(self.context_extractor.nlp.pipe(WARMUP_TEXTS)))
+        
+        audio_path = None
+        if self.modes & VOICE_MODES:
+            audio_path = self._write_warmup_audio()
+            if audio_path:
+                steps.append(lambda: self.detect_voice_emotion(audio_path, use_cache=False))
+        
+        try:
+            if runs and steps:
+                print(f"🔥 Warming up ({runs} runs)...", file=sys.stderr)
+            self.warmup_summary = run_warmup(lambda: [step() for step in steps], runs if steps else 0)
+        finally:
+            if audio_path:
+                try:
+                    os.remove(audio_path)
+                except OSError:
+                    pass
+        
+        if self.warmup_summary["runs"]:
+            print(f"🔥 Warm-up done: p50 {self.warmup_summary['p50_ms']:.1f}ms "
+                  f"(first {self.warmup_summary['first_ms']:.1f}ms)", file=sys.stderr)
+        return self.warmup_summary
+    
+    def _write_warmup_audio(self):
+        """One second of a voiced-like 16kHz tone written to a temporary WAV file"""
+        try:
+            import wave
+            import tempfile
+            np = timed_import("numpy")
+            
+            t = np.arange(16000, dtype=np.float32) / 16000.0
+            tone = 0.2 * np.sin(2 * np.pi * 180.0 * t) + 0.05 * np.sin(2 * np.pi * 360.0 * t)
+            handle, audio_path = tempfile.mkstemp(suffix=".wav", prefix="emotion_warmup_")
+            os.close(handle)
+            with wave.open(audio_path, "wb") as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(16000)
+                wav_file.writeframes((tone * 32767).astype("<i2").tobytes())
+            return audio_path
+        except Exception as audio_error:
+            print(f"⚠️ Voice warm-up skipped: {audio_error}", file=sys.stderr)
+            return None
+    
+    def emit_ready(self, warmup=None, **extra):
+        """Structured readiness event (server_readiness.py) for the Node service"""
+        return emit_ready(
+            "emotion",
+            self.import_seconds,
+            self.load_seconds,
+            warmup if warmup is not None else self.warmup_summary,
+            modes=[mode for mode in SERVER_MODES if mode in self.modes],
+            backend=self.text_backend,
+            imports={name: round(seconds, 3) for name, seconds in IMPORT_TIMES.items()},
+            **extra
+        )
+    
     def load_text_model(self):
         """Load RoBERTa model on CPU for training compatibility"""
         # Since we're forcing CPU, skip GPU attempt entirely
@@ -63,29 +215,22 @@ class PersistentEmotionDetector:
         print("💻 CPU Strategy: Using stable memory-efficient settings", file=sys.stderr)
         
         try:
-            with open(os.devnull, 'w') as devnull:
-                import contextlib
-                with contextlib.redirect_stdout(devnull):
-                    self.text_model = pipeline(
-                        "text-classification",
-                        model="SamLowe/roberta-base-go_emotions",
-                        tokenizer="SamLowe/roberta-base-go_emotions",
-                        device=-1,  # CPU
-                        return_all_scores=True,
-                        model_kwargs={
-                            "torch_dtype": torch.float32,  # Use float32 for CPU
-                            "low_cpu_mem_usage": True,
-                            "device_map": None
-                        }
-                    )
+            if self.text_backend != "onnx":
+                torch = timed_import("torch")
+                if torch.cuda.is_available():
+                    gpu_name = torch.cuda.get_device_name(0)
+                    gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1024**3
+                    print(f"🎮 GPU Available: {gpu_name} ({gpu_memory:.1f}GB) - but using CPU", file=sys.stderr)
+            
+            # EMOTION_TEXT_BACKEND picks fp32 torch (default), torch_int8 or onnx
+            print(f"⚙️ Text inference backend: {self.text_backend}", file=sys.stderr)
+            self.text_model = load_text_classifier(self.text_backend)
             
             # Force garbage collection
             gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
             
             self.model_loaded = True
-            print("✅ RoBERTa model loaded on CPU successfully!", file=sys.stderr)
+            print(f"✅ RoBERTa model loaded on CPU successfully! ({self.text_backend})", file=sys.stderr)
             print("💻 Using CPU for emotion detection", file=sys.stderr)
             
         except Exception as cpu_error:
@@ -94,93 +239,185 @@ class PersistentEmotionDetector:
     
     def detect_text_emotion(self, text, language="en"):
         """Fast text emotion detection using cached model"""
-        try:
-            if not self.model_loaded or not self.text_model:
-                return {"emotion": "neutral", "confidence": 0.5, "error": "Model not loaded"}
-            
+        return self.detect_text_emotion_batch([text], [language])[0]
+    
+    def detect_text_emotion_batch(self, texts, languages=None):
+        """Batched text emotion detection - one pipeline call for many texts"""
+        if not self.model_loaded or not self.text_model:
+            return [{"emotion": "neutral", "confidence": 0.5, "error": "Model not loaded"} for _ in texts]
+        
+        results = [None] * len(texts)
+        pending = {}  # cache key -> (model input, [indices])
+        
+        for index, text in enumerate(texts):
             if not text or len(text.strip()) < 2:
-                return {"emotion": "neutral", "confidence": 0.5}
-            
-            # Process with cached model (very fast)
-            processed_text = text.strip()[:512]
-            results = self.text_model(processed_text)
-            
-            # Fast processing
-            emotion_scores = {}
-            top_emotion = {"label": "neutral", "score": 0.0}
+                results[index] = {"emotion": "neutral", "confidence": 0.5}
+                continue
             
-            if isinstance(results, list) and len(results) > 0:
-                scores = results[0] if isinstance(results[0], list) else results
-                
-                for item in scores:
-                    if isinstance(item, dict) and "label" in item and "score" in item:
-                        emotion_scores[item["label"]] = item["score"]
-                        if item["score"] > top_emotion["score"]:
-                            top_emotion = item
-            
-            # Use raw emotion labels directly for better accuracy
-            detected_emotion = top_emotion["label"]
+            language = languages[index] if languages else "en"
+            key = text_cache_key(text, language)
+            if key in pending:
+                # Same text twice in one batch - run it once
+                pending[key][1].append(index)
+                continue
             
-            # Only do minimal mapping for technical labels
-            if detected_emotion in ["neutral", "realization"]:
-                detected_emotion = "neutral"
-            
-            return {
-                "emotion": detected_emotion,  # Use raw label directly
-                "confidence": float(top_emotion["score"]),
-                "all_scores": emotion_scores,
-                "raw_label": top_emotion["label"],
-                "method": "persistent_model_raw"
-            }
+            cached = self.text_cache.get(key)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending[key] = (text.strip()[:512], [index])
+        
+        if pending:
+            keys = list(pending.keys())
+            batch_texts = [pending[key][0] for key in keys]
+            try:
+                # Single forward pass for the whole batch (padded to the longest text)
+                outputs = self.text_model(batch_texts, batch_size=min(len(batch_texts), self.batch_max_size))
+                for key, output in zip(keys, outputs):
+                    result = self._format_text_result(output)
+                    self.text_cache.put(key, result)
+                    for index in pending[key][1]:
+                        results[index] = dict(result)
+            except Exception as e:
+                for key in keys:
+                    for index in pending[key][1]:
+                        results[index] = {"emotion": "neutral", "confidence": 0.5, "error": str(e)}
+        
+        return results
+    
+    def detect_text_emotion_chunked(self, text, language="en", aggregate="mean", return_chunks=False):
+        """Long text emotion: overlapping sentence windows, one batched pass, aggregated scores"""
+        windows = split_into_windows(text or "", max_chars=512, overlap_chars=self.chunk_overlap_chars)
+        if len(windows) <= 1:
+            return self.detect_text_emotion(text, language)
+        
+        window_results = self.detect_text_emotion_batch(windows, [language] * len(windows))
+        scored = [(window, result) for window, result in zip(windows, window_results) if "all_scores" in result]
+        if not scored:
+            return window_results[0]
+        
+        scores = aggregate_scores(
+            [result["all_scores"] for _, result in scored],
+            weights=[len(window) for window, _ in scored],
+            method=aggregate
+        )
+        result = self._format_text_result([{"label": label, "score": score} for label, score in scores.items()])
+        result.update({
+            "method": "persistent_model_chunked",
+            "chunks": len(windows),
+            "aggregation": aggregate
+        })
+        
+        if return_chunks:
+            result["chunk_scores"] = [
+                {
+                    "text": window[:80],
+                    "emotion": window_result["emotion"],
+                    "confidence": window_result["confidence"],
+                    "all_scores": window_result.get("all_scores", {})
+                }
+                for window, window_result in zip(windows, window_results)
+            ]
+        
+        return result
+    
+    def _wants_chunking(self, request):
+        if "chunked" in request:
+            return bool(request["chunked"])
+        return self.long_text_mode == "chunked" and len((request.get("text") or "").strip()) > 512
+    
+    def _format_text_result(self, output):
+        """Convert raw pipeline scores for one text into the response format"""
+        emotion_scores = {}
+        top_emotion = {"label": "neutral", "score": 0.0}
+        
+        if isinstance(output, dict):
+            output = [output]
+        
+        if isinstance(output, list) and len(output) > 0:
+            scores = output[0] if isinstance(output[0], list) else output
             
-        except Exception as e:
-            return {"emotion": "neutral", "confidence": 0.5, "error": str(e)}
+            for item in scores:
+                if isinstance(item, dict) and "label" in item and "score" in item:
+                    emotion_scores[item["label"]] = item["score"]
+                    if item["score"] > top_emotion["score"]:
+                        top_emotion = item
+        
+        # Use raw emotion labels directly for better accuracy
+        detected_emotion = top_emotion["label"]
+        
+        # Only do minimal mapping for technical labels
+        if detected_emotion in ["neutral", "realization"]:
+            detected_emotion = "neutral"
+        
+        return {
+            "emotion": detected_emotion,  # Use raw label directly
+            "confidence": float(top_emotion["score"]),
+            "all_scores": emotion_scores,
+            "raw_label": top_emotion["label"],
+            "method": "persistent_model_raw"
+        }
     
     def detect_text_emotion_with_context(self, text, language="en"):
-        """Text emotion detection with context extraction using spaCy"""
+        """Text emotion detection with context extraction using the persistent spaCy pipeline"""
         try:
             # First get emotion detection
             emotion_result = self.detect_text_emotion(text, language)
             
-            # Add context extraction
-            try:
-                import spacy
-                nlp = spacy.load("en_core_web_sm")
-                doc = nlp(text)
-                
-                # Extract entities and important words
-                entities = [ent.text for ent in doc.ents]
-                important_words = [token.lemma_ for token in doc 
-                                 if token.pos_ in ['NOUN', 'VERB', 'ADJ'] 
-                                 and not token.is_stop 
-                                 and len(token.text) > 2]
-                
-                # Combine and deduplicate context
-                context = list(set(entities + important_words))
-                
-                # Add context to result
-                emotion_result["context"] = context
-                
-            except Exception as context_error:
-                print(f"Context extraction failed: {context_error}", file=sys.stderr)
-                # Fallback: simple word extraction
-                words = text.split()
-                context = [word for word in words if len(word) > 3][:5]
-                emotion_result["context"] = context
+            # Add context extraction (falls back to simple word extraction without spaCy)
+            emotion_result["context"] = self.context_extractor.extract(text or "")
             
             return emotion_result
             
         except Exception as e:
             return {"emotion": "neutral", "confidence": 0.5, "context": [], "error": str(e)}
     
-    def detect_voice_emotion(self, audio_path):
-        """Fast voice emotion detection using spectral analysis"""
+    def detect_voice_emotion(self, audio_path, audio_bytes=None, audio_format=None, use_cache=True):
+        """Fast voice emotion detection using spectral analysis
+        audio_bytes (a binary frame body) is decoded in memory instead of reading audio_path;
+        audio_format carries format/sample_rate/channels for headerless PCM.
+        use_cache=False neither reads nor fills the feature cache (warm-up)."""
         try:
-            if not os.path.exists(audio_path):
+            if audio_bytes is None and not os.path.exists(audio_path):
                 return {"emotion": "neutral", "confidence": 0.5, "error": "Audio file not found"}
             
-            # Fast spectral analysis
-            y, sr = librosa.load(audio_path, duration=10.0, sr=16000)
+            # Same audio content seen before: features from the shared cache (feature_cache.py)
+            audio_format = audio_format or {}
+            cache_profile = "server_voice:{}:{}:{}".format(
+                audio_format.get("format"), audio_format.get("sample_rate"), audio_format.get("channels", 1))
+            if not use_cache:
+                cache_key = None
+            elif audio_bytes is not None:
+                cache_key = self.feature_cache.key_for_bytes(audio_bytes, cache_profile)
+            else:
+                cache_key = self.feature_cache.key_for_file(audio_path, cache_profile)
+            cached = self.feature_cache.get(cache_key)
+            if cached is not None:
+                summary, _, tier = cached
+                features = summary["features"]
+                emotion, confidence = classify_energy_zcr(features["energy"], features["zcr"])
+                return {
+                    "emotion": emotion,
+                    "confidence": confidence,
+                    "features": features,
+                    "decode_ms": 0.0,
+                    "decoder": summary["decoder"],
+                    "feature_cache": tier,
+                    "method": "fast_spectral"
+                }
+            
+            np = timed_import("numpy")
+            
+            # Native 16 kHz PCM WAV is memory-mapped (or read in place); anything else goes through librosa
+            if audio_bytes is not None:
+                y, sr, audio_info = decode_audio(
+                    audio_bytes, sr=16000, duration=10.0,
+                    pcm_format=audio_format.get("format"),
+                    sample_rate=audio_format.get("sample_rate"),
+                    channels=audio_format.get("channels", 1)
+                )
+            else:
+                y, sr, audio_info = load_audio(audio_path, sr=16000, duration=10.0)
             
             if len(y) == 0:
                 return {"emotion": "neutral", "confidence": 0.5}
@@ -189,56 +426,132 @@ class PersistentEmotionDetector:
             rms = np.sqrt(np.mean(y**2))
             zcr = float(np.mean(np.abs(np.diff(np.sign(y)))))
             
-            # Simple emotion detection
-            emotion = "neutral"
-            confidence = 0.6
-            
-            if rms > 0.1:
-                emotion = "anger" if zcr > 0.8 else "joy"
-                confidence = 0.7
-            elif rms < 0.05:
-                emotion = "sadness"
-                confidence = 0.65
-            elif zcr > 1.0:
-                emotion = "fear"
-                confidence = 0.6
+            # Simple emotion detection (same rules as the streaming sessions)
+            emotion, confidence = classify_energy_zcr(rms, zcr)
+            features = {"energy": float(rms), "zcr": zcr}
+            self.feature_cache.put(cache_key, {"features": features, "decoder": audio_info["decoder"]})
             
             return {
                 "emotion": emotion,
                 "confidence": confidence,
-                "features": {"energy": float(rms), "zcr": zcr},
+                "features": features,
+                "decode_ms": audio_info["decode_ms"],
+                "decoder": audio_info["decoder"],
+                "feature_cache": "miss",
                 "method": "fast_spectral"
             }
             
         except Exception as e:
             return {"emotion": "neutral", "confidence": 0.5, "error": str(e)}
     
+    def open_voice_stream(self, request):
+        """stream_open: start a live session; PCM arrives through stream_push"""
+        now = time.time()
+        with self.stream_lock:
+            for stream_id, stream in list(self.voice_streams.items()):
+                if now - stream.last_activity > self.stream_idle_seconds:
+                    del self.voice_streams[stream_id]
+            if len(self.voice_streams) >= self.max_streams:
+                return {"error": f"Too many open voice streams (max {self.max_streams})"}
+            
+            stream_id = request.get("stream_id")
+            if not stream_id:
+                self.stream_counter += 1
+                stream_id = f"stream-{os.getpid()}-{self.stream_counter}"
+            stream_id = str(stream_id)
+            
+            self.voice_streams[stream_id] = VoiceStream(
+                sample_rate=int(request.get("sample_rate", 16000)),
+                window_seconds=float(request.get("window_seconds", 3.0)),
+                pcm_format=request.get("format", "s16le")
+            )
+        
+        stream = self.voice_streams[stream_id]
+        return {
+            "stream_id": stream_id,
+            "sample_rate": stream.sample_rate,
+            "format": stream.pcm_format,
+            "window_seconds": stream.capacity / stream.sample_rate
+        }
+    
+    def process_stream_request(self, mode, request):
+        if mode == "stream_open":
+            return self.open_voice_stream(request)
+        
+        stream_id = str(request.get("stream_id", ""))
+        with self.stream_lock:
+            stream = self.voice_streams.get(stream_id)
+            if mode == "stream_close":
+                self.voice_streams.pop(stream_id, None)
+        if stream is None:
+            return {"emotion": "neutral", "confidence": 0.5, "stream_id": stream_id, "error": "Unknown voice stream"}
+        
+        if mode == "stream_push":
+            # Framed pushes carry raw PCM as the body instead of base64 "pcm"
+            result = stream.push(request[BODY_KEY] if BODY_KEY in request else request.get("pcm", ""))
+        else:
+            result = stream.estimate()
+            result["closed"] = True
+        result["stream_id"] = stream_id
+        return result
+    
     def process_request(self, request):
         """Process emotion detection request"""
         try:
             mode = request.get("mode", "text")
             
+            if mode in SERVER_MODES and mode not in self.modes:
+                return {"emotion": "neutral", "confidence": 0.5, "error": f"Mode '{mode}' is not enabled on this server"}
+            
+            if mode in STREAM_MODES:
+                if "voice" not in self.modes:
+                    return {"emotion": "neutral", "confidence": 0.5, "error": "Voice streaming needs the voice mode enabled"}
+                return self.process_stream_request(mode, request)
+            
             if mode == "text":
                 text = request.get("text", "")
                 language = request.get("language", "en")
+                if self._wants_chunking(request):
+                    return self.detect_text_emotion_chunked(
+                        text,
+                        language,
+                        aggregate=request.get("aggregate", "mean"),
+                        return_chunks=bool(request.get("return_chunks", False))
+                    )
                 return self.detect_text_emotion(text, language)
+            
+            elif mode == "stats":
+                return self.get_stats()
                 
             elif mode == "text_with_context":
                 text = request.get("text", "")
                 language = request.get("language", "en")
+                if self._wants_chunking(request):
+                    result = self.detect_text_emotion_chunked(
+                        text,
+                        language,
+                        aggregate=request.get("aggregate", "mean"),
+                        return_chunks=bool(request.get("return_chunks", False))
+                    )
+                    result["context"] = self.context_extractor.extract(text or "")
+                    return result
                 return self.detect_text_emotion_with_context(text, language)
                 
             elif mode == "voice":
                 audio_path = request.get("audio_path", "")
-                return self.detect_voice_emotion(audio_path)
+                return self.detect_voice_emotion(audio_path, request.get(BODY_KEY), request)
                 
             elif mode == "combined":
                 text = request.get("text", "")
                 audio_path = request.get("audio_path", "")
                 language = request.get("language", "en")
                 
-                text_result = self.detect_text_emotion(text, language)
-                voice_result = self.detect_voice_emotion(audio_path)
+                # Independent branches: latency is about the slower one, not the sum
+                results, timings = run_branches(self.branch_executor, {
+                    "text": lambda: self.detect_text_emotion(text, language),
+                    "voice": lambda: self.detect_voice_emotion(audio_path, request.get(BODY_KEY), request)
+                })
+                text_result, voice_result = results["text"], results["voice"]
                 
                 # Fast combination
                 if text_result["emotion"] == voice_result["emotion"]:
@@ -262,7 +575,8 @@ class PersistentEmotionDetector:
                         "method": "persistent_combined"
                     },
                     "text": text_result,
-                    "voice": voice_result
+                    "voice": voice_result,
+                    "timings": timings
                 }
             
             return {"emotion": "neutral", "confidence": 0.5, "error": "Unknown mode"}
@@ -270,50 +584,284 @@ class PersistentEmotionDetector:
         except Exception as e:
             return {"emotion": "neutral", "confidence": 0.5, "error": str(e)}
     
-    def run_server(self):
-        """Main server loop - reads JSON requests from stdin"""
-        print("📡 Emotion detection server ready for requests", file=sys.stderr)
+    def get_stats(self):
+        """Report micro-batching throughput and text cache hit rate"""
+        stats = self.batch_stats
+        report = {
+            "batching": {
+                "window_ms": self.batch_window_ms,
+                "max_batch_size": self.batch_max_size,
+                "batches": stats["batches"],
+                "items": stats["items"],
+                "max_batch": stats["max_batch"],
+                "avg_batch_size": stats["items"] / stats["batches"] if stats["batches"] else 0.0,
+                "inference_seconds": stats["inference_seconds"],
+                "throughput_per_sec": stats["items"] / stats["inference_seconds"] if stats["inference_seconds"] > 0 else 0.0
+            },
+            "modes": [mode for mode in SERVER_MODES if mode in self.modes],
+            "import_times": import_report(),
+            "load_seconds": self.load_seconds,
+            "warmup": self.warmup_summary,
+            "backend": self.text_backend,
+            "cache": self.text_cache.stats(),
+            "feature_cache": self.feature_cache.stats(),
+            "context": self.context_extractor.stats(),
+            "worker_threads": self.worker_threads,
+            "branch_threads": self.branch_threads,
+            "voice_streams": {"open": len(self.voice_streams), "max": self.max_streams},
+            "uptime_seconds": time.time() - self.started_at
+        }
+        if self.listener is not None:
+            report["listener"] = self.listener.stats()
+        return report
+    
+    def _decode_request(self, line):
+        """Parse one JSON line into (request, error_response); framed requests arrive already decoded"""
+        if isinstance(line, dict):
+            return line, None
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            return None, {"emotion": "neutral", "confidence": 0.5, "error": "Invalid JSON"}
         
-        while self.running:
-            try:
-                # Read request from stdin
-                line = sys.stdin.readline()
-                if not line:
+        if not isinstance(request, dict):
+            return None, {"emotion": "neutral", "confidence": 0.5, "error": "Invalid request"}
+        
+        return request, None
+    
+    def _is_batchable(self, request):
+        # Chunked long texts already run as one batch of their own windows
+        mode = request.get("mode", "text")
+        return mode in ("text", "text_with_context") and mode in self.modes and not self._wants_chunking(request)
+    
+    def _request_item(self, message, reply, frame_reply):
+        """Scheduler queue item for one read_message() result (None for blank lines)
+        Frames are answered with frames; their body rides along under BODY_KEY."""
+        kind, payload, body = message
+        if kind == "frame":
+            request = dict(payload)
+            if body:
+                request[BODY_KEY] = body
+            return (request, frame_reply)
+        line = payload.strip()
+        return (line, reply) if line else None
+    
+    def _read_requests(self, stream, requests, output_stream):
+        """Reader thread: push raw request lines and decoded frames onto the scheduler queue"""
+        reply = self._stream_writer(output_stream)
+        frame_reply = self._stream_writer(output_stream, framed=True)
+        try:
+            while True:
+                try:
+                    message = read_message(stream)
+                except FrameError as frame_error:
+                    # The stream cannot be resynchronized after a broken frame
+                    frame_reply({"emotion": "neutral", "confidence": 0.5, "error": f"Invalid frame: {frame_error}"})
                     break
-                    
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Parse JSON request
+                if message is None:
+                    break
+                item = self._request_item(message, reply, frame_reply)
+                if item is not None:
+                    requests.put(item)
+        finally:
+            requests.put(None)
+    
+    def _stream_writer(self, stream, framed=False):
+        """Reply callable writing one JSON line (or frame) per response (shared lock across threads)"""
+        def write(result):
+            data = encode_frame(result) if framed else (json.dumps(result) + "\n").encode("utf-8")
+            with self.output_lock:
+                stream.write(data)
+                stream.flush()
+        return write
+    
+    def _tag_reply(self, reply, request_id):
+        """Wrap a reply callable so every response echoes the request id"""
+        def tagged(result):
+            result = dict(result)
+            result["id"] = request_id
+            reply(result)
+        return tagged
+    
+    def _process_and_reply(self, request, reply):
+        reply(self.process_request(request))
+    
+    def _run_text_batch(self, batch):
+        """Run one batched forward pass and reply to each request in order"""
+        started = time.perf_counter()
+        texts = [request.get("text", "") for request, _ in batch]
+        languages = [request.get("language", "en") for request, _ in batch]
+        results = self.detect_text_emotion_batch(texts, languages)
+        
+        # text_with_context requests in the same batch share one nlp.pipe call
+        context_indices = [index for index, (request, _) in enumerate(batch)
+                           if request.get("mode") == "text_with_context"]
+        if context_indices:
+            contexts = self.context_extractor.extract_many([texts[index] or "" for index in context_indices])
+            for index, context in zip(context_indices, contexts):
+                results[index]["context"] = context
+        elapsed = time.perf_counter() - started
+        
+        self.batch_stats["batches"] += 1
+        self.batch_stats["items"] += len(batch)
+        self.batch_stats["max_batch"] = max(self.batch_stats["max_batch"], len(batch))
+        self.batch_stats["inference_seconds"] += elapsed
+        
+        for (_, reply), result in zip(batch, results):
+            reply(result)
+    
+    def _serve(self, requests):
+        """Scheduler loop: groups consecutive text requests into micro-batches"""
+        carried = deque()
+        window = self.batch_window_ms / 1000.0
+        
+        while self.running:
+            if carried:
+                item = carried.popleft()
+            else:
                 try:
-                    request = json.loads(line)
-                except json.JSONDecodeError:
-                    error_response = {"emotion": "neutral", "confidence": 0.5, "error": "Invalid JSON"}
-                    print(json.dumps(error_response))
-                    sys.stdout.flush()
+                    item = requests.get(timeout=0.5)
+                except queue.Empty:
                     continue
-                
-                # Process request
-                result = self.process_request(request)
-                
-                # Send response
-                print(json.dumps(result))
-                sys.stdout.flush()
-                
-            except KeyboardInterrupt:
+            
+            if item is None:
                 break
-            except Exception as e:
-                error_response = {"emotion": "neutral", "confidence": 0.5, "error": str(e)}
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+            
+            line, reply = item
+            request, error = self._decode_request(line)
+            if error is not None:
+                reply(error)
+                continue
+            
+            if "id" in request:
+                reply = self._tag_reply(reply, request["id"])
+            
+            if not self._is_batchable(request):
+                # Stream pushes stay on the scheduler thread: cheap, and a session's
+                # chunks must be applied in the order they were sent
+                if "id" in request and request.get("mode") not in STREAM_MODES:
+                    # Multiplexed request: answer out of order when it completes
+                    self.executor.submit(self._process_and_reply, request, reply)
+                else:
+                    reply(self.process_request(request))
+                continue
+            
+            # Collect more text requests until the window closes or the batch is full.
+            # Anything else is carried over so responses keep their arrival order.
+            batch = [(request, reply)]
+            deadline = time.perf_counter() + window
+            while len(batch) < self.batch_max_size and not carried:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    next_item = requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                
+                if next_item is not None:
+                    next_request, next_error = self._decode_request(next_item[0])
+                    if next_error is None and self._is_batchable(next_request):
+                        next_reply = next_item[1]
+                        if "id" in next_request:
+                            next_reply = self._tag_reply(next_reply, next_request["id"])
+                        batch.append((next_request, next_reply))
+                        continue
+                carried.append(next_item)
+            
+            self._run_text_batch(batch)
+    
+    def run_server(self, input_stream=None, output_stream=None, announce=True):
+        """Main server loop - reads JSON lines or binary frames from stdin (or the given binary streams)"""
+        input_stream = binary_stream(input_stream or sys.stdin)
+        output_stream = binary_stream(output_stream or sys.stdout)
+        
+        if announce:
+            print(f"📦 Micro-batching text requests: window {self.batch_window_ms:.1f}ms, "
+                  f"max batch {self.batch_max_size}", file=sys.stderr)
+            print(f"🧵 Requests with an id run on {self.worker_threads} worker threads", file=sys.stderr)
+            self.emit_ready()
+            print("📡 Emotion detection server ready for requests", file=sys.stderr)
         
-        print("🛑 Emotion detection server stopped", file=sys.stderr)
+        requests = queue.Queue()
+        reader = threading.Thread(
+            target=self._read_requests,
+            args=(input_stream, requests, output_stream),
+            daemon=True
+        )
+        reader.start()
+        
+        try:
+            self._serve(requests)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Let in-flight multiplexed requests write their responses
+            self.executor.shutdown(wait=True)
+        
+        batching = self.get_stats()["batching"]
+        print(f"📊 Served {batching['items']} text requests in {batching['batches']} batches "
+              f"(avg {batching['avg_batch_size']:.1f}, {batching['throughput_per_sec']:.1f} texts/s)", file=sys.stderr)
+        if announce:
+            print("🛑 Emotion detection server stopped", file=sys.stderr)
+
+def parse_modes(value):
+    """'text,voice' -> {'text', 'voice', 'combined'}; combined comes with text + voice"""
+    modes = {mode.strip() for mode in value.split(",") if mode.strip()}
+    unknown = modes - set(SERVER_MODES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown mode(s): {', '.join(sorted(unknown))}")
+    if {"text", "voice"} <= modes:
+        modes.add("combined")
+    return modes
 
 def main():
     """Start the persistent emotion detection server"""
+    parser = argparse.ArgumentParser(description="Persistent emotion detection server (JSON lines over stdin/stdout)")
+    parser.add_argument(
+        "--modes",
+        type=parse_modes,
+        default=parse_modes(os.environ.get("EMOTION_MODES", ",".join(SERVER_MODES))),
+        help="comma-separated modes to enable: text, text_with_context, voice, combined (default: all)"
+    )
+    parser.add_argument(
+        "--listen",
+        type=parse_listen_address,
+        default=parse_listen_address(os.environ["EMOTION_LISTEN"]) if os.environ.get("EMOTION_LISTEN") else None,
+        help="serve many clients on unix:/path/to.sock or tcp:host:port instead of stdin/stdout"
+    )
+    parser.add_argument(
+        "--max-inflight",
+        type=int,
+        default=int(os.environ.get("EMOTION_MAX_INFLIGHT", "64")),
+        help="unanswered requests allowed per connection in --listen mode (default: 64)"
+    )
+    args = parser.parse_args()
+    
     try:
-        detector = PersistentEmotionDetector()
+        detector = PersistentEmotionDetector(modes=args.modes)
+        
+        # EMOTION_WORKERS > 1: fork workers that share the loaded weights copy-on-write
+        workers = int(os.environ.get("EMOTION_WORKERS", "1"))
+        
+        if args.listen:
+            # One warm model shared by every connecting app process
+            if workers > 1:
+                print("⚠️ --listen runs a single process; EMOTION_WORKERS is ignored", file=sys.stderr)
+            detector.warm_up()
+            SocketEmotionServer(detector, args.listen, args.max_inflight).run()
+            return
+        
+        if workers > 1 and prefork_supported():
+            threads = os.environ.get("EMOTION_THREADS_PER_WORKER")
+            pool = PreforkWorkerPool(detector, workers, int(threads) if threads else None)
+            pool.start()
+            pool.run()
+            return
+        if workers > 1:
+            print("⚠️ Pre-fork worker pool needs os.fork - running a single process", file=sys.stderr)
+        
+        detector.warm_up()
         detector.run_server()
     except Exception as e:
         print(f"❌ Server error: {e}", file=sys.stderr)
@@ -6,6 +6,8 @@ Specially configured for 4GB VRAM with smart memory management
 
 import sys
 import json
+import time
+_IMPORT_START = time.perf_counter()
 import warnings
 import gc
 import torch
@@ -14,9 +16,17 @@ import librosa
 import numpy as np
 import os
 from transformers.utils import logging as transformers_logging
+from text_backends import get_text_backend, load_text_classifier
+from server_readiness import warmup_runs, run_warmup, emit_ready
 import signal
 import threading
-import time
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+
+WARMUP_TEXTS = [
+    "Hello, how are you today?",
+    "I am so stressed about my exams next week and I can't sleep.",
+    "I finally said the whole sentence without stopping, I'm so happy!"
+]
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings("ignore")
@@ -28,6 +38,9 @@ class GPUOptimizedEmotionDetector:
         self.device = None
         self.model_loaded = False
         self.running = True
+        self.text_backend = get_text_backend()
+        self.load_seconds = 0.0
+        self.warmup_summary = None
         
         # Smart GPU detection for RTX 2050
         if torch.cuda.is_available():
@@ -45,7 +58,9 @@ class GPUOptimizedEmotionDetector:
             self.device = -1
         
         # Load model at startup
+        load_start = time.perf_counter()
         self.load_text_model()
+        self.load_seconds = time.perf_counter() - load_start
         
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self.shutdown_handler)
@@ -77,17 +92,22 @@ class GPUOptimizedEmotionDetector:
                     "max_memory": {0: "3.5GB"},  # Reserve 0.5GB for other processes
                 })
             
-            with open(os.devnull, 'w') as devnull:
-                import contextlib
-                with contextlib.redirect_stdout(devnull):
-                    self.text_model = pipeline(
-                        "text-classification",
-                        model="SamLowe/roberta-base-go_emotions",
-                        tokenizer="SamLowe/roberta-base-go_emotions",
-                        device=self.device,
-                        return_all_scores=True,
-                        model_kwargs=model_kwargs
-                    )
+            if self.device == -1:
+                # CPU path honours EMOTION_TEXT_BACKEND (torch, torch_int8, onnx)
+                print(f"⚙️ Text inference backend: {self.text_backend}", file=sys.stderr)
+                self.text_model = load_text_classifier(self.text_backend)
+            else:
+                with open(os.devnull, 'w') as devnull:
+                    import contextlib
+                    with contextlib.redirect_stdout(devnull):
+                        self.text_model = pipeline(
+                            "text-classification",
+                            model="SamLowe/roberta-base-go_emotions",
+                            tokenizer="SamLowe/roberta-base-go_emotions",
+                            device=self.device,
+                            return_all_scores=True,
+                            model_kwargs=model_kwargs
+                        )
             
             # Memory cleanup after loading
             gc.collect()
@@ -107,20 +127,7 @@ class GPUOptimizedEmotionDetector:
             # Fallback to CPU
             self.device = -1
             try:
-                with open(os.devnull, 'w') as devnull:
-                    import contextlib
-                    with contextlib.redirect_stdout(devnull):
-                        self.text_model = pipeline(
-                            "text-classification",
-                            model="SamLowe/roberta-base-go_emotions",
-                            tokenizer="SamLowe/roberta-base-go_emotions",
-                            device=-1,  # CPU
-                            return_all_scores=True,
-                            model_kwargs={
-                                "low_cpu_mem_usage": True,
-                                "torch_dtype": torch.float32
-                            }
-                        )
+                self.text_model = load_text_classifier(self.text_backend)
                 self.model_loaded = True
                 print("✅ Fallback to CPU successful", file=sys.stderr)
             except Exception as cpu_error:
@@ -173,8 +180,29 @@ class GPUOptimizedEmotionDetector:
             print(f"❌ Text emotion detection error: {e}", file=sys.stderr)
             return {"emotion": "neutral", "confidence": 0.5, "error": str(e)}
 
+    def warm_up(self, runs=None):
+        """Representative inferences before readiness (EMOTION_WARMUP_RUNS)"""
+        runs = warmup_runs("EMOTION") if runs is None else runs
+        if not self.model_loaded or not self.text_model:
+            runs = 0
+        
+        def infer_once():
+            for text in WARMUP_TEXTS:
+                self.text_model(text)
+        
+        self.warmup_summary = run_warmup(infer_once, runs)
+        return self.warmup_summary
+    
     def run(self):
         """Main server loop with RTX 2050 optimizations"""
+        emit_ready(
+            "emotion_gpu",
+            IMPORT_SECONDS,
+            self.load_seconds,
+            self.warmup_summary,
+            device="GPU" if self.device == 0 else "CPU",
+            backend=self.text_backend
+        )
         print("📡 Emotion detection server ready for requests", file=sys.stderr)
         
         while self.running:
@@ -219,6 +247,7 @@ class GPUOptimizedEmotionDetector:
 if __name__ == "__main__":
     try:
         detector = GPUOptimizedEmotionDetector()
+        detector.warm_up()
         detector.run()
     except KeyboardInterrupt:
         print("🛑 Server interrupted", file=sys.stderr)
@@ -0,0 +1,275 @@
+"""
+Content-addressed feature cache shared by the voice analyzers
+The same utterance is often analyzed more than once (retries, combined mode,
+dashboard recomputation). Entries are keyed on a hash of the audio content
+plus an analysis profile string, so a renamed or re-uploaded copy still hits
+and a changed file or setting misses.
+- Values: a JSON summary (decode metadata, feature summaries) plus optional
+  numpy arrays (e.g. a pooled embedding)
+- Memory tier: LRU bounded by entries and bytes
+- Disk tier (FEATURE_CACHE_DIR): one .npz per entry, oldest evicted past
+  FEATURE_CACHE_DISK_MAX_MB, promoted to memory on a hit
+- A file's content hash is remembered per (path, size, mtime), so a repeated
+  lookup of an unchanged file costs a stat call, not a read
+Thread-safe; one process-wide instance (get_feature_cache) serves every analyzer.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from lazy_imports import timed_import
+
+# Bump when a cached summary's meaning changes - old entries then simply miss
+CACHE_VERSION = 2
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def _digest_file(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    # Rough per-entry bookkeeping cost (OrderedDict node, tuple, dict headers)
+    ENTRY_OVERHEAD_BYTES = 200
+
+    def __init__(self, max_entries=512, max_bytes=32 * 1024 * 1024, disk_dir=None,
+                 disk_max_bytes=256 * 1024 * 1024):
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self.disk_dir = disk_dir or None
+        self.disk_max_bytes = max(0, int(disk_max_bytes))
+        self.entries = OrderedDict()  # key -> (serialized summary, {name: array}, size)
+        self.file_digests = OrderedDict()  # (path, size, mtime_ns) -> content digest
+        self.bytes_used = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+                self.disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.disk_dir)
+                                      if entry.name.endswith(".npz"))
+            except OSError as e:
+                print(f"⚠️ Feature cache directory unavailable ({e}); memory only", file=sys.stderr)
+                self.disk_dir = None
+
+    @classmethod
+    def from_env(cls, prefix="FEATURE_CACHE"):
+        """<prefix>_MAX_ENTRIES, <prefix>_MAX_MB, <prefix>_DIR (disk tier, off when unset), <prefix>_DISK_MAX_MB"""
+        return cls(
+            max_entries=int(os.environ.get(f"{prefix}_MAX_ENTRIES", "512")),
+            max_bytes=int(float(os.environ.get(f"{prefix}_MAX_MB", "32")) * 1024 * 1024),
+            disk_dir=os.environ.get(f"{prefix}_DIR") or None,
+            disk_max_bytes=int(float(os.environ.get(f"{prefix}_DISK_MAX_MB", "256")) * 1024 * 1024)
+        )
+
+    @property
+    def enabled(self):
+        return bool((self.max_entries and self.max_bytes) or self.disk_dir)
+
+    # -- keys -----------------------------------------------------------------------
+
+    def key_for_file(self, path, profile):
+        """Cache key for a file's content under `profile`; None when the cache is off or the file unreadable"""
+        if not self.enabled:
+            return None
+        try:
+            stat = os.stat(path)
+            identity = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+            with self.lock:
+                digest = self.file_digests.get(identity)
+                if digest is not None:
+                    self.file_digests.move_to_end(identity)
+            if digest is None:
+                digest = _digest_file(path)
+                with self.lock:
+                    self.file_digests[identity] = digest
+                    while len(self.file_digests) > max(self.max_entries, 1) * 4:
+                        self.file_digests.popitem(last=False)
+        except OSError:
+            return None
+        return self._key(digest, profile)
+
+    def key_for_bytes(self, data, profile):
+        """Cache key for in-memory audio (e.g. a binary frame body) under `profile`"""
+        if not self.enabled:
+            return None
+        return self._key(hashlib.blake2b(data, digest_size=16).hexdigest(), profile)
+
+    @staticmethod
+    def _key(digest, profile):
+        return f"v{CACHE_VERSION}:{profile}:{digest}"
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", key) + ".npz")
+
+    # -- lookups --------------------------------------------------------------------
+
+    def get(self, key):
+        """(summary, arrays, tier) with tier "memory" or "disk", or None on a miss"""
+        if key is None:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if entry is not None:
+            # Summaries are stored serialized so callers can mutate what they get back
+            return json.loads(entry[0]), dict(entry[1]), "memory"
+
+        loaded = self._load_disk(key)
+        with self.lock:
+            if loaded is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        summary, arrays = loaded
+        self._put_memory(key, json.dumps(summary), arrays)
+        return summary, dict(arrays), "disk"
+
+    def put(self, key, summary, arrays=None):
+        """Store a JSON-serializable summary and optional numpy arrays under key"""
+        if key is None:
+            return
+        serialized = json.dumps(summary)
+        # Frozen copies: the caller keeps ownership of (and may still edit) its own arrays
+        arrays = {name: array.copy() for name, array in (arrays or {}).items()}
+        for array in arrays.values():
+            array.flags.writeable = False
+        self._put_memory(key, serialized, arrays)
+        self._store_disk(key, serialized, arrays)
+
+    def _put_memory(self, key, serialized, arrays):
+        if not self.max_entries or not self.max_bytes:
+            return
+        size = (len(key) + len(serialized) + sum(array.nbytes for array in arrays.values())
+                + self.ENTRY_OVERHEAD_BYTES)
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes_used -= previous[2]
+            self.entries[key] = (serialized, arrays, size)
+            self.bytes_used += size
+
+            while self.entries and (len(self.entries) > self.max_entries or self.bytes_used > self.max_bytes):
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.bytes_used -= evicted_size
+                self.evictions += 1
+
+    # -- disk tier ------------------------------------------------------------------
+
+    def _load_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            np = timed_import("numpy")
+            with np.load(path, allow_pickle=False) as stored:
+                summary = json.loads(str(stored["__summary__"]))
+                arrays = {name: stored[name] for name in stored.files if name != "__summary__"}
+            os.utime(path)  # recency for disk eviction
+            return summary, arrays
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _store_disk(self, key, serialized, arrays):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            np = timed_import("numpy")
+            with open(temp_path, "wb") as handle:
+                np.savez(handle, __summary__=np.array(serialized), **arrays)
+            size = os.path.getsize(temp_path)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"⚠️ Feature cache write failed: {e}", file=sys.stderr)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        with self.lock:
+            self.disk_bytes += size - previous
+            over_limit = self.disk_bytes > self.disk_max_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Remove least recently used .npz files until the disk tier fits its limit again"""
+        try:
+            files = sorted(
+                (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                for entry in os.scandir(self.disk_dir) if entry.name.endswith(".npz")
+            )
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self.lock:
+            self.disk_bytes = total
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.file_digests.clear()
+            self.bytes_used = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "bytes_used": self.bytes_used,
+                "max_bytes": self.max_bytes,
+                "disk_dir": self.disk_dir,
+                "disk_bytes": self.disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_feature_cache():
+    """The process-wide cache, built from FEATURE_CACHE_* on first use"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = FeatureCache.from_env()
+    return _shared_cache
@@ -0,0 +1,96 @@
+"""
+Length-prefixed binary frames for the persistent servers
+Audio travels in-band as raw bytes instead of a temp file path or base64:
+
+    b"\\x00FLF" | uint32 header length | uint32 body length | JSON header | body
+    (lengths little-endian)
+
+A frame starts with a NUL byte, which a JSON-lines request never does, so
+frames and plain JSON lines can be mixed on the same stream. Requests sent as
+frames are answered with frames (header = the usual JSON response, empty body
+unless the response carries audio); JSON-line requests get JSON lines.
+"""
+
+import json
+import struct
+
+MAGIC = b"\x00FLF"
+PREFIX = struct.Struct("<II")
+MAX_HEADER_BYTES = 1024 * 1024
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# Request key the servers attach a decoded frame's body under
+BODY_KEY = "_body"
+
+
+class FrameError(ValueError):
+    pass
+
+
+def encode_frame(header, body=b""):
+    header_bytes = json.dumps(header).encode("utf-8")
+    return MAGIC + PREFIX.pack(len(header_bytes), len(body)) + header_bytes + bytes(body)
+
+
+def _parse_prefix(prefix):
+    if prefix[:4] != MAGIC:
+        raise FrameError("bad frame magic")
+    header_length, body_length = PREFIX.unpack(prefix[4:])
+    if header_length > MAX_HEADER_BYTES or body_length > MAX_BODY_BYTES:
+        raise FrameError("frame too large")
+    return header_length, body_length
+
+
+def _decode_header(header_bytes):
+    try:
+        header = json.loads(header_bytes.decode("utf-8"))
+    except ValueError as header_error:
+        raise FrameError(f"bad frame header: {header_error}") from header_error
+    if not isinstance(header, dict):
+        raise FrameError("frame header must be a JSON object")
+    return header
+
+
+def _read_exactly(stream, count):
+    data = stream.read(count)
+    while data is not None and len(data) < count:
+        more = stream.read(count - len(data))
+        if not more:
+            break
+        data += more
+    if data is None or len(data) < count:
+        raise FrameError("stream ended inside a frame")
+    return data
+
+
+def read_message(stream):
+    """
+    Next message from a binary stream:
+    ("frame", header dict, body bytes), ("line", text, None), or None at EOF
+    """
+    first = stream.read(1)
+    if not first:
+        return None
+    if first != MAGIC[:1]:
+        return ("line", (first + stream.readline()).decode("utf-8", errors="replace"), None)
+
+    header_length, body_length = _parse_prefix(first + _read_exactly(stream, len(MAGIC) - 1 + PREFIX.size))
+    header = _decode_header(_read_exactly(stream, header_length))
+    return ("frame", header, _read_exactly(stream, body_length))
+
+
+async def read_message_async(reader):
+    """read_message for an asyncio StreamReader"""
+    first = await reader.read(1)
+    if not first:
+        return None
+    if first != MAGIC[:1]:
+        return ("line", (first + await reader.readline()).decode("utf-8", errors="replace"), None)
+
+    header_length, body_length = _parse_prefix(first + await reader.readexactly(len(MAGIC) - 1 + PREFIX.size))
+    header = _decode_header(await reader.readexactly(header_length))
+    return ("frame", header, await reader.readexactly(body_length))
+
+
+def binary_stream(stream):
+    """The byte-level stream under a text stream (sys.stdin -> sys.stdin.buffer)"""
+    return getattr(stream, "buffer", stream)
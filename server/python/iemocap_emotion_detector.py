@@ -3,18 +3,24 @@
 Enhanced IEMOCAP Speech-based Emotion Detection
 Comprehensive emotion analysis using advanced audio features
 Supports dynamic emotion detection without hardcoded limitations
+Wav2Vec2 embeddings are opt-in (IEMOCAP_WAV2VEC2, see speech_embeddings.py)
 """
 
 import sys
 import json
 import os
+import time
 import warnings
 import numpy as np
-import librosa
-import torch
-from transformers import Wav2Vec2Processor, Wav2Vec2ForSequenceClassification
 import logging
 from typing import Dict, List, Tuple, Any, Optional, Union
+from audio_io import load_audio
+from spectral_features import FEATURE_PROFILES, POWER_FEATURES, SpectralFeatureEngine, resolve_profile
+from batch_features import STFT_FEATURES, batch_stft_features
+from speech_embeddings import load_neural_scorer
+from profile_matcher import ProfileMatcher
+from voice_activity import trim_to_speech, trim_profile
+from feature_cache import get_feature_cache
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning)
@@ -24,22 +30,20 @@ warnings.filterwarnings("ignore", category=FutureWarning)
 logging.basicConfig(level=logging.INFO, format='[IEMOCAP] %(message)s')
 logger = logging.getLogger(__name__)
 
+# Voiced f0 spread (semitones) at which pitch_variability reaches 1.0. Calm read speech
+# spreads about 1-3 st and aroused speech (anger, fear, surprise) about 4-5 st, so the
+# profiles' pitch_var targets (0.1 peaceful ... 0.8 fear) line up with that range
+PITCH_VARIABILITY_FULL_SCALE_ST = 6.0
+
 class EnhancedEmotionDetector:
     """Advanced speech-based emotion detector with comprehensive emotion analysis"""
     
     def __init__(self):
-        self.processor: Optional[Wav2Vec2Processor] = None
-        self.model: Optional[Wav2Vec2ForSequenceClassification] = None
-        # FORCE CPU for IEMOCAP emotion detection (training compatibility)
-        self.device = torch.device("cpu")
-        
-        if torch.cuda.is_available():
-            gpu_name = torch.cuda.get_device_name(0)
-            logger.info(f"GPU available ({gpu_name}) but using CPU for training compatibility")
-        else:
-            logger.info("Using CPU for emotion detection")
-            
-        logger.info(f"IEMOCAP device: {self.device}")
+        # Wav2Vec2 embedder and its emotion head - None unless IEMOCAP_WAV2VEC2 is on
+        self.embedder = None
+        self.head = None
+        # Share of the final score that comes from the Wav2Vec2 head
+        self.neural_weight = float(os.environ.get("IEMOCAP_WAV2VEC2_WEIGHT", "0.5"))
         
         # Comprehensive emotion mapping based on audio characteristics
         # This replaces hardcoded emotions with dynamic analysis
@@ -84,6 +88,8 @@ class EnhancedEmotionDetector:
             "relief": {"energy": 0.4, "stress": 0.2, "pitch_var": 0.3, "tempo": 0.4},
             "gratitude": {"energy": 0.5, "stress": 0.2, "pitch_var": 0.3, "tempo": 0.4}
         }
+        # The profiles above as one matrix - scored for many utterances at once
+        self.profile_matcher = ProfileMatcher(self.emotion_characteristics)
         
         # Tone quality mappings
         self.tone_mappings = {
@@ -97,31 +103,21 @@ class EnhancedEmotionDetector:
         }
         
     def load_model(self) -> bool:
-        """Load pre-trained speech emotion model"""
+        """Load the optional Wav2Vec2 embedder (IEMOCAP_WAV2VEC2); feature-based analysis needs no model"""
         try:
             logger.info("🎵 Loading enhanced speech emotion model...")
             
-            # Use a lighter model for speech emotion detection
-            model_name = "facebook/wav2vec2-base-960h"
-            
-            logger.info(f"📦 Loading {model_name}...")
-            self.processor = Wav2Vec2Processor.from_pretrained(model_name)
-            
-            # Note: In production, you'd use a model specifically trained on emotional speech
-            # For now, we use feature extraction with our advanced analysis
+            # Runs on CPU (training compatibility); nothing is imported when disabled
             try:
-                self.model = Wav2Vec2ForSequenceClassification.from_pretrained(
-                    model_name,
-                    num_labels=len(self.emotion_characteristics),
-                    ignore_mismatched_sizes=True
-                )
-                
-                self.model = self.model.to(self.device)  # type: ignore
-                self.model.eval()
-                logger.info("✅ Model loaded successfully")
+                self.embedder, self.head = load_neural_scorer()
             except Exception as model_error:
                 logger.warning(f"⚠️ Model loading failed: {model_error}")
-                logger.info("📊 Using feature-based analysis instead")
+                self.embedder, self.head = None, None
+            
+            if self.embedder is not None:
+                logger.info(f"✅ Wav2Vec2 embeddings enabled ({len(self.head.labels)} head labels, weight {self.neural_weight})")
+            else:
+                logger.info("📊 Using feature-based analysis")
             
             logger.info("✅ Enhanced speech emotion system ready")
             return True
@@ -130,48 +126,64 @@ class EnhancedEmotionDetector:
             logger.error(f"❌ Failed to load speech system: {e}")
             return False
     
-    def extract_comprehensive_features(self, audio_path: str) -> Tuple[Optional[np.ndarray], Optional[Union[int, float]], Optional[Dict[str, Any]]]:
-        """Extract comprehensive speech features from audio file"""
+    def extract_comprehensive_features(self, audio_path: str, profile: Optional[str] = None) -> Tuple[Optional[np.ndarray], Optional[Union[int, float]], Optional[Dict[str, Any]]]:
+        """Extract speech features from audio file - only those in the feature profile
+        (fast / standard / full, see spectral_features.py)"""
         try:
-            # Load audio with librosa
-            audio, sr = librosa.load(audio_path, sr=16000, mono=True)
-            
-            # Basic audio statistics
-            duration = len(audio) / sr
-            
-            # Comprehensive feature extraction
-            features = {
-                # Energy and dynamics
-                "rms_energy": librosa.feature.rms(y=audio),
-                "zero_crossing_rate": librosa.feature.zero_crossing_rate(audio),
-                "spectral_centroid": librosa.feature.spectral_centroid(y=audio, sr=sr),
-                "spectral_bandwidth": librosa.feature.spectral_bandwidth(y=audio, sr=sr),
-                "spectral_rolloff": librosa.feature.spectral_rolloff(y=audio, sr=sr),
-                
-                # Pitch and tone
-                "pitch": librosa.piptrack(y=audio, sr=sr),
-                "chroma": librosa.feature.chroma_stft(y=audio, sr=sr),
-                "mfcc": librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=13),
-                
-                # Rhythm and timing
-                "tempo": librosa.beat.tempo(y=audio, sr=sr),
-                "beat_frames": librosa.beat.beat_track(y=audio, sr=sr)[1],
-                
-                # Spectral characteristics
-                "spectral_contrast": librosa.feature.spectral_contrast(y=audio, sr=sr),
-                "tonnetz": librosa.feature.tonnetz(y=librosa.effects.harmonic(audio), sr=sr),
-                
-                # Duration and timing
-                "duration": duration,
-                "audio_length": len(audio)
-            }
-            
-            return audio, sr, features
+            profile = resolve_profile(profile)
+            audio, sr, audio_info, voice_activity = self.load_speech(audio_path)
+            return audio, sr, self.profile_features(audio, sr, audio_info, voice_activity, profile)
             
         except Exception as e:
             logger.error(f"❌ Comprehensive feature extraction failed: {e}")
             return None, None, None
     
+    def load_speech(self, audio_path: str) -> Tuple[np.ndarray, int, Dict[str, Any], Dict[str, Any]]:
+        """Decoded, speech-trimmed samples: (audio, sr, audio_info, voice_activity)"""
+        # Load audio (memory-mapped for 16 kHz PCM WAV, librosa otherwise)
+        audio, sr, audio_info = load_audio(audio_path, sr=16000)
+        
+        # Leading/trailing silence and long pauses out (voice_activity.py):
+        # features are computed over speech time only
+        audio, voice_activity = trim_to_speech(audio, sr)
+        return audio, sr, audio_info, voice_activity
+    
+    def profile_features(self, audio: np.ndarray, sr: int, audio_info: Dict[str, Any], voice_activity: Dict[str, Any],
+                         profile: str, precomputed: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """The profile's features for one loaded clip; precomputed ones (batch_stft_features) are reused"""
+        # Basic audio statistics
+        duration = len(audio) / sr
+        
+        # Profile features - one STFT / mel spectrogram shared by every
+        # spectral feature (spectral_features.py). Features left out of the
+        # profile fall back to the defaults analyze_advanced_characteristics uses.
+        engine = SpectralFeatureEngine(audio, sr, precomputed=precomputed)
+        features = engine.extract(profile)
+        features.update({
+            # Duration and timing
+            "duration": duration,
+            "audio_length": len(audio),
+            "audio_info": audio_info,
+            "voice_activity": voice_activity,
+            "feature_profile": profile,
+            "feature_timings": engine.timings
+        })
+        return features
+    
+    def batch_spectral_features(self, clips: List[np.ndarray], sr: int, profile: str) -> List[Optional[Dict[str, Any]]]:
+        """The profile's |STFT| features (and the |STFT| itself when power / mel features follow)
+        for many clips in one batched pass (batch_features.py); None for every clip if the batch
+        fails - each engine then computes its own"""
+        names = [name for name in FEATURE_PROFILES[profile] if name in STFT_FEATURES]
+        keep_magnitude = any(name in POWER_FEATURES for name in FEATURE_PROFILES[profile])
+        if not clips or not (names or keep_magnitude):
+            return [None] * len(clips)
+        try:
+            return batch_stft_features(clips, sr, names, keep_magnitude)
+        except Exception as e:
+            logger.warning(f"⚠️ Batched spectral features failed, computing per clip: {e}")
+            return [None] * len(clips)
+    
     def analyze_advanced_characteristics(self, features: Dict[str, Any]) -> Dict[str, float]:
         """Analyze advanced speech characteristics for emotion detection"""
         try:
@@ -199,13 +211,15 @@ class EnhancedEmotionDetector:
                 
                 # Anxiety analysis (voice instability)
                 zcr_var = float(np.var(features["zero_crossing_rate"])) if features.get("zero_crossing_rate") is not None else 0.0
-                pitch_data = features.get("pitch", [np.array([0])])[0] if features.get("pitch") is not None else np.array([0])
-                valid_pitch = pitch_data[pitch_data > 0] if len(pitch_data) > 0 else np.array([])
+                # Voiced-frame f0 statistics (compact pitch summary, spectral_features.py)
+                pitch_stats = features.get("pitch") or {}
                 
-                if len(valid_pitch) > 0:
-                    pitch_var = float(np.var(valid_pitch))
-                    pitch_variability = float(min(1.0, pitch_var / 10000.0))
-                    voice_stability = float(max(0.0, 1.0 - (pitch_var / 20000.0)))
+                if pitch_stats.get("voiced_ratio", 0.0) > 0 and pitch_stats.get("mean", 0.0) > 0:
+                    # f0 spread in semitones (12 / ln 2 * std / mean): the same intonation scores
+                    # the same in a low or a high voice
+                    pitch_spread = 12.0 / np.log(2.0) * float(pitch_stats["std"]) / float(pitch_stats["mean"])
+                    pitch_variability = float(min(1.0, pitch_spread / PITCH_VARIABILITY_FULL_SCALE_ST))
+                    voice_stability = float(max(0.0, 1.0 - pitch_spread / (2.0 * PITCH_VARIABILITY_FULL_SCALE_ST)))
                 else:
                     pitch_variability = 0.5
                     voice_stability = 0.5
@@ -250,58 +264,64 @@ class EnhancedEmotionDetector:
                 "emotional_intensity": 0.3
             }
     
-    def detect_emotion_dynamically(self, characteristics: Dict[str, float]) -> Tuple[str, float]:
-        """Dynamically detect emotion based on audio characteristics"""
+    def embed_clips(self, clips: List[np.ndarray], sr: int = 16000) -> List[Optional[np.ndarray]]:
+        """Pooled Wav2Vec2 embedding per clip (one padded batch pass), None per clip when disabled"""
+        if self.embedder is None or not clips:
+            return [None] * len(clips)
         try:
-            best_emotion = "neutral"
-            best_score = 0.0
-            emotion_scores = {}
-            
-            # Calculate similarity scores for each emotion
-            for emotion, emotion_profile in self.emotion_characteristics.items():
-                # Calculate weighted similarity score
-                score = 0.0
-                weight_sum = 0.0
-                
-                # Energy matching (high weight)
-                energy_diff = abs(characteristics["energy_level"] - emotion_profile["energy"])
-                energy_score = max(0.0, 1.0 - energy_diff)
-                score += energy_score * 0.3
-                weight_sum += 0.3
-                
-                # Stress matching (high weight)
-                stress_diff = abs(characteristics["stress_level"] - emotion_profile["stress"])
-                stress_score = max(0.0, 1.0 - stress_diff)
-                score += stress_score * 0.3
-                weight_sum += 0.3
-                
-                # Pitch variability matching
-                pitch_diff = abs(characteristics["pitch_variability"] - emotion_profile["pitch_var"])
-                pitch_score = max(0.0, 1.0 - pitch_diff)
-                score += pitch_score * 0.2
-                weight_sum += 0.2
-                
-                # Tempo matching
-                tempo_diff = abs(characteristics["tempo_indicator"] - emotion_profile["tempo"])
-                tempo_score = max(0.0, 1.0 - tempo_diff)
-                score += tempo_score * 0.2
-                weight_sum += 0.2
-                
-                # Normalize score
-                final_score = score / weight_sum if weight_sum > 0 else 0.0
-                emotion_scores[emotion] = final_score
-                
-                if final_score > best_score:
-                    best_score = final_score
-                    best_emotion = emotion
-            
+            return self.embedder.embed(clips, sr)
+        except Exception as e:
+            logger.error(f"❌ Wav2Vec2 embedding failed: {e}")
+            return [None] * len(clips)
+    
+    def neural_emotion_scores(self, embeddings: List[Optional[np.ndarray]]) -> List[Optional[Dict[str, float]]]:
+        """Wav2Vec2 head probabilities per embedding (None stays None)"""
+        present = [index for index, embedding in enumerate(embeddings) if embedding is not None]
+        scores: List[Optional[Dict[str, float]]] = [None] * len(embeddings)
+        if self.head is None or not present:
+            return scores
+        try:
+            for index, clip_scores in zip(present, self.head.scores(np.stack([embeddings[index] for index in present]))):
+                scores[index] = clip_scores
+        except Exception as e:
+            logger.error(f"❌ Wav2Vec2 scoring failed: {e}")
+        return scores
+    
+    def detect_emotions_batch(self, characteristics_list: List[Dict[str, float]],
+                              neural_scores_list: Optional[List[Optional[Dict[str, float]]]] = None,
+                              top_k: int = 3) -> List[Tuple[str, float, List[Tuple[str, float]]]]:
+        """(emotion, confidence, top-k scores) for many utterances in one vectorized pass"""
+        if not characteristics_list:
+            return []
+        
+        matcher = self.profile_matcher
+        neural, neural_rows = None, None
+        if neural_scores_list is not None and any(scores is not None for scores in neural_scores_list):
+            neural = matcher.neural_matrix(neural_scores_list)
+            neural_rows = [scores is not None for scores in neural_scores_list]
+        
+        scores = matcher.score(matcher.characteristics_matrix(characteristics_list), neural, self.neural_weight, neural_rows)
+        
+        detections = []
+        for top in matcher.top_k(scores, top_k):
+            best_emotion, best_score = top[0]
+            if best_score <= 0.0:
+                best_emotion, best_score = "neutral", 0.0
             # Ensure minimum confidence
-            confidence = max(0.1, min(0.95, best_score))
+            detections.append((best_emotion, float(max(0.1, min(0.95, best_score))), top))
+        return detections
+    
+    def detect_emotion_dynamically(self, characteristics: Dict[str, float],
+                                   neural_scores: Optional[Dict[str, float]] = None) -> Tuple[str, float]:
+        """Dynamically detect emotion based on audio characteristics
+        (blended with the Wav2Vec2 head's probabilities when given)"""
+        try:
+            emotion, confidence, top = self.detect_emotions_batch([characteristics], [neural_scores])[0]
             
-            logger.info(f"🎯 Dynamic emotion detection: {best_emotion} ({confidence:.3f})")
-            logger.info(f"📊 Top emotions: {sorted(emotion_scores.items(), key=lambda x: x[1], reverse=True)[:3]}")
+            logger.info(f"🎯 Dynamic emotion detection: {emotion} ({confidence:.3f})")
+            logger.info(f"📊 Top emotions: {top}")
             
-            return best_emotion, float(confidence)
+            return emotion, confidence
             
         except Exception as e:
             logger.error(f"❌ Dynamic emotion detection failed: {e}")
@@ -314,22 +334,133 @@ class EnhancedEmotionDetector:
                 return tone
         return "neutral"
     
-    def detect_speech_emotion(self, audio_path: str) -> Dict[str, Any]:
+    def detect_speech_emotion(self, audio_path: str, profile: Optional[str] = None,
+                              use_cache: bool = True) -> Dict[str, Any]:
         """Detect emotion from speech audio with comprehensive analysis"""
+        return self.detect_speech_emotion_batch([audio_path], profile, use_cache)[0]
+    
+    def _cache_profile(self, profile: Optional[str]) -> Optional[str]:
+        """Everything besides the audio that changes the cached analysis; None for an invalid profile"""
+        try:
+            return f"iemocap:{resolve_profile(profile)}:{trim_profile()}"
+        except ValueError:
+            return None
+    
+    def _load_clip(self, cache, audio_path: str, profile: Optional[str],
+                   use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """Characteristics (and embedding) for one file from the feature cache when possible,
+        else its decoded, speech-trimmed audio, the features still to compute"""
+        cache_profile = self._cache_profile(profile) if use_cache else None
+        key = cache.key_for_file(audio_path, cache_profile) if cache_profile else None
+        cached = cache.get(key)
+        if cached is not None and (self.embedder is None or "embedding" in cached[1]):
+            summary, arrays, tier = cached
+            features = dict(summary["features"], feature_cache=tier)
+            if features.get("audio_info"):
+                # Nothing was decoded for this result
+                features["audio_info"] = dict(features["audio_info"], decode_ms=0.0)
+            return {
+                "key": None,
+                "audio": None,
+                "features": features,
+                "characteristics": summary["characteristics"],
+                "embedding": arrays.get("embedding") if self.embedder is not None else None
+            }
+        
         try:
+            audio, sr, audio_info, voice_activity = self.load_speech(audio_path)
+        except Exception as e:
+            logger.error(f"❌ Comprehensive feature extraction failed: {e}")
+            return None
+        return {
+            "key": key,
+            "audio": audio,
+            "sr": sr,
+            "audio_info": audio_info,
+            "voice_activity": voice_activity,
+            "features": None,
+            "characteristics": None,
+            "embedding": None
+        }
+    
+    def _compute_features(self, clips: List[Dict[str, Any]], profile: str) -> None:
+        """Features and characteristics of freshly decoded clips; the |STFT| features of all of
+        them come from one batched extraction (batch_features.py). A failing clip gets features None."""
+        sr = 16000  # load_speech's rate
+        started = time.perf_counter()
+        spectral = self.batch_spectral_features([clip["audio"] for clip in clips], sr, profile)
+        # The batch's time, shared evenly, so feature_timings still accounts for the STFT work
+        share_ms = round((time.perf_counter() - started) * 1000.0 / max(len(clips), 1), 3)
+        for position, (clip, precomputed) in enumerate(zip(clips, spectral)):
+            spectral[position] = None  # a clip's |STFT| is released once its features are done
+            try:
+                features = self.profile_features(clip["audio"], clip["sr"], clip["audio_info"], clip["voice_activity"],
+                                                 profile, precomputed)
+            except Exception as e:
+                logger.error(f"❌ Comprehensive feature extraction failed: {e}")
+                continue
+            if precomputed:
+                features["feature_timings"]["stft_batch"] = share_ms
+            clip["features"] = features
+            clip["characteristics"] = self.analyze_advanced_characteristics(features)
+    
+    def detect_speech_emotion_batch(self, audio_paths: List[str], profile: Optional[str] = None,
+                                    use_cache: bool = True) -> List[Dict[str, Any]]:
+        """detect_speech_emotion for several files; Wav2Vec2 (when enabled) embeds them in padded batches
+        Clips seen before (same content and profile) come from the feature cache (feature_cache.py);
+        use_cache=False neither reads nor fills it (warm-up). The others' |STFT| features are
+        extracted together (batch_features.batch_stft_features)"""
+        try:
+            resolved = resolve_profile(profile)
+        except ValueError as e:
+            logger.error(f"❌ Comprehensive feature extraction failed: {e}")
+            return [self.get_default_result() for _ in audio_paths]
+        
+        cache = get_feature_cache()
+        clips = []
+        for audio_path in audio_paths:
             logger.info(f"🎵 Analyzing speech emotion from: {os.path.basename(audio_path)}")
-            
-            # Extract comprehensive features
-            audio, sr, features = self.extract_comprehensive_features(audio_path)
-            if audio is None:
-                return self.get_default_result()
-            
-            # Analyze advanced characteristics
-            characteristics = self.analyze_advanced_characteristics(features or {})
-            
-            # Dynamically detect emotion
-            emotion, confidence = self.detect_emotion_dynamically(characteristics)
-            
+            clips.append(self._load_clip(cache, audio_path, resolved, use_cache))
+        
+        self._compute_features([clip for clip in clips if clip is not None and clip["features"] is None], resolved)
+        clips = [clip if clip is not None and clip["features"] is not None else None for clip in clips]
+        
+        decoded = [index for index, clip in enumerate(clips) if clip is not None]
+        to_embed = [clips[index] for index in decoded if self.embedder is not None and clips[index]["embedding"] is None]
+        for clip, embedding in zip(to_embed, self.embed_clips([clip["audio"] for clip in to_embed])):
+            clip["embedding"] = embedding
+        neural = self.neural_emotion_scores([clips[index]["embedding"] for index in decoded])
+        
+        for index in decoded:
+            clip = clips[index]
+            if clip["key"] is not None:
+                # Decode metadata and characteristics only - the frame-wise feature arrays are not kept
+                features = clip["features"] or {}
+                cache.put(clip["key"], {
+                    "features": {name: features.get(name) for name in ("audio_info", "voice_activity", "feature_profile")},
+                    "characteristics": clip["characteristics"]
+                }, {"embedding": clip["embedding"]} if clip["embedding"] is not None else None)
+        
+        # Match every utterance against the profiles at once
+        characteristics = [clips[index]["characteristics"] for index in decoded]
+        try:
+            detections = self.detect_emotions_batch(characteristics, neural)
+        except Exception as e:
+            logger.error(f"❌ Dynamic emotion detection failed: {e}")
+            detections = [("neutral", 0.3, [])] * len(decoded)
+        
+        results = [self.get_default_result() for _ in audio_paths]
+        for index, clip_characteristics, neural_scores, (emotion, confidence, top) in zip(decoded, characteristics, neural, detections):
+            logger.info(f"🎯 Dynamic emotion detection: {emotion} ({confidence:.3f})")
+            logger.info(f"📊 Top emotions: {top}")
+            results[index] = self._analyze_features(clips[index]["features"], clip_characteristics, emotion, confidence,
+                                                    neural_scores is not None)
+        return results
+    
+    def _analyze_features(self, features: Optional[Dict[str, Any]], characteristics: Dict[str, float],
+                          emotion: str, confidence: float, used_neural: bool = False) -> Dict[str, Any]:
+        """Emotion, tone and flags for one decoded utterance"""
+        try:
             # Get tone category
             tone = self.get_tone_category(emotion)
             
@@ -342,7 +473,12 @@ class EnhancedEmotionDetector:
                 "anxiety_detected": characteristics["anxiety_level"] > 0.6,
                 "high_energy": characteristics["energy_level"] > 0.7,
                 "emotional_intensity": characteristics["emotional_intensity"],
-                "method": "enhanced_iemocap_analysis"
+                "decode_ms": (features or {}).get("audio_info", {}).get("decode_ms"),
+                "voice_activity": (features or {}).get("voice_activity"),
+                "feature_profile": (features or {}).get("feature_profile"),
+                "feature_timings": (features or {}).get("feature_timings", {}),
+                "feature_cache": (features or {}).get("feature_cache", "miss"),
+                "method": "enhanced_iemocap_wav2vec2" if used_neural else "enhanced_iemocap_analysis"
             }
             
             logger.info(f"✅ Enhanced emotion: {emotion} ({confidence:.3f})")
@@ -381,8 +517,8 @@ class EnhancedEmotionDetector:
 def main():
     """Main function for CLI usage"""
     try:
-        if len(sys.argv) != 2:
-            print(json.dumps({"error": "Usage: python iemocap_emotion_detector.py <audio_file>"}))
+        if len(sys.argv) not in (2, 3):
+            print(json.dumps({"error": "Usage: python iemocap_emotion_detector.py <audio_file> [fast|standard|full]"}))
             sys.exit(1)
         
         audio_file = sys.argv[1]
@@ -398,7 +534,7 @@ def main():
         detector.load_model()
         
         # Detect speech emotion
-        result = detector.detect_speech_emotion(audio_file)
+        result = detector.detect_speech_emotion(audio_file, sys.argv[2] if len(sys.argv) > 2 else None)
         
         # Output result as JSON
         print(json.dumps(result, indent=2))
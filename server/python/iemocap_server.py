@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Persistent IEMOCAP speech emotion server
+Keeps EnhancedEmotionDetector warm (librosa import, numba-compiled librosa kernels,
+cached mel filterbanks, the opt-in Wav2Vec2 embedder) instead of spawning
+iemocap_emotion_detector.py for every utterance.
+Same JSON-lines contract as emotion_server.py over stdin/stdout:
+    {"audio_path": "...", "profile": "standard", "id": "..."}  -> detect_speech_emotion result
+    {"mode": "stats"}                                        -> server statistics
+- Requests with an "id" run on IEMOCAP_WORKER_THREADS threads and are answered
+  as soon as they finish (the id is echoed); others are answered in order
+- While IEMOCAP_FAST_QUEUE_DEPTH or more requests wait, analyses drop to the
+  "fast" feature profile (spectral_features.py)
+"""
+
+import sys
+import json
+import time
+_IMPORT_START = time.perf_counter()
+import os
+import wave
+import queue
+import signal
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from iemocap_emotion_detector import EnhancedEmotionDetector
+from spectral_features import resolve_profile, profile_for_queue_depth
+from feature_cache import get_feature_cache
+from server_readiness import warmup_runs, run_warmup, emit_ready
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+
+
+class PersistentIEMOCAPServer:
+    def __init__(self):
+        self.running = True
+        self.detector = EnhancedEmotionDetector()
+        self.warmup_summary = None
+
+        started = time.perf_counter()
+        self.model_loaded = self.detector.load_model()
+        self.load_seconds = time.perf_counter() - started
+
+        self.worker_threads = max(1, int(os.environ.get("IEMOCAP_WORKER_THREADS", "2")))
+        self.executor = ThreadPoolExecutor(max_workers=self.worker_threads, thread_name_prefix="iemocap-worker")
+        self.output_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.waiting = 0  # requests read but not yet started
+        self.stats = {"requests": 0, "errors": 0, "fast_fallbacks": 0, "analysis_seconds": 0.0}
+        self.started_at = time.time()
+
+        signal.signal(signal.SIGINT, self.shutdown_handler)
+        signal.signal(signal.SIGTERM, self.shutdown_handler)
+
+    def shutdown_handler(self, signum, frame):
+        print("🛑 Shutting down IEMOCAP server...", file=sys.stderr)
+        self.running = False
+
+    def warm_up(self, runs=None):
+        """Analyze a short synthetic utterance: compiles librosa's numba kernels and fills the mel cache"""
+        runs = warmup_runs("IEMOCAP", default=1) if runs is None else runs
+        audio_path = self._write_warmup_audio() if runs else None
+        if runs and audio_path is None:
+            runs = 0
+
+        if runs:
+            print(f"🔥 Warming up IEMOCAP analysis ({runs} runs)...", file=sys.stderr)
+        try:
+            profile = resolve_profile()
+            # Uncached: a cache hit (or a disk hit after a restart) would skip the kernels being warmed
+            self.warmup_summary = run_warmup(
+                lambda: self.detector.detect_speech_emotion(audio_path, profile, use_cache=False), runs)
+        finally:
+            if audio_path:
+                try:
+                    os.remove(audio_path)
+                except OSError:
+                    pass
+        return self.warmup_summary
+
+    def _write_warmup_audio(self):
+        """1 s of a voiced 16 kHz tone with some noise, as 16-bit PCM WAV"""
+        try:
+            sr = 16000
+            t = np.arange(sr, dtype=np.float32) / sr
+            y = 0.3 * np.sin(2 * np.pi * 180.0 * t) + 0.02 * np.random.default_rng(0).standard_normal(sr)
+            handle, audio_path = tempfile.mkstemp(suffix=".wav", prefix="iemocap_warmup_")
+            os.close(handle)
+            with wave.open(audio_path, "wb") as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(sr)
+                wav_file.writeframes((np.clip(y, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+            return audio_path
+        except Exception as e:
+            print(f"⚠️ Could not write warm-up audio: {e}", file=sys.stderr)
+            return None
+
+    def process_request(self, request):
+        """Analyze one utterance (or report stats)"""
+        try:
+            if request.get("mode") == "stats":
+                return self.get_stats()
+
+            audio_path = request.get("audio_path", "")
+            if not audio_path or not os.path.exists(audio_path):
+                return dict(self.detector.get_default_result(), error="Audio file not found")
+
+            requested = resolve_profile(request.get("profile"))
+            profile = profile_for_queue_depth(requested, self.waiting)
+
+            started = time.perf_counter()
+            result = self.detector.detect_speech_emotion(audio_path, profile)
+            elapsed = time.perf_counter() - started
+
+            with self.stats_lock:
+                self.stats["requests"] += 1
+                self.stats["analysis_seconds"] += elapsed
+                if profile != requested:
+                    self.stats["fast_fallbacks"] += 1
+            result["processing_ms"] = round(elapsed * 1000.0, 3)
+            return result
+
+        except Exception as e:
+            with self.stats_lock:
+                self.stats["errors"] += 1
+            return dict(self.detector.get_default_result(), error=str(e))
+
+    def get_stats(self):
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats["avg_analysis_ms"] = stats["analysis_seconds"] * 1000.0 / stats["requests"] if stats["requests"] else 0.0
+        stats.update({
+            "waiting": self.waiting,
+            "worker_threads": self.worker_threads,
+            "model_loaded": self.model_loaded,
+            "import_seconds": IMPORT_SECONDS,
+            "load_seconds": self.load_seconds,
+            "warmup": self.warmup_summary,
+            "feature_cache": get_feature_cache().stats(),
+            "wav2vec2": self.detector.embedder.stats() if self.detector.embedder is not None else None,
+            "uptime_seconds": time.time() - self.started_at
+        })
+        return stats
+
+    def _reply(self, result, request_id=None):
+        if request_id is not None:
+            result = dict(result, id=request_id)
+        with self.output_lock:
+            sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
+
+    def _process_and_reply(self, request):
+        with self.stats_lock:
+            self.waiting -= 1
+        self._reply(self.process_request(request), request.get("id"))
+
+    def _read_requests(self, requests):
+        """Reader thread: keeps the queue (and so the load signal) current while analyses run"""
+        try:
+            for line in sys.stdin:
+                line = line.strip()
+                if line:
+                    with self.stats_lock:
+                        self.waiting += 1
+                    requests.put(line)
+        finally:
+            requests.put(None)
+
+    def run_server(self):
+        """Main server loop - reads JSON requests from stdin"""
+        emit_ready(
+            "iemocap",
+            IMPORT_SECONDS,
+            self.load_seconds,
+            self.warmup_summary,
+            model_loaded=self.model_loaded,
+            wav2vec2=self.detector.embedder is not None,
+            worker_threads=self.worker_threads,
+            profile=resolve_profile()
+        )
+        print("📡 IEMOCAP speech emotion server ready for requests", file=sys.stderr)
+
+        requests = queue.Queue()
+        threading.Thread(target=self._read_requests, args=(requests,), daemon=True).start()
+
+        try:
+            while self.running:
+                try:
+                    line = requests.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if line is None:
+                    break
+
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError:
+                    with self.stats_lock:
+                        self.waiting -= 1
+                    self._reply(dict(self.detector.get_default_result(), error="Invalid JSON"))
+                    continue
+
+                if "id" in request and request.get("mode") != "stats":
+                    # Multiplexed request: answer out of order when it completes
+                    self.executor.submit(self._process_and_reply, request)
+                else:
+                    self._process_and_reply(request)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Let in-flight multiplexed requests write their responses
+            self.executor.shutdown(wait=True)
+
+        print(f"🛑 IEMOCAP server stopped ({self.stats['requests']} analyses)", file=sys.stderr)
+
+
+def main():
+    """Start the persistent IEMOCAP speech emotion server"""
+    try:
+        server = PersistentIEMOCAPServer()
+        server.warm_up()
+        server.run_server()
+    except Exception as e:
+        print(f"❌ Server error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
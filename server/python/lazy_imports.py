@@ -0,0 +1,46 @@
+"""
+Deferred heavy imports with timing
+torch, transformers, librosa, numpy and spaCy are imported on first use
+instead of at module import, so a voice-only call never pays for transformers.
+Each first import is timed so servers can report a cold-start breakdown.
+"""
+
+import sys
+import time
+import importlib
+import threading
+
+IMPORT_TIMES = {}
+_import_lock = threading.Lock()
+
+
+def timed_import(name):
+    """Import a module once, recording how long the first import took"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    with _import_lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        start_time = time.perf_counter()
+        module = importlib.import_module(name)
+        # Nested imports (transformers pulls in torch) are charged to whoever came first
+        IMPORT_TIMES[name] = time.perf_counter() - start_time
+        return module
+
+
+def import_transformers():
+    """Import transformers with its info/debug logging silenced (keeps stdout clean)"""
+    transformers = timed_import("transformers")
+    importlib.import_module("transformers.utils.logging").set_verbosity_error()
+    return transformers
+
+
+def import_report():
+    """One-line summary such as 'torch 1.92s, transformers 0.84s (total 2.76s)'"""
+    if not IMPORT_TIMES:
+        return "no heavy imports"
+    parts = [f"{name} {seconds:.2f}s" for name, seconds in IMPORT_TIMES.items()]
+    return f"{', '.join(parts)} (total {sum(IMPORT_TIMES.values()):.2f}s)"
@@ -0,0 +1,34 @@
+"""
+Run independent analysis branches concurrently (combined text + voice mode)
+The first branch runs on the calling thread, the others on a small executor,
+so combined latency is about the slowest branch instead of the sum. Both
+branches spend their heavy parts in torch/numpy code that releases the GIL.
+"""
+
+import time
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000.0
+
+
+def run_branches(executor, branches):
+    """
+    branches: ordered {name: callable}; returns ({name: result}, timings)
+    timings has "<name>_ms" per branch plus "total_ms" (wall clock)
+    """
+    started = time.perf_counter()
+    names = list(branches)
+    futures = {name: executor.submit(_timed, branches[name]) for name in names[1:]}
+
+    outcomes = {}
+    if names:
+        outcomes[names[0]] = _timed(branches[names[0]])
+    for name, future in futures.items():
+        outcomes[name] = future.result()
+
+    timings = {f"{name}_ms": round(outcomes[name][1], 3) for name in names}
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+    return {name: outcomes[name][0] for name in names}, timings
@@ -0,0 +1,135 @@
+"""
+Frame-wise FFT pitch and spectrum engine for the fast spectral voice analysis
+Replaces the full-clip np.correlate (quadratic in clip length, of which only
+lags 20-200 were ever read) and the complex full-clip FFT.
+- Short frames, autocorrelation through rfft/irfft (Wiener-Khinchin), float32
+- Per-frame f0 contour with a voicing decision, plus summary statistics
+- Clip-level pitch from the summed frame autocorrelations over the same lag
+  range, so the emotion rules keep receiving the same kind of value
+- Frames are processed in fixed-size chunks, so peak memory does not grow
+  with clip length; only the 1-D contour is kept
+"""
+
+from lazy_imports import timed_import
+
+FRAME_LENGTH = 1024  # 64 ms at 16 kHz - several periods of the lowest searched pitch
+HOP_LENGTH = 512
+MIN_LAG = 20    # 800 Hz at 16 kHz
+MAX_LAG = 200   # 80 Hz at 16 kHz
+VOICING_THRESHOLD = 0.3  # normalized autocorrelation peak needed to call a frame voiced
+CHUNK_FRAMES = 256  # frames per autocorrelation pass (~2 MB of spectrum at a time)
+
+
+def frame_signal(y, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH):
+    """(n_frames, frame_length) float32 view of y, zero-padded so the tail is covered"""
+    np = timed_import("numpy")
+    y = np.asarray(y, dtype=np.float32)
+
+    if len(y) < frame_length:
+        y = np.pad(y, (0, frame_length - len(y)))
+    else:
+        remainder = (len(y) - frame_length) % hop_length
+        if remainder:
+            y = np.pad(y, (0, hop_length - remainder))
+
+    return np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length]
+
+
+def framed_autocorrelation(frames, max_lag=MAX_LAG):
+    """Linear (not circular) autocorrelation of every frame for lags 0..max_lag"""
+    np = timed_import("numpy")
+    frame_length = frames.shape[1]
+    n_fft = 1 << int(np.ceil(np.log2(frame_length + max_lag)))
+
+    spectrum = np.fft.rfft(frames, n=n_fft, axis=1)
+    power = (spectrum.real * spectrum.real + spectrum.imag * spectrum.imag).astype(np.float32)
+    return np.fft.irfft(power, n=n_fft, axis=1)[:, :max_lag + 1].astype(np.float32)
+
+
+def pitch_contour(y, sr, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH,
+                  min_lag=MIN_LAG, max_lag=MAX_LAG, voicing_threshold=VOICING_THRESHOLD,
+                  chunk_frames=CHUNK_FRAMES):
+    """Per-frame f0 (float32, 0 for unvoiced frames), voiced flags and the clip-level pitch estimate"""
+    np = timed_import("numpy")
+    frames = frame_signal(y, frame_length, hop_length)
+    f0 = np.zeros(len(frames), dtype=np.float32)
+    voiced = np.zeros(len(frames), dtype=bool)
+    acf_sum = np.zeros(max_lag + 1, dtype=np.float64)
+
+    for start in range(0, len(frames), chunk_frames):
+        acf = framed_autocorrelation(frames[start:start + chunk_frames], max_lag)
+        acf_sum += acf.sum(axis=0, dtype=np.float64)
+
+        search = acf[:, min_lag:max_lag]
+        best_lag = np.argmax(search, axis=1) + min_lag
+        peak = search[np.arange(len(search)), best_lag - min_lag]
+        energy = acf[:, 0]
+
+        strength = np.divide(peak, energy, out=np.zeros_like(peak), where=energy > 1e-8)
+        chunk_voiced = strength > voicing_threshold
+        voiced[start:start + len(acf)] = chunk_voiced
+        f0[start:start + len(acf)] = np.where(chunk_voiced, sr / best_lag.astype(np.float32), 0.0)
+
+    # Summing frame autocorrelations approximates the whole-clip autocorrelation
+    # at these short lags, i.e. what the old full np.correlate peak-picked. The
+    # frames' (N - lag) / N taper is swapped for the clip's own (L - lag) / L,
+    # which keeps ties between period multiples resolved the same way.
+    # Per-frame picks keep the frame taper, which guards them against octave errors.
+    lags = np.arange(max_lag + 1, dtype=np.float32)
+    clip_length = max(len(y), max_lag + 1)
+    summed = acf_sum.astype(np.float32) * (frame_length / (frame_length - lags)) * ((clip_length - lags) / clip_length)
+    clip_lag = int(np.argmax(summed[min_lag:max_lag])) + min_lag
+
+    return {
+        "f0": f0,
+        "voiced": voiced,
+        "times": (np.arange(len(f0), dtype=np.float32) * hop_length + frame_length / 2) / sr,
+        "pitch": float(sr / clip_lag)
+    }
+
+
+def pitch_summary(contour):
+    """JSON-friendly statistics over the voiced frames of a pitch contour"""
+    np = timed_import("numpy")
+    f0 = contour["f0"][contour["voiced"]]
+    frames = len(contour["f0"])
+
+    if len(f0) == 0:
+        return {"frames": frames, "voiced_ratio": 0.0, "mean": 0.0, "median": 0.0, "std": 0.0, "min": 0.0, "max": 0.0}
+
+    return {
+        "frames": frames,
+        "voiced_ratio": float(len(f0) / frames),
+        "mean": float(np.mean(f0)),
+        "median": float(np.median(f0)),
+        "std": float(np.std(f0)),
+        "min": float(np.min(f0)),
+        "max": float(np.max(f0))
+    }
+
+
+def index_spectral_centroid(y, sr, threshold=0.01, default=1000.0):
+    """
+    The fast analysis' 'spectral centroid': mean FFT bin index with |X| > threshold,
+    scaled to Hz. Computed from rfft: for real input |X[k]| == |X[n-k]|, so each
+    interior half-spectrum bin above threshold stands for a pair of indices summing to n.
+    """
+    np = timed_import("numpy")
+    y = np.asarray(y, dtype=np.float32)
+    n = len(y)
+    if n == 0:
+        return default
+
+    above = np.abs(np.fft.rfft(y)) > threshold
+    has_nyquist = n % 2 == 0
+
+    interior = above[1:-1] if has_nyquist else above[1:]
+    pairs = int(np.count_nonzero(interior))
+    dc = bool(above[0])
+    nyquist = bool(above[-1]) if has_nyquist else False
+
+    count = 2 * pairs + dc + nyquist
+    if count == 0:
+        return default
+    index_sum = n * pairs + (n // 2 if nyquist else 0)
+    return float(index_sum / count) * sr / n
@@ -0,0 +1,109 @@
+"""
+Bounded LRU result cache for emotion detection
+Keeps recent model results in memory so repeated phrases skip inference
+- Memory bounded: evicts least recently used entries past max_bytes / max_entries
+- Optional TTL: entries older than ttl_seconds count as misses
+- Thread-safe: shared by the batching scheduler and worker threads
+"""
+
+import os
+import json
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def text_cache_key(text, language="en", max_chars=512):
+    """Cache key for text emotion: the exact (normalized, truncated) model input"""
+    # No lowercasing or whitespace folding - RoBERTa is case and space sensitive
+    normalized = unicodedata.normalize("NFC", text.strip()[:max_chars])
+    return f"{language}\x00{normalized}"
+
+
+class LRUResultCache:
+    # Rough per-entry bookkeeping cost (OrderedDict node, tuple, floats)
+    ENTRY_OVERHEAD_BYTES = 120
+
+    def __init__(self, max_entries=2048, max_bytes=16 * 1024 * 1024, ttl_seconds=0.0):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl_seconds = float(ttl_seconds or 0.0)
+        self.entries = OrderedDict()  # key -> (serialized value, size, stored_at)
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix="EMOTION_CACHE"):
+        """Build a cache from <prefix>_MAX_ENTRIES, <prefix>_MAX_MB and <prefix>_TTL"""
+        return cls(
+            max_entries=int(os.environ.get(f"{prefix}_MAX_ENTRIES", "2048")),
+            max_bytes=int(float(os.environ.get(f"{prefix}_MAX_MB", "16")) * 1024 * 1024),
+            ttl_seconds=float(os.environ.get(f"{prefix}_TTL", "0"))
+        )
+
+    def get(self, key):
+        """Return a fresh copy of the cached value, or None on a miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            serialized, size, stored_at = entry
+            if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                del self.entries[key]
+                self.bytes_used -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+        # Stored serialized so callers can mutate what they get back
+        return json.loads(serialized)
+
+    def put(self, key, value):
+        serialized = json.dumps(value)
+        size = len(key.encode("utf-8")) + len(serialized.encode("utf-8")) + self.ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes_used -= previous[1]
+
+            self.entries[key] = (serialized, size, time.monotonic())
+            self.bytes_used += size
+
+            while self.entries and (len(self.entries) > self.max_entries or self.bytes_used > self.max_bytes):
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.bytes_used -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes_used = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "bytes_used": self.bytes_used,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
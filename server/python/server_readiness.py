@@ -0,0 +1,90 @@
+"""
+Warm-up and readiness reporting shared by the persistent Python servers
+Before announcing readiness a server runs a few representative inferences
+(first-call lazy init, allocator growth, thread pool spin-up) and then emits
+one structured event on stderr:
+
+    @@FLUENTI_READY {"server": "emotion", "import_s": 2.1, "load_s": 3.4, "warmup": {...}}
+
+The Node services look for the READY_EVENT_PREFIX line; the human-readable
+"ready for requests" line is still printed after it for older clients.
+"""
+
+import os
+import sys
+import json
+import time
+
+READY_EVENT_PREFIX = "@@FLUENTI_READY "
+
+
+def warmup_runs(env_prefix, default=3):
+    """<PREFIX>_WARMUP_RUNS, e.g. EMOTION_WARMUP_RUNS=0 disables warm-up"""
+    try:
+        return max(0, int(os.environ.get(f"{env_prefix}_WARMUP_RUNS", str(default))))
+    except ValueError:
+        return default
+
+
+def run_warmup(warmup_fn, runs):
+    """Call warmup_fn `runs` times and summarise the latencies (ms)"""
+    latencies = []
+    errors = 0
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        try:
+            warmup_fn()
+        except Exception as warmup_error:
+            errors += 1
+            print(f"⚠️ Warm-up run failed: {warmup_error}", file=sys.stderr)
+        latencies.append((time.perf_counter() - start_time) * 1000.0)
+    return summarize_warmup(latencies, errors)
+
+
+def summarize_warmup(latencies, errors=0):
+    if not latencies:
+        return {"runs": 0, "errors": errors, "first_ms": None, "p50_ms": None, "max_ms": None, "latencies_ms": []}
+    ordered = sorted(latencies)
+    return {
+        "runs": len(latencies),
+        "errors": errors,
+        "first_ms": round(latencies[0], 2),
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "max_ms": round(ordered[-1], 2),
+        "latencies_ms": [round(latency, 2) for latency in latencies]
+    }
+
+
+def merge_warmups(summaries):
+    """One summary over several processes' warm-ups (pre-fork workers)"""
+    latencies = []
+    errors = 0
+    first = []
+    for summary in summaries:
+        if not summary:
+            continue
+        latencies.extend(summary.get("latencies_ms", []))
+        errors += summary.get("errors", 0)
+        if summary.get("first_ms") is not None:
+            first.append(summary["first_ms"])
+    merged = summarize_warmup(latencies, errors)
+    # Every worker pays its own first call - report the worst of them
+    if first:
+        merged["first_ms"] = max(first)
+    merged["processes"] = len(summaries)
+    return merged
+
+
+def emit_ready(server, import_s, load_s, warmup, **extra):
+    """Write the structured readiness event to stderr (one line, flushed)"""
+    event = {
+        "server": server,
+        "pid": os.getpid(),
+        "import_s": round(import_s, 3),
+        "load_s": round(load_s, 3),
+        "warmup": warmup
+    }
+    event.update(extra)
+    print(READY_EVENT_PREFIX + json.dumps(event), file=sys.stderr)
+    sys.stderr.flush()
+    return event
@@ -0,0 +1,190 @@
+"""
+Network listen mode for the persistent emotion server
+Serves the same protocol as stdin/stdout (JSON lines and binary frames) on a Unix domain socket
+or a localhost TCP port so several app processes share one warm model:
+
+    python emotion_server.py --listen unix:/tmp/fluenti-emotion.sock
+    python emotion_server.py --listen tcp:127.0.0.1:8765
+
+- Every connection feeds the detector's single micro-batching scheduler
+- Requests without an id are answered in order per connection; requests with
+  an id come back as soon as they finish (ids are scoped to the connection)
+- Backpressure per connection: at most max_inflight unanswered requests, and
+  reading pauses while the client is not draining its responses
+"""
+
+import os
+import sys
+import json
+import queue
+import signal
+import asyncio
+import threading
+
+from frame_protocol import FrameError, encode_frame, read_message_async
+
+# Base64 audio payloads can make single lines large (frames are bounded by frame_protocol)
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+def parse_listen_address(value):
+    """'unix:/path/to.sock' -> ('unix', path); 'tcp:host:port' or 'tcp:port' -> ('tcp', host, port)"""
+    kind, _, rest = value.partition(":")
+    if kind == "unix" and rest:
+        return ("unix", rest)
+    if kind == "tcp" and rest:
+        host, _, port = rest.rpartition(":")
+        try:
+            return ("tcp", host or "127.0.0.1", int(port))
+        except ValueError:
+            pass
+    raise ValueError(f"invalid listen address '{value}' (use unix:/path or tcp:host:port)")
+
+
+def format_listen_address(address):
+    return f"unix:{address[1]}" if address[0] == "unix" else f"tcp:{address[1]}:{address[2]}"
+
+
+class SocketEmotionServer:
+    def __init__(self, detector, address, max_inflight=64):
+        self.detector = detector
+        self.address = address
+        self.max_inflight = max(1, int(max_inflight))
+        self.requests = queue.Queue()
+        self.loop = None
+        self.stop_event = None
+        self.connections = {"total": 0, "active": 0}
+        detector.listener = self
+
+    def run(self):
+        """Start the shared scheduler thread and serve connections until stopped"""
+        scheduler = threading.Thread(target=self._run_scheduler, name="emotion-scheduler", daemon=True)
+        scheduler.start()
+
+        try:
+            asyncio.run(self._main())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.detector.running = False
+            self.requests.put(None)
+            scheduler.join(timeout=30)
+            if self.address[0] == "unix":
+                try:
+                    os.unlink(self.address[1])
+                except OSError:
+                    pass
+
+        print(f"🛑 Emotion detection socket server stopped "
+              f"({self.connections['total']} connections served)", file=sys.stderr)
+
+    def _run_scheduler(self):
+        try:
+            self.detector._serve(self.requests)
+        finally:
+            # Let in-flight multiplexed requests write their responses
+            self.detector.executor.shutdown(wait=True)
+
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        self._install_signal_handlers()
+
+        if self.address[0] == "unix":
+            if not hasattr(asyncio, "start_unix_server"):
+                raise RuntimeError("Unix sockets are not available on this platform - use tcp:host:port")
+            path = self.address[1]
+            if os.path.exists(path):
+                os.unlink(path)  # stale socket from a previous run
+            server = await asyncio.start_unix_server(self._handle_client, path=path, limit=MAX_LINE_BYTES)
+            os.chmod(path, 0o660)
+        else:
+            server = await asyncio.start_server(
+                self._handle_client, host=self.address[1], port=self.address[2], limit=MAX_LINE_BYTES
+            )
+
+        listen = format_listen_address(self.address)
+        self.detector.emit_ready(listen=listen, max_inflight=self.max_inflight)
+        print(f"📡 Emotion detection server ready for requests on {listen}", file=sys.stderr)
+
+        async with server:
+            await self.stop_event.wait()
+
+    def _install_signal_handlers(self):
+        def stop():
+            print("🛑 Shutting down emotion detection server...", file=sys.stderr)
+            self.detector.running = False
+            self.stop_event.set()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self.loop.add_signal_handler(signum, stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows event loops: fall back to a plain handler hopping onto the loop
+                signal.signal(signum, lambda *_: self.loop.call_soon_threadsafe(stop))
+
+    async def _handle_client(self, reader, writer):
+        self.connections["total"] += 1
+        self.connections["active"] += 1
+        inflight = asyncio.Semaphore(self.max_inflight)
+
+        def deliver(result, framed):
+            # Runs on the event loop thread
+            inflight.release()
+            if not writer.is_closing():
+                writer.write(encode_frame(result) if framed else (json.dumps(result) + "\n").encode("utf-8"))
+
+        def reply(result):
+            # Called from the scheduler or worker threads
+            self.loop.call_soon_threadsafe(deliver, result, False)
+
+        def frame_reply(result):
+            self.loop.call_soon_threadsafe(deliver, result, True)
+
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    message = await read_message_async(reader)
+                except FrameError as frame_error:
+                    # The stream cannot be resynchronized after a broken frame
+                    invalid = {"emotion": "neutral", "confidence": 0.5, "error": f"Invalid frame: {frame_error}"}
+                    writer.write(encode_frame(invalid))
+                    break
+                except (asyncio.LimitOverrunError, ValueError):
+                    too_long = {"emotion": "neutral", "confidence": 0.5, "error": "Request line too long"}
+                    writer.write((json.dumps(too_long) + "\n").encode("utf-8"))
+                    break
+                except asyncio.IncompleteReadError:
+                    break  # closed inside a frame
+                if message is None:
+                    break
+
+                item = self.detector._request_item(message, reply, frame_reply)
+                if item is None:
+                    continue
+
+                await inflight.acquire()
+                self.requests.put(item)
+                # Stop reading while the client is not consuming its responses
+                await writer.drain()
+
+            # Answer everything this connection still has in flight before closing
+            for _ in range(self.max_inflight):
+                await inflight.acquire()
+            await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.connections["active"] -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    def stats(self):
+        return {
+            "listen": format_listen_address(self.address),
+            "max_inflight": self.max_inflight,
+            "connections": dict(self.connections)
+        }
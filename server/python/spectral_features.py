@@ -0,0 +1,214 @@
+"""
+Shared-spectrogram feature engine for the IEMOCAP analyzer
+librosa's per-feature calls each redo the STFT (or a mel spectrogram) of the
+same signal. The engine computes each intermediate once and passes it to the
+S= form of the same librosa functions, with the defaults those functions use
+internally, so the outputs are the ones the y= calls produce:
+- |STFT| (n_fft 2048, hop 512, hann, centered, padded the way the installed
+  librosa's feature functions pad: zeros since 0.9, reflection before)
+  -> centroid, bandwidth, rolloff, contrast
+- |STFT|**2 -> chroma_stft, and through the cached mel filterbank the log-mel
+  spectrogram -> mfcc and the onset envelopes behind tempo / beat_track
+- rms and zero_crossing_rate stay time-domain, as in librosa
+- pitch is pitch_engine's float32 frame-wise f0 contour, kept only as its
+  voiced-frame summary (piptrack's two bins x frames arrays are never built)
+Every intermediate and feature is computed on first use and timed (timings).
+
+Feature profiles name what gets computed at all:
+- fast: energy, ZCR, centroid, bandwidth, pitch, contrast - no onset/beat work
+- standard (default): exactly what analyze_advanced_characteristics reads
+- full: everything, including chroma, MFCC, beat frames and HPSS tonnetz
+IEMOCAP_FEATURE_PROFILE picks the default; a server can drop to "fast" while
+its queue is deep (profile_for_queue_depth).
+"""
+
+import os
+import time
+from functools import lru_cache
+
+from lazy_imports import timed_import
+from pitch_engine import pitch_contour, pitch_summary
+
+N_FFT = 2048
+HOP_LENGTH = 512
+
+# Feature name (key in the IEMOCAP features dict) -> engine method
+FEATURE_METHODS = {
+    "rms_energy": "rms",
+    "zero_crossing_rate": "zero_crossing_rate",
+    "spectral_centroid": "spectral_centroid",
+    "spectral_bandwidth": "spectral_bandwidth",
+    "spectral_rolloff": "spectral_rolloff",
+    "pitch": "pitch",
+    "chroma": "chroma",
+    "mfcc": "mfcc",
+    "tempo": "tempo",
+    "beat_frames": "beat_frames",
+    "spectral_contrast": "spectral_contrast",
+    "tonnetz": "tonnetz",
+}
+
+# Features built from the power spectrogram / log-mel, i.e. from the |STFT| as well
+POWER_FEATURES = ("chroma", "mfcc", "tempo", "beat_frames")
+
+_FAST_FEATURES = ("rms_energy", "zero_crossing_rate", "spectral_centroid", "spectral_bandwidth",
+                  "pitch", "spectral_contrast")
+FEATURE_PROFILES = {
+    "fast": _FAST_FEATURES,
+    "standard": _FAST_FEATURES + ("tempo",),
+    "full": tuple(FEATURE_METHODS),
+}
+DEFAULT_PROFILE = "standard"
+
+
+def resolve_profile(profile=None):
+    """Requested profile, else IEMOCAP_FEATURE_PROFILE, else standard"""
+    profile = profile or os.environ.get("IEMOCAP_FEATURE_PROFILE", DEFAULT_PROFILE)
+    if profile not in FEATURE_PROFILES:
+        raise ValueError(f"unknown feature profile '{profile}' (use {', '.join(FEATURE_PROFILES)})")
+    return profile
+
+
+def profile_for_queue_depth(profile, queue_depth, threshold=None):
+    """Load-shedding hook: "fast" while queue_depth >= threshold (IEMOCAP_FAST_QUEUE_DEPTH, 0 = never)"""
+    if threshold is None:
+        threshold = int(os.environ.get("IEMOCAP_FAST_QUEUE_DEPTH", "8"))
+    if threshold > 0 and queue_depth >= threshold:
+        return "fast"
+    return profile
+
+
+@lru_cache(maxsize=8)
+def mel_basis(sr, n_fft=N_FFT, n_mels=128):
+    """librosa.filters.mel, built once per (sr, n_fft, n_mels) for the process"""
+    librosa = timed_import("librosa")
+    return librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+
+
+@lru_cache(maxsize=1)
+def feature_pad_mode():
+    """pad_mode the installed librosa's feature functions give their own STFT (reflect before 0.9)"""
+    import inspect
+    librosa = timed_import("librosa")
+    return inspect.signature(librosa.feature.spectral_centroid).parameters["pad_mode"].default
+
+
+class SpectralFeatureEngine:
+    def __init__(self, y, sr, n_fft=N_FFT, hop_length=HOP_LENGTH, precomputed=None):
+        self.y = y
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        # name -> milliseconds of its own work; an intermediate computed on the way
+        # (stft, log_mel, ...) is timed under its own name, so the values add up
+        self.timings = {}
+        # Features already computed for this clip elsewhere (batch_features.batch_stft_features)
+        # are served as they are and not timed here
+        self._cache = dict(precomputed or {})
+        self._nested_ms = 0.0
+
+    def _get(self, name, compute):
+        if name not in self._cache:
+            outer_nested = self._nested_ms
+            self._nested_ms = 0.0
+            started = time.perf_counter()
+            self._cache[name] = compute()
+            elapsed = (time.perf_counter() - started) * 1000.0
+            self.timings[name] = round(elapsed - self._nested_ms, 3)
+            self._nested_ms = outer_nested + elapsed
+        return self._cache[name]
+
+    # -- shared intermediates -------------------------------------------------------
+
+    @property
+    def magnitude(self):
+        """|STFT| as librosa's _spectrogram(power=1) builds it"""
+        def compute():
+            np = timed_import("numpy")
+            librosa = timed_import("librosa")
+            return np.abs(librosa.stft(self.y, n_fft=self.n_fft, hop_length=self.hop_length,
+                                       window="hann", center=True, pad_mode=feature_pad_mode()))
+        return self._get("stft", compute)
+
+    @property
+    def power(self):
+        return self._get("power", lambda: self.magnitude ** 2)
+
+    @property
+    def log_mel(self):
+        """power_to_db(melspectrogram) - the input of mfcc and onset_strength"""
+        def compute():
+            np = timed_import("numpy")
+            librosa = timed_import("librosa")
+            mel = np.einsum("...ft,mf->...mt", self.power, mel_basis(self.sr, self.n_fft), optimize=True)
+            return librosa.power_to_db(mel)
+        return self._get("log_mel", compute)
+
+    def onset_envelope(self, aggregate=None):
+        """onset_strength; tempo() uses the default mean, beat_track() the median"""
+        np = timed_import("numpy")
+        librosa = timed_import("librosa")
+        aggregate = aggregate or np.mean
+        return self._get(
+            f"onset_{aggregate.__name__}",
+            lambda: librosa.onset.onset_strength(S=self.log_mel, sr=self.sr, hop_length=self.hop_length,
+                                                 n_fft=self.n_fft, aggregate=aggregate)
+        )
+
+    def extract(self, profile=DEFAULT_PROFILE):
+        """{feature name: value} for every feature in the profile"""
+        return {name: getattr(self, FEATURE_METHODS[name])() for name in FEATURE_PROFILES[profile]}
+
+    # -- features -------------------------------------------------------------------
+
+    def rms(self):
+        librosa = timed_import("librosa")
+        return self._get("rms_energy", lambda: librosa.feature.rms(y=self.y))
+
+    def zero_crossing_rate(self):
+        librosa = timed_import("librosa")
+        return self._get("zero_crossing_rate", lambda: librosa.feature.zero_crossing_rate(self.y))
+
+    def spectral_centroid(self):
+        librosa = timed_import("librosa")
+        return self._get("spectral_centroid", lambda: librosa.feature.spectral_centroid(S=self.magnitude, sr=self.sr))
+
+    def spectral_bandwidth(self):
+        librosa = timed_import("librosa")
+        return self._get("spectral_bandwidth", lambda: librosa.feature.spectral_bandwidth(S=self.magnitude, sr=self.sr))
+
+    def spectral_rolloff(self):
+        librosa = timed_import("librosa")
+        return self._get("spectral_rolloff", lambda: librosa.feature.spectral_rolloff(S=self.magnitude, sr=self.sr))
+
+    def spectral_contrast(self):
+        librosa = timed_import("librosa")
+        return self._get("spectral_contrast", lambda: librosa.feature.spectral_contrast(S=self.magnitude, sr=self.sr))
+
+    def pitch(self):
+        """Summary (voiced_ratio, mean, median, std, min, max) of the f0 contour - the contour is not kept"""
+        return self._get("pitch", lambda: pitch_summary(pitch_contour(self.y, self.sr)))
+
+    def chroma(self):
+        librosa = timed_import("librosa")
+        return self._get("chroma", lambda: librosa.feature.chroma_stft(S=self.power, sr=self.sr))
+
+    def mfcc(self, n_mfcc=13):
+        librosa = timed_import("librosa")
+        return self._get("mfcc", lambda: librosa.feature.mfcc(S=self.log_mel, n_mfcc=n_mfcc))
+
+    def tempo(self):
+        librosa = timed_import("librosa")
+        return self._get("tempo", lambda: librosa.beat.tempo(onset_envelope=self.onset_envelope(),
+                                                            sr=self.sr, hop_length=self.hop_length))
+
+    def beat_frames(self):
+        np = timed_import("numpy")
+        librosa = timed_import("librosa")
+        return self._get("beat_frames", lambda: librosa.beat.beat_track(
+            onset_envelope=self.onset_envelope(np.median), sr=self.sr, hop_length=self.hop_length)[1])
+
+    def tonnetz(self):
+        """Harmonic-percussive separation + CQT chroma: its own transforms, nothing to share"""
+        librosa = timed_import("librosa")
+        return self._get("tonnetz", lambda: librosa.feature.tonnetz(y=librosa.effects.harmonic(self.y), sr=self.sr))
@@ -0,0 +1,187 @@
+"""
+Opt-in Wav2Vec2 embeddings for the IEMOCAP analyzer
+Off unless IEMOCAP_WAV2VEC2=true; when off, neither torch nor transformers is
+imported. When on:
+- the base Wav2Vec2Model (no randomly initialized classification head) runs
+  on padded batches of utterances, shortest first to keep padding small
+- each clip is mean-pooled over its own frames (padding excluded) into one
+  vector, cached by audio content, so a clip is never embedded twice
+- a linear head trained offline (IEMOCAP_WAV2VEC2_HEAD, an .npz with
+  "labels", "weight" [E x D] and "bias" [E]) turns the vectors into emotion
+  probabilities that the profile matcher blends in (IEMOCAP_WAV2VEC2_WEIGHT)
+No head ships with the repo: fit one on labelled recordings with
+train_emotion_head.py. Without a head the analyzer stays feature-based.
+"""
+
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from lazy_imports import timed_import, import_transformers
+
+WAV2VEC2_MODEL = "facebook/wav2vec2-base-960h"
+
+
+def wav2vec2_enabled():
+    return os.environ.get("IEMOCAP_WAV2VEC2", "false").strip().lower() == "true"
+
+
+def clip_key(audio, sr):
+    """Content key of a decoded clip: same samples at the same rate -> same key"""
+    samples = np.ascontiguousarray(audio, dtype=np.float32)
+    return f"{sr}:{hashlib.blake2b(samples.tobytes(), digest_size=16).hexdigest()}"
+
+
+class EmotionHead:
+    """Linear emotion classifier over pooled embeddings, loaded from an .npz"""
+
+    def __init__(self, labels, weight, bias):
+        self.labels = [str(label) for label in labels]
+        self.weight = np.asarray(weight, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        if self.weight.shape != (len(self.labels), self.weight.shape[1]) or self.bias.shape != (len(self.labels),):
+            raise ValueError(f"head shapes do not match {len(self.labels)} labels: "
+                             f"weight {self.weight.shape}, bias {self.bias.shape}")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as head:
+            return cls(head["labels"], head["weight"], head["bias"])
+
+    @property
+    def dim(self):
+        return self.weight.shape[1]
+
+    def scores(self, embeddings):
+        """[N x D] embeddings -> one {label: probability} dict per row"""
+        logits = np.asarray(embeddings, dtype=np.float32) @ self.weight.T + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return [dict(zip(self.labels, row.tolist())) for row in probabilities]
+
+
+class Wav2Vec2Embedder:
+    def __init__(self, model_name=WAV2VEC2_MODEL, batch_size=None, cache_entries=None, device="cpu"):
+        torch = timed_import("torch")
+        transformers = import_transformers()
+
+        self.device = torch.device(device)
+        self.feature_extractor = transformers.Wav2Vec2FeatureExtractor.from_pretrained(model_name)
+        self.model = transformers.Wav2Vec2Model.from_pretrained(model_name).to(self.device)
+        self.model.eval()
+        # Group-norm checkpoints (base) were trained on zero padding without a mask
+        self.pass_attention_mask = getattr(self.model.config, "feat_extract_norm", "group") == "layer"
+
+        self.batch_size = max(1, int(batch_size or os.environ.get("IEMOCAP_WAV2VEC2_BATCH", "8")))
+        self.cache_entries = max(0, int(cache_entries if cache_entries is not None
+                                        else os.environ.get("IEMOCAP_EMBEDDING_CACHE_ENTRIES", "256")))
+        self.cache = OrderedDict()  # clip key -> pooled embedding (float32 [D])
+        self.cache_lock = threading.Lock()
+        self.model_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def dim(self):
+        return int(self.model.config.hidden_size)
+
+    def _cached(self, key):
+        with self.cache_lock:
+            embedding = self.cache.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def _store(self, key, embedding):
+        if not self.cache_entries:
+            return
+        with self.cache_lock:
+            self.cache[key] = embedding
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_entries:
+                self.cache.popitem(last=False)
+
+    def embed(self, clips, sr=16000):
+        """Pooled embedding ([D] float32) per clip; uncached clips run in padded batches"""
+        keys = [clip_key(clip, sr) for clip in clips]
+        embeddings = [self._cached(key) for key in keys]
+
+        # One forward pass per distinct uncached clip, similar lengths batched together
+        todo = {}
+        for index, key in enumerate(keys):
+            if embeddings[index] is None:
+                todo.setdefault(key, index)
+        order = sorted(todo.values(), key=lambda index: len(clips[index]))
+
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            pooled = self._forward([clips[index] for index in batch], sr)
+            for index, embedding in zip(batch, pooled):
+                self._store(keys[index], embedding)
+                todo[keys[index]] = embedding
+
+        return [embedding if embedding is not None else todo[key] for key, embedding in zip(keys, embeddings)]
+
+    def _forward(self, clips, sr):
+        torch = timed_import("torch")
+        inputs = self.feature_extractor(
+            [np.asarray(clip, dtype=np.float32) for clip in clips],
+            sampling_rate=sr,
+            padding=True,
+            return_attention_mask=True,
+            return_tensors="pt"
+        )
+        input_values = inputs["input_values"].to(self.device)
+        attention_mask = inputs["attention_mask"].to(self.device)
+
+        with self.model_lock, torch.inference_mode():
+            outputs = self.model(input_values, attention_mask=attention_mask if self.pass_attention_mask else None)
+            hidden = outputs.last_hidden_state  # [B x frames x D]
+
+            # Mean over each clip's own frames - padded frames are left out
+            frame_lengths = self.model._get_feat_extract_output_lengths(attention_mask.sum(dim=-1))
+            frames = torch.arange(hidden.shape[1], device=hidden.device)
+            frame_mask = (frames[None, :] < frame_lengths[:, None]).to(hidden.dtype)
+            pooled = (hidden * frame_mask[..., None]).sum(dim=1) / frame_mask.sum(dim=1, keepdim=True).clamp(min=1.0)
+
+        return list(pooled.float().cpu().numpy())
+
+    def stats(self):
+        with self.cache_lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": WAV2VEC2_MODEL,
+                "batch_size": self.batch_size,
+                "cache_entries": len(self.cache),
+                "max_cache_entries": self.cache_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def load_neural_scorer():
+    """(embedder, head) when IEMOCAP_WAV2VEC2 is on and a usable head is configured, else (None, None)"""
+    if not wav2vec2_enabled():
+        return None, None
+
+    head_path = os.environ.get("IEMOCAP_WAV2VEC2_HEAD", "")
+    if not head_path or not os.path.exists(head_path):
+        # Pooled embeddings alone do not score anything - do not load the model for nothing
+        print("⚠️ IEMOCAP_WAV2VEC2 is on but IEMOCAP_WAV2VEC2_HEAD does not name an .npz head "
+              "(fit one with train_emotion_head.py); using feature-based analysis", file=sys.stderr)
+        return None, None
+
+    head = EmotionHead.load(head_path)
+    embedder = Wav2Vec2Embedder()
+    if head.dim != embedder.dim:
+        raise ValueError(f"head expects {head.dim}-dim embeddings, {WAV2VEC2_MODEL} produces {embedder.dim}")
+    return embedder, head
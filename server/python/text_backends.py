@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Selectable CPU inference backends for the RoBERTa GoEmotions classifier
+- torch:      fp32 PyTorch pipeline (default, unchanged behaviour)
+- torch_int8: PyTorch dynamic int8 quantization of the Linear layers
+- onnx:       exported ONNX model run with onnxruntime (export cached on disk)
+Every backend returns pipeline-shaped output: one list of {label, score} per text.
+
+Parity check against fp32 on a fixed corpus:
+    python text_backends.py parity <torch_int8|onnx>
+Export (or refresh) the cached ONNX model:
+    python text_backends.py export
+"""
+
+import os
+import sys
+import json
+import time
+import contextlib
+
+from lazy_imports import timed_import, import_transformers
+
+TEXT_MODEL_NAME = "SamLowe/roberta-base-go_emotions"
+BACKENDS = ("torch", "torch_int8", "onnx")
+
+DEFAULT_ONNX_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "models", "onnx", "roberta-base-go_emotions"
+)
+
+# Fixed corpus for backend parity checks - mix of short chat phrases and longer messages
+PARITY_CORPUS = [
+    "I'm fine",
+    "I don't know",
+    "Hello, how are you today?",
+    "I am so stressed about my exams next week.",
+    "Thank you so much, that really helped me!",
+    "I feel like nobody listens to me anymore.",
+    "Why does this always happen to me? I'm so angry.",
+    "I'm scared that I will stutter during my presentation.",
+    "Wow, I didn't expect that at all!",
+    "That is disgusting, I can't believe they did that.",
+    "I'm really proud of how far I've come with my speech practice.",
+    "I miss my grandmother every single day since she passed away.",
+    "Can you explain that again? I'm a bit confused.",
+    "I finally said the whole sentence without stopping, I'm so happy!",
+    "Sometimes I feel nervous when I have to order food at a restaurant.",
+    "It's okay I guess, nothing special happened today.",
+    "I'm sorry, I shouldn't have said that to my friend.",
+    "I'm curious how these exercises are supposed to work.",
+    "Everything is overwhelming and I don't know where to start.",
+    "I love talking with you, it makes me feel calm.",
+]
+
+
+def get_text_backend():
+    """Backend selected through EMOTION_TEXT_BACKEND (torch | torch_int8 | onnx)"""
+    backend = os.environ.get("EMOTION_TEXT_BACKEND", "torch").strip().lower()
+    if backend not in BACKENDS:
+        print(f"⚠️ Unknown EMOTION_TEXT_BACKEND '{backend}', using torch", file=sys.stderr)
+        return "torch"
+    return backend
+
+
+def get_onnx_dir():
+    return os.path.abspath(os.environ.get("EMOTION_ONNX_DIR", DEFAULT_ONNX_DIR))
+
+
+def load_text_classifier(backend="torch", model_name=TEXT_MODEL_NAME):
+    """Load the GoEmotions classifier on CPU with the requested backend"""
+    if backend == "onnx":
+        return OnnxTextClassifier(ensure_onnx_export(model_name))
+
+    torch = timed_import("torch")
+    transformers = import_transformers()
+    pipeline = transformers.pipeline
+    AutoTokenizer = transformers.AutoTokenizer
+    AutoModelForSequenceClassification = transformers.AutoModelForSequenceClassification
+
+    with open(os.devnull, 'w') as devnull:
+        with contextlib.redirect_stdout(devnull):
+            if backend == "torch_int8":
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                model = AutoModelForSequenceClassification.from_pretrained(
+                    model_name, torch_dtype=torch.float32, low_cpu_mem_usage=True
+                )
+                model.eval()
+                # Weights of every Linear layer stored as int8, activations quantized on the fly
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                return pipeline(
+                    "text-classification",
+                    model=model,
+                    tokenizer=tokenizer,
+                    device=-1,
+                    return_all_scores=True
+                )
+
+            return pipeline(
+                "text-classification",
+                model=model_name,
+                tokenizer=model_name,
+                device=-1,  # CPU
+                return_all_scores=True,
+                model_kwargs={
+                    "torch_dtype": torch.float32,  # Use float32 for CPU
+                    "low_cpu_mem_usage": True,
+                    "device_map": None
+                }
+            )
+
+
+def ensure_onnx_export(model_name=TEXT_MODEL_NAME, onnx_dir=None, force=False):
+    """Export the classifier to ONNX once; later loads reuse the cached artifact"""
+    onnx_dir = onnx_dir or get_onnx_dir()
+    onnx_path = os.path.join(onnx_dir, "model.onnx")
+    if os.path.exists(onnx_path) and not force:
+        return onnx_dir
+
+    torch = timed_import("torch")
+    transformers = import_transformers()
+    AutoTokenizer = transformers.AutoTokenizer
+    AutoModelForSequenceClassification = transformers.AutoModelForSequenceClassification
+
+    print(f"📦 Exporting {model_name} to ONNX ({onnx_dir})...", file=sys.stderr)
+    start_time = time.time()
+    os.makedirs(onnx_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, torch_dtype=torch.float32)
+    model.eval()
+    model.config.return_dict = False
+
+    dummy = tokenizer(["export sample text"], return_tensors="pt")
+    tmp_path = onnx_path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            tmp_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"}
+            },
+            opset_version=14
+        )
+    # Tokenizer and config next to the graph so loading never needs the PyTorch weights
+    tokenizer.save_pretrained(onnx_dir)
+    model.config.save_pretrained(onnx_dir)
+    os.replace(tmp_path, onnx_path)
+
+    print(f"✅ ONNX export finished in {time.time() - start_time:.1f}s", file=sys.stderr)
+    return onnx_dir
+
+
+class OnnxTextClassifier:
+    """onnxruntime-backed stand-in for the text-classification pipeline"""
+
+    def __init__(self, onnx_dir):
+        onnxruntime = timed_import("onnxruntime")
+        transformers = import_transformers()
+        AutoConfig = transformers.AutoConfig
+        AutoTokenizer = transformers.AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+        config = AutoConfig.from_pretrained(onnx_dir)
+        self.labels = [config.id2label[i] for i in range(config.num_labels)]
+        # Same post-processing the pipeline picks for this checkpoint
+        self.multi_label = config.problem_type == "multi_label_classification" or config.num_labels == 1
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(onnx_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+
+    def __call__(self, texts, batch_size=None, **kwargs):
+        np = timed_import("numpy")
+
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        batch_size = batch_size or len(texts) or 1
+        outputs = []
+
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=512,
+                return_tensors="np"
+            )
+            logits = self.session.run(
+                ["logits"],
+                {
+                    "input_ids": encoded["input_ids"].astype(np.int64),
+                    "attention_mask": encoded["attention_mask"].astype(np.int64)
+                }
+            )[0]
+
+            if self.multi_label:
+                scores = 1.0 / (1.0 + np.exp(-logits))
+            else:
+                shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+                scores = shifted / shifted.sum(axis=-1, keepdims=True)
+
+            for row in scores:
+                outputs.append([{"label": label, "score": float(score)} for label, score in zip(self.labels, row)])
+
+        return [outputs[0]] if single else outputs
+
+
+def _scores_by_label(output):
+    scores = output[0] if output and isinstance(output[0], list) else output
+    return {item["label"]: item["score"] for item in scores}
+
+
+def parity_report(backend, corpus=None):
+    """Compare a backend against fp32 PyTorch: top-label agreement, score deltas, speed"""
+    corpus = corpus or PARITY_CORPUS
+    reference_model = load_text_classifier("torch")
+    candidate_model = load_text_classifier(backend)
+
+    timings = {}
+    outputs = {}
+    for name, model in (("torch", reference_model), (backend, candidate_model)):
+        model(corpus[:2], batch_size=2)  # warm-up
+        start_time = time.perf_counter()
+        outputs[name] = model(corpus, batch_size=len(corpus))
+        timings[name] = (time.perf_counter() - start_time) * 1000.0
+
+    agreements = 0
+    max_delta = 0.0
+    disagreements = []
+    for text, reference, candidate in zip(corpus, outputs["torch"], outputs[backend]):
+        reference_scores = _scores_by_label(reference)
+        candidate_scores = _scores_by_label(candidate)
+        reference_top = max(reference_scores, key=reference_scores.get)
+        candidate_top = max(candidate_scores, key=candidate_scores.get)
+
+        if reference_top == candidate_top:
+            agreements += 1
+        else:
+            disagreements.append({"text": text, "fp32": reference_top, backend: candidate_top})
+
+        for label, score in reference_scores.items():
+            max_delta = max(max_delta, abs(score - candidate_scores.get(label, 0.0)))
+
+    return {
+        "backend": backend,
+        "corpus_size": len(corpus),
+        "top_label_agreement": agreements / len(corpus),
+        "max_score_delta": max_delta,
+        "fp32_ms": timings["torch"],
+        "backend_ms": timings[backend],
+        "speedup": timings["torch"] / timings[backend] if timings[backend] > 0 else 0.0,
+        "disagreements": disagreements
+    }
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("parity", "export"):
+        print("Usage: python text_backends.py parity <torch_int8|onnx>")
+        print("       python text_backends.py export")
+        sys.exit(1)
+
+    if sys.argv[1] == "export":
+        print(json.dumps({"onnx_dir": ensure_onnx_export(force=True)}))
+        return
+
+    backend = sys.argv[2] if len(sys.argv) > 2 else "onnx"
+    if backend not in BACKENDS:
+        print(f"Unknown backend: {backend}")
+        sys.exit(1)
+
+    print(json.dumps(parity_report(backend), indent=2))
+
+
+if __name__ == "__main__":
+    main()
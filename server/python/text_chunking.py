@@ -0,0 +1,105 @@
+"""
+Sliding-window chunking for long text emotion analysis
+Splits journal-style messages into overlapping windows on sentence boundaries
+so the whole message is classified instead of only its first 512 characters.
+- Windows are at most max_chars long (the same input size the models already see)
+- Consecutive windows overlap by up to overlap_chars of trailing sentences
+- Window scores are aggregated with mean, max or length-weighted mean
+"""
+
+import os
+import re
+
+AGGREGATIONS = ("mean", "max", "weighted")
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def long_text_mode():
+    """EMOTION_LONG_TEXT: 'truncate' (default, first 512 chars) or 'chunked'"""
+    return os.environ.get("EMOTION_LONG_TEXT", "truncate").strip().lower()
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in _SENTENCE_BOUNDARY.split(text) if sentence and sentence.strip()]
+
+
+def _split_long_sentence(sentence, max_chars):
+    """Break a run-on sentence on word boundaries (hard cut for giant tokens)"""
+    pieces = []
+    current = ""
+    for word in sentence.split():
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        candidate = f"{current} {word}" if current else word
+        if len(candidate) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_windows(text, max_chars=512, overlap_chars=128):
+    """Greedy sentence packing into overlapping windows of at most max_chars"""
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    units = []
+    for sentence in split_sentences(text):
+        if len(sentence) > max_chars:
+            units.extend(_split_long_sentence(sentence, max_chars))
+        else:
+            units.append(sentence)
+
+    windows = []
+    start = 0
+    while start < len(units):
+        end = start
+        length = 0
+        while end < len(units) and length + len(units[end]) + (1 if end > start else 0) <= max_chars:
+            length += len(units[end]) + (1 if end > start else 0)
+            end += 1
+        end = max(end, start + 1)
+        windows.append(" ".join(units[start:end]))
+
+        if end >= len(units):
+            break
+
+        # Step back over trailing sentences for context overlap, always moving forward
+        next_start = end
+        overlap = 0
+        while next_start - 1 > start and overlap + len(units[next_start - 1]) <= overlap_chars:
+            next_start -= 1
+            overlap += len(units[next_start])
+        start = next_start
+
+    return windows
+
+
+def aggregate_scores(score_dicts, weights=None, method="mean"):
+    """Combine per-window {label: score} dicts into one score dict"""
+    if not score_dicts:
+        return {}
+
+    labels = list(dict.fromkeys(label for scores in score_dicts for label in scores))
+
+    if method == "max":
+        return {label: max(scores.get(label, 0.0) for scores in score_dicts) for label in labels}
+
+    if method == "weighted" and weights:
+        total = float(sum(weights)) or 1.0
+        return {
+            label: sum(scores.get(label, 0.0) * weight for scores, weight in zip(score_dicts, weights)) / total
+            for label in labels
+        }
+
+    count = float(len(score_dicts))
+    return {label: sum(scores.get(label, 0.0) for scores in score_dicts) / count for label in labels}
@@ -7,14 +7,17 @@ for fast, consistent therapeutic responses without memory issues
 
 import sys
 import json
+import time
+_IMPORT_START = time.perf_counter()
 import torch
 import gc
 import warnings
 import signal
-import time
 import os
 from transformers import AutoTokenizer, AutoModelForCausalLM
 from peft import PeftModel
+from server_readiness import warmup_runs, run_warmup, emit_ready
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 warnings.filterwarnings('ignore')
 
@@ -27,6 +30,8 @@ class PersistentTherapeuticModel:
         self.device = torch.device('cpu')
         self.model_loaded = False
         self.running = True
+        self.load_seconds = 0.0
+        self.warmup_summary = None
         
         print(f"🚀 Persistent Therapeutic Model Server - CPU-ONLY mode", file=sys.stderr)
         print(f"💻 Using device: {self.device} (forced CPU for stability and training)", file=sys.stderr)
@@ -114,6 +119,7 @@ class PersistentTherapeuticModel:
             print(f"✅ Model loaded on CPU and ready for training/inference", file=sys.stderr)
             
             load_time = time.time() - start_time
+            self.load_seconds = load_time
             print(f"✅ Superior therapeutic model loaded in {load_time:.2f}s", file=sys.stderr)
             
             # Memory info
@@ -129,6 +135,30 @@ class PersistentTherapeuticModel:
             self.model_loaded = False
             return False
     
+    def warm_up(self, runs=None):
+        """A few short greedy generations so the first user request skips lazy init"""
+        runs = warmup_runs("THERAPEUTIC", default=1) if runs is None else runs
+        if not self.model_loaded:
+            runs = 0
+        
+        def generate_once():
+            prompt = f"{self._get_therapeutic_system_prompt('general')}\n\nUser: I feel a bit nervous today.\nTherapist:"
+            inputs = self.tokenizer(prompt, return_tensors="pt", truncation=True, max_length=400).to('cpu')
+            with torch.no_grad():
+                self.model.generate(
+                    **inputs,
+                    max_new_tokens=8,
+                    do_sample=False,
+                    pad_token_id=self.tokenizer.pad_token_id or self.tokenizer.eos_token_id,
+                    eos_token_id=self.tokenizer.eos_token_id,
+                    use_cache=True
+                )
+        
+        if runs:
+            print(f"🔥 Warming up therapeutic model ({runs} runs)...", file=sys.stderr)
+        self.warmup_summary = run_warmup(generate_once, runs)
+        return self.warmup_summary
+    
     def generate_response(self, user_input, emotion="general", history=None):
         """Generate superior therapeutic response using cached model"""
         try:
@@ -340,6 +370,14 @@ class PersistentTherapeuticModel:
     
     def run_server(self):
         """Main server loop - reads JSON requests from stdin"""
+        emit_ready(
+            "therapeutic",
+            IMPORT_SECONDS,
+            self.load_seconds,
+            self.warmup_summary,
+            model_loaded=self.model_loaded,
+            model_path=self.model_path
+        )
         print("📡 Therapeutic model server ready for requests", file=sys.stderr)
         
         while self.running:
@@ -395,6 +433,7 @@ def main():
     try:
         model_path = sys.argv[1] if len(sys.argv) > 1 else "E:/Fluenti/models/fluenti_therapeutic_model"
         server = PersistentTherapeuticModel(model_path)
+        server.warm_up()
         server.run_server()
     except Exception as e:
         print(f"❌ Server error: {e}", file=sys.stderr)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Fit and export the linear emotion head for the IEMOCAP analyzer's Wav2Vec2 path
+speech_embeddings.py only scores emotions through a head trained offline
+(IEMOCAP_WAV2VEC2_HEAD); this script produces it from labelled recordings:
+- Each clip is decoded and speech-trimmed exactly as the analyzer does, then
+  mean-pooled through the same Wav2Vec2Embedder (padded batches)
+- A multinomial logistic regression (L2, optional class balancing) is fitted
+  with numpy on standardized embeddings; the standardization is folded back
+  into the weights, so the head applies to raw pooled vectors
+- A stratified holdout reports accuracy before the final fit on all clips
+- The .npz holds "labels", "weight" [E x D] and "bias" [E] (EmotionHead.load)
+Labels should be emotion names of the analyzer's profiles (anger, sadness,
+neutral, ...): a label no profile has still trains, but is not blended in.
+
+Usage:
+    python train_emotion_head.py labelled.jsonl --output emotion_head.npz
+    IEMOCAP_WAV2VEC2=true IEMOCAP_WAV2VEC2_HEAD=emotion_head.npz python iemocap_server.py
+The manifest has one JSON object per line with "audio_path"/"path" and
+"label"/"emotion", or "path,label" CSV lines (relative to the manifest);
+blank lines and # comments are skipped.
+"""
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+
+from audio_io import load_audio
+from voice_activity import trim_to_speech
+from speech_embeddings import Wav2Vec2Embedder
+
+
+def read_labelled_manifest(path):
+    """[(audio path, label)] from a JSONL or "path,label" manifest"""
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    with open(path, "r", encoding="utf-8") as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                audio_path = entry.get("audio_path") or entry.get("path") or ""
+                label = entry.get("label") or entry.get("emotion") or ""
+            else:
+                audio_path, _, label = line.rpartition(",")
+            audio_path, label = audio_path.strip(), str(label).strip().lower()
+            if not audio_path or not label:
+                raise ValueError(f"manifest line without path and label: {line[:80]}")
+            entries.append((audio_path if os.path.isabs(audio_path) else os.path.join(base, audio_path), label))
+    return entries
+
+
+def fit_linear_head(embeddings, targets, n_classes, l2=1e-3, epochs=500, learning_rate=0.5, balanced=False):
+    """
+    Softmax regression by full-batch gradient descent on standardized inputs
+    Returns (weight [E x D], bias [E]) for raw inputs: logits = x @ weight.T + bias
+    """
+    x = np.asarray(embeddings, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.int64)
+    mean = x.mean(axis=0)
+    scale = x.std(axis=0)
+    scale[scale < 1e-8] = 1.0
+    x = (x - mean) / scale
+
+    one_hot = np.eye(n_classes)[targets]
+    counts = np.bincount(targets, minlength=n_classes).astype(np.float64)
+    if balanced:
+        sample_weight = (len(targets) / (n_classes * np.maximum(counts, 1.0)))[targets]
+    else:
+        sample_weight = np.ones(len(targets))
+    sample_weight /= sample_weight.sum()
+
+    weight = np.zeros((n_classes, x.shape[1]))
+    bias = np.log(np.maximum(counts, 1.0) / counts.sum()) if not balanced else np.zeros(n_classes)
+    for _ in range(epochs):
+        logits = x @ weight.T + bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        error = (probabilities - one_hot) * sample_weight[:, None]
+        weight -= learning_rate * (error.T @ x + l2 * weight)
+        bias -= learning_rate * error.sum(axis=0)
+
+    # Fold the standardization in: w . (x - mean) / scale + b == (w / scale) . x + (b - w . mean / scale)
+    raw_weight = weight / scale
+    raw_bias = bias - raw_weight @ mean
+    return raw_weight.astype(np.float32), raw_bias.astype(np.float32)
+
+
+def stratified_holdout(targets, fraction, seed=0):
+    """(train indices, holdout indices) with about `fraction` of every class held out"""
+    rng = np.random.default_rng(seed)
+    train, holdout = [], []
+    for label in np.unique(targets):
+        members = rng.permutation(np.flatnonzero(targets == label))
+        n_holdout = int(round(len(members) * fraction)) if len(members) > 1 else 0
+        holdout.extend(members[:n_holdout])
+        train.extend(members[n_holdout:])
+    return np.array(sorted(train), dtype=np.int64), np.array(sorted(holdout), dtype=np.int64)
+
+
+def embed_manifest(entries, embedder, sr=16000):
+    """Pooled embedding per readable clip -> (embeddings [N x D], kept entries)"""
+    clips, kept = [], []
+    for audio_path, label in entries:
+        try:
+            audio, _, _ = load_audio(audio_path, sr=sr)
+        except Exception as e:
+            print(f"⚠️ Skipping {audio_path}: {e}", file=sys.stderr)
+            continue
+        audio, _ = trim_to_speech(audio, sr)
+        if len(audio) == 0:
+            print(f"⚠️ Skipping {audio_path}: empty audio", file=sys.stderr)
+            continue
+        clips.append(audio)
+        kept.append((audio_path, label))
+
+    embeddings = []
+    for start in range(0, len(clips), embedder.batch_size):
+        embeddings.extend(embedder.embed(clips[start:start + embedder.batch_size], sr))
+        print(f"⏱️ Embedded {len(embeddings)}/{len(clips)} clips", file=sys.stderr)
+    return np.stack(embeddings) if embeddings else np.zeros((0, embedder.dim), np.float32), kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the Wav2Vec2 emotion head used by IEMOCAP_WAV2VEC2_HEAD")
+    parser.add_argument("manifest", help="labelled clips: JSON objects or path,label lines")
+    parser.add_argument("--output", required=True, help="head .npz to write")
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of each class held out for the report")
+    parser.add_argument("--l2", type=float, default=1e-3, help="L2 penalty on the standardized weights")
+    parser.add_argument("--epochs", type=int, default=500, help="gradient descent steps")
+    parser.add_argument("--balanced", action="store_true", help="weight classes inversely to their frequency")
+    args = parser.parse_args()
+
+    try:
+        entries = read_labelled_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": f"Cannot read {args.manifest}: {e}"}))
+        sys.exit(1)
+
+    embedder = Wav2Vec2Embedder()
+    embeddings, kept = embed_manifest(entries, embedder)
+    labels = sorted({label for _, label in kept})
+    if len(labels) < 2:
+        print(json.dumps({"error": f"Need at least two labels, got {labels}"}))
+        sys.exit(1)
+    targets = np.array([labels.index(label) for _, label in kept])
+
+    options = {"l2": args.l2, "epochs": args.epochs, "balanced": args.balanced}
+    holdout_accuracy = None
+    train, holdout = stratified_holdout(targets, args.holdout)
+    if len(holdout):
+        weight, bias = fit_linear_head(embeddings[train], targets[train], len(labels), **options)
+        predicted = np.argmax(embeddings[holdout] @ weight.T + bias, axis=1)
+        holdout_accuracy = float(np.mean(predicted == targets[holdout]))
+
+    weight, bias = fit_linear_head(embeddings, targets, len(labels), **options)
+    np.savez(args.output, labels=np.array(labels), weight=weight, bias=bias)
+
+    print(json.dumps({
+        "output": args.output,
+        "clips": len(kept),
+        "skipped": len(entries) - len(kept),
+        "labels": {label: int(np.sum(targets == index)) for index, label in enumerate(labels)},
+        "dim": int(weight.shape[1]),
+        "holdout_clips": int(len(holdout)),
+        "holdout_accuracy": holdout_accuracy
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@
 Phase 4 TTS Generator - Windows SAPI Implementation
 Generates speech audio from text using Windows Speech API
 Optimized for real-time therapeutic responses
+Request {"response_format": "frame"} to get the WAV as the raw body of a binary
+frame (frame_protocol.py) instead of base64 inside the JSON response
 """
 
 import sys
@@ -13,9 +15,11 @@ import os
 import time
 import subprocess
 from datetime import datetime
+from frame_protocol import encode_frame
 
-def generate_tts_audio(text, language="en"):
-    """Generate TTS audio using Windows SAPI - Ultra Fast"""
+def generate_tts_audio(text, language="en", raw_audio=False):
+    """Generate TTS audio using Windows SAPI - Ultra Fast
+    raw_audio=True returns the WAV bytes under "audio" instead of audioBase64"""
     try:
         start_time = time.time()
         
@@ -54,9 +58,7 @@ $synth.Dispose()
             with open(audio_path, 'rb') as f:
                 audio_data = f.read()
             
-            # Convert to base64
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-            
+
             # Cleanup
             try:
                 os.remove(script_path)
@@ -66,14 +68,19 @@ $synth.Dispose()
             
             processing_time = time.time() - start_time
             
-            return {
-                "audioBase64": audio_base64,
+            result = {
                 "text": text,
                 "language": language,
                 "processing_time": processing_time,
                 "model": "windows_sapi_fast",
                 "timestamp": datetime.now().isoformat()
             }
+            if raw_audio:
+                result["audio"] = audio_data
+            else:
+                # Convert to base64
+                result["audioBase64"] = base64.b64encode(audio_data).decode('utf-8')
+            return result
         else:
             raise Exception(f"PowerShell TTS failed: {result.stderr}")
             
@@ -85,8 +92,18 @@ $synth.Dispose()
             "language": language
         }
 
+def write_frame(result):
+    """Framed response: JSON header without the audio, WAV bytes as the body"""
+    audio = result.pop("audio", None) or b""
+    result.pop("audioBase64", None)
+    result["audioBytes"] = len(audio)
+    result["contentType"] = "audio/wav" if audio else None
+    sys.stdout.buffer.write(encode_frame(result, audio))
+    sys.stdout.buffer.flush()
+
 def main():
     """Main function for subprocess calls"""
+    framed = False
     try:
         # Read request from stdin
         request_line = sys.stdin.readline().strip()
@@ -97,22 +114,31 @@ def main():
         request_data = json.loads(request_line)
         text = request_data.get("text", "")
         language = request_data.get("language", "en")
+        framed = request_data.get("response_format") == "frame"
         
         if not text:
-            print(json.dumps({"error": "No text provided", "audioBase64": None}))
+            error = {"error": "No text provided", "audioBase64": None}
+            if framed:
+                write_frame(error)
+            else:
+                print(json.dumps(error))
             return
         
         # Generate TTS audio
-        result = generate_tts_audio(text, language)
+        result = generate_tts_audio(text, language, raw_audio=framed)
         
-        # Output clean JSON
-        print(json.dumps(result))
+        # Output clean JSON (or one frame carrying the WAV)
+        if framed:
+            write_frame(result)
+        else:
+            print(json.dumps(result))
         
     except Exception as e:
-        print(json.dumps({
-            "error": str(e),
-            "audioBase64": None
-        }))
+        error = {"error": str(e), "audioBase64": None}
+        if framed:
+            write_frame(error)
+        else:
+            print(json.dumps(error))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,127 @@
+"""
+Energy-based voice activity detection for the voice analysis paths
+Browser recordings start and end with long silences; every feature computed
+over that dead air costs time and pulls energy and tempo toward silence.
+- Frame energy from hop-sized blocks (one einsum pass, no framed copy)
+- Speech = frames within top_db of the loudest frame and above an absolute floor
+- Pauses shorter than min_silence are bridged, blips shorter than min_speech
+  dropped, and each region padded so word onsets and tails are kept
+trim_to_speech returns the speech regions joined together, so feature
+extraction runs over speech time only, plus a report (speech ratio, speech
+and recording duration, segment count).
+VOICE_ACTIVITY_TRIM=false turns trimming off; VOICE_ACTIVITY_TOP_DB sets top_db.
+"""
+
+import os
+import time
+
+from lazy_imports import timed_import
+
+HOP_LENGTH = 256    # 16 ms at 16 kHz
+FRAME_BLOCKS = 2    # frame = 2 hops = 32 ms
+TOP_DB = 40.0
+FLOOR_DB = -55.0    # dBFS mean power below which a frame is never speech
+MIN_SPEECH = 0.10   # seconds
+MIN_SILENCE = 0.30  # seconds
+PAD = 0.10          # seconds
+
+
+def trimming_enabled():
+    return os.environ.get("VOICE_ACTIVITY_TRIM", "true").strip().lower() == "true"
+
+
+def configured_top_db():
+    return float(os.environ.get("VOICE_ACTIVITY_TOP_DB", TOP_DB))
+
+
+def trim_profile():
+    """The trimming settings a trimmed signal depends on, for feature cache profiles ("vad=1:top_db=40")"""
+    if not trimming_enabled():
+        return "vad=0"
+    return f"vad=1:top_db={configured_top_db():g}"
+
+
+def frame_power_db(y, hop_length=HOP_LENGTH, frame_blocks=FRAME_BLOCKS):
+    """Mean power (dB) of frames of frame_blocks hops, one frame per hop"""
+    np = timed_import("numpy")
+    y = np.asarray(y, dtype=np.float32)
+    remainder = len(y) % hop_length
+    if remainder:
+        y = np.pad(y, (0, hop_length - remainder))
+    blocks = y.reshape(-1, hop_length)
+    block_energy = np.einsum("ij,ij->i", blocks, blocks, dtype=np.float64)
+
+    # Sum of frame_blocks consecutive blocks via a short cumulative sum
+    cumulative = np.concatenate(([0.0], np.cumsum(block_energy)))
+    n_frames = max(1, len(block_energy) - frame_blocks + 1)
+    ends = np.minimum(np.arange(n_frames) + frame_blocks, len(block_energy))
+    power = (cumulative[ends] - cumulative[:n_frames]) / ((ends - np.arange(n_frames)) * hop_length)
+    return 10.0 * np.log10(np.maximum(power, 1e-12))
+
+
+def speech_segments(y, sr, top_db=None, hop_length=HOP_LENGTH, frame_blocks=FRAME_BLOCKS,
+                    min_speech=MIN_SPEECH, min_silence=MIN_SILENCE, pad=PAD):
+    """[(start, end)] sample ranges of speech, in order and non-overlapping"""
+    np = timed_import("numpy")
+    if len(y) == 0:
+        return []
+    top_db = configured_top_db() if top_db is None else top_db
+
+    power_db = frame_power_db(y, hop_length, frame_blocks)
+    active = power_db > max(power_db.max() - top_db, FLOOR_DB)
+
+    # Runs of active frames as [start, end) frame indices
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+    runs = edges.reshape(-1, 2)
+    if len(runs) == 0:
+        return []
+
+    # Bridge short pauses, then drop what is still too short to be speech
+    hop_seconds = hop_length / sr
+    long_gap = (runs[1:, 0] - runs[:-1, 1]) * hop_seconds >= min_silence
+    starts = runs[np.concatenate(([True], long_gap)), 0]
+    ends = runs[np.concatenate((long_gap, [True])), 1]
+    keep = (ends - starts) * hop_seconds >= min_speech
+    starts, ends = starts[keep], ends[keep]
+
+    pad_samples = int(pad * sr)
+    frame_samples = frame_blocks * hop_length
+    sample_starts = np.maximum(starts * hop_length - pad_samples, 0)
+    sample_ends = np.minimum((ends - 1) * hop_length + frame_samples + pad_samples, len(y))
+    if len(sample_starts) > 1:
+        # Padding must not make neighbours overlap
+        sample_starts[1:] = np.maximum(sample_starts[1:], sample_ends[:-1])
+    return [(int(start), int(end)) for start, end in zip(sample_starts, sample_ends) if end > start]
+
+
+def trim_to_speech(y, sr, **options):
+    """(speech samples, report); the signal comes back unchanged when trimming is off or finds no speech"""
+    np = timed_import("numpy")
+    started = time.perf_counter()
+    report = {
+        "enabled": trimming_enabled(),
+        "recording_duration": len(y) / sr if sr else 0.0,
+        "speech_duration": len(y) / sr if sr else 0.0,
+        "speech_ratio": 1.0 if len(y) else 0.0,
+        "segments": 1 if len(y) else 0,
+        "trimmed": False
+    }
+    if not report["enabled"] or len(y) == 0:
+        return y, report
+
+    segments = speech_segments(y, sr, **options)
+    speech_samples = sum(end - start for start, end in segments)
+    report.update({
+        "speech_duration": speech_samples / sr,
+        "speech_ratio": speech_samples / len(y),
+        "segments": len(segments)
+    })
+
+    if segments and speech_samples < len(y):
+        y = y[segments[0][0]:segments[0][1]] if len(segments) == 1 else np.concatenate(
+            [y[start:end] for start, end in segments])
+        report["trimmed"] = True
+    # No speech at all: analyze the recording as before rather than nothing
+
+    report["vad_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+    return y, report
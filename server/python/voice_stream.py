@@ -0,0 +1,203 @@
+"""
+Streaming voice emotion over PCM chunks (live voice chat)
+A VoiceStream keeps the last window_seconds of audio in a ring buffer and
+maintains energy, zero-crossing and pitch statistics incrementally:
+- Each pushed chunk adds its own contributions, samples falling out of the
+  window subtract theirs - O(chunk) per push, never a pass over the window
+- Pitch is estimated per completed 1024-sample frame (pitch_engine.py) and
+  kept as running sums over the frames still inside the window
+- estimate() applies the same energy/ZCR rules as the file-based voice mode
+"""
+
+import time
+import base64
+from collections import deque
+
+from lazy_imports import timed_import
+from pitch_engine import FRAME_LENGTH, HOP_LENGTH, VOICING_THRESHOLD, framed_autocorrelation
+
+PCM_FORMATS = ("s16le", "f32le")
+
+
+def classify_energy_zcr(rms, zcr):
+    """Rule set of the persistent server's fast voice mode: (emotion, confidence)"""
+    if rms > 0.1:
+        return ("anger" if zcr > 0.8 else "joy"), 0.7
+    if rms < 0.05:
+        return "sadness", 0.65
+    if zcr > 1.0:
+        return "fear", 0.6
+    return "neutral", 0.6
+
+
+def decode_pcm(payload, pcm_format="s16le"):
+    """base64 (or raw bytes) little-endian PCM -> float32 samples in [-1, 1]"""
+    np = timed_import("numpy")
+    data = base64.b64decode(payload) if isinstance(payload, str) else bytes(payload)
+    if pcm_format == "f32le":
+        usable = len(data) - len(data) % 4
+        return np.frombuffer(data[:usable], dtype="<f4").astype(np.float32)
+    usable = len(data) - len(data) % 2
+    return np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+
+
+class VoiceStream:
+    def __init__(self, sample_rate=16000, window_seconds=3.0, pcm_format="s16le"):
+        np = timed_import("numpy")
+        if pcm_format not in PCM_FORMATS:
+            raise ValueError(f"unsupported PCM format '{pcm_format}' (use {' or '.join(PCM_FORMATS)})")
+
+        self.sample_rate = int(sample_rate)
+        self.pcm_format = pcm_format
+        self.capacity = max(FRAME_LENGTH, int(window_seconds * self.sample_rate))
+        self.ring = np.zeros(self.capacity, dtype=np.float32)
+        self.start = 0   # index of the oldest sample in the ring
+        self.size = 0    # samples currently in the window
+
+        # Running sums over the window (float64 so add/subtract does not drift)
+        self.sum_squares = 0.0
+        self.sign_steps = 0.0  # sum of |sign(x[i+1]) - sign(x[i])| over adjacent pairs
+
+        # Pitch: samples not yet framed, and per-frame f0 for frames inside the window
+        self.min_lag = max(1, self.sample_rate // 800)
+        self.max_lag = max(self.min_lag + 1, self.sample_rate // 80)
+        self.frame_tail = np.zeros(0, dtype=np.float32)
+        self.frames = deque()  # (end_sample, f0 or 0.0)
+        self.voiced_frames = 0
+        self.f0_sum = 0.0
+        self.f0_sum_squares = 0.0
+
+        self.total_samples = 0
+        self.chunks = 0
+        self.opened_at = time.time()
+        self.last_activity = self.opened_at
+
+    # -- ring buffer -------------------------------------------------------------
+
+    def _window_slice(self, offset, count):
+        """`count` samples starting `offset` samples after the oldest one"""
+        np = timed_import("numpy")
+        first = (self.start + offset) % self.capacity
+        end = first + count
+        if end <= self.capacity:
+            return self.ring[first:end]
+        return np.concatenate((self.ring[first:], self.ring[:end - self.capacity]))
+
+    def _sign_steps(self, samples):
+        np = timed_import("numpy")
+        if len(samples) < 2:
+            return 0.0
+        return float(np.abs(np.diff(np.sign(samples))).sum())
+
+    def _evict(self, count):
+        """Drop the `count` oldest samples and subtract their contributions"""
+        if count <= 0:
+            return
+        np = timed_import("numpy")
+        # Include the pair linking the last evicted sample to the new oldest one
+        span = self._window_slice(0, min(count + 1, self.size))
+        evicted = span[:count]
+        self.sum_squares -= float(np.dot(evicted, evicted))
+        self.sign_steps -= self._sign_steps(span)
+        self.start = (self.start + count) % self.capacity
+        self.size -= count
+
+    def _append(self, samples):
+        np = timed_import("numpy")
+        if self.size:
+            previous = self._window_slice(self.size - 1, 1)
+            self.sign_steps += self._sign_steps(np.concatenate((previous, samples[:1])))
+        self.sign_steps += self._sign_steps(samples)
+        self.sum_squares += float(np.dot(samples, samples))
+
+        position = (self.start + self.size) % self.capacity
+        first = min(len(samples), self.capacity - position)
+        self.ring[position:position + first] = samples[:first]
+        self.ring[:len(samples) - first] = samples[first:]
+        self.size += len(samples)
+
+    # -- pitch -------------------------------------------------------------------
+
+    def _push_frames(self, samples):
+        np = timed_import("numpy")
+        pending = np.concatenate((self.frame_tail, samples)) if len(self.frame_tail) else samples
+        count = 0 if len(pending) < FRAME_LENGTH else 1 + (len(pending) - FRAME_LENGTH) // HOP_LENGTH
+        if count:
+            frames = np.lib.stride_tricks.sliding_window_view(pending, FRAME_LENGTH)[::HOP_LENGTH][:count]
+            acf = framed_autocorrelation(frames, self.max_lag)
+            search = acf[:, self.min_lag:self.max_lag]
+            best_lag = np.argmax(search, axis=1) + self.min_lag
+            peak = search[np.arange(count), best_lag - self.min_lag]
+            energy = acf[:, 0]
+            voiced = (energy > 1e-8) & (peak > VOICING_THRESHOLD * np.maximum(energy, 1e-8))
+
+            tail_start = self.total_samples - len(pending)
+            for index in range(count):
+                f0 = float(self.sample_rate / best_lag[index]) if voiced[index] else 0.0
+                self.frames.append((tail_start + index * HOP_LENGTH + FRAME_LENGTH, f0))
+                if f0:
+                    self.voiced_frames += 1
+                    self.f0_sum += f0
+                    self.f0_sum_squares += f0 * f0
+        # Keep only what the next frame still needs
+        self.frame_tail = pending[count * HOP_LENGTH:].copy() if count else pending.copy()
+
+    def _evict_frames(self):
+        window_start = self.total_samples - self.size
+        while self.frames and self.frames[0][0] - FRAME_LENGTH < window_start:
+            _, f0 = self.frames.popleft()
+            if f0:
+                self.voiced_frames -= 1
+                self.f0_sum -= f0
+                self.f0_sum_squares -= f0 * f0
+
+    # -- public API ----------------------------------------------------------------
+
+    def push(self, payload):
+        """Add one PCM chunk (base64 string or bytes) and return the rolling estimate"""
+        samples = decode_pcm(payload, self.pcm_format)
+        if len(samples) > self.capacity:
+            # A chunk longer than the window: only its tail can stay
+            self.total_samples += len(samples) - self.capacity
+            samples = samples[-self.capacity:]
+            self.frame_tail = self.frame_tail[:0]
+
+        overflow = self.size + len(samples) - self.capacity
+        self._evict(overflow)
+        self.total_samples += len(samples)
+        self._append(samples)
+        self._push_frames(samples)
+        self._evict_frames()
+
+        self.chunks += 1
+        self.last_activity = time.time()
+        return self.estimate()
+
+    def features(self):
+        rms = (max(self.sum_squares, 0.0) / self.size) ** 0.5 if self.size else 0.0
+        zcr = max(self.sign_steps, 0.0) / (self.size - 1) if self.size > 1 else 0.0
+        if self.voiced_frames:
+            pitch = self.f0_sum / self.voiced_frames
+            variance = max(self.f0_sum_squares / self.voiced_frames - pitch * pitch, 0.0)
+        else:
+            pitch = variance = 0.0
+        return {
+            "energy": float(rms),
+            "zcr": float(zcr),
+            "pitch": float(pitch),
+            "pitch_std": float(variance ** 0.5),
+            "voiced_ratio": self.voiced_frames / len(self.frames) if self.frames else 0.0
+        }
+
+    def estimate(self):
+        features = self.features()
+        emotion, confidence = classify_energy_zcr(features["energy"], features["zcr"])
+        return {
+            "emotion": emotion,
+            "confidence": confidence,
+            "features": features,
+            "window_seconds": self.size / self.sample_rate,
+            "stream_seconds": self.total_samples / self.sample_rate,
+            "chunks": self.chunks,
+            "method": "streaming_spectral"
+        }
@@ -0,0 +1,363 @@
+"""
+Pre-fork worker pool for the persistent emotion server
+The parent loads the models once, then forks N workers that share the
+read-only weights copy-on-write instead of holding N copies in RAM.
+- Each worker gets a fixed slice of torch intra-op threads
+- Voice stream sessions stick to the worker that opened them
+- Each worker warms up after the fork and reports its warm-up timings before
+  the parent announces readiness
+- The parent dispatches every request to the least busy live worker
+- Responses for requests with an id go out as soon as they finish;
+  responses for requests without one are released in arrival order
+- Binary frames (frame_protocol.py) are forwarded to the worker with their
+  body and answered with frames
+POSIX only (needs os.fork) - elsewhere the server stays single-process.
+"""
+
+import os
+import gc
+import sys
+import json
+import socket
+import threading
+from itertools import count
+
+from server_readiness import merge_warmups
+from frame_protocol import FrameError, encode_frame, read_message, binary_stream
+
+POOL_ID_PREFIX = "pool-"
+READY_ID = "pool-ready"
+
+
+def prefork_supported():
+    return hasattr(os, "fork")
+
+
+class _Worker:
+    def __init__(self, index, pid, sock):
+        self.index = index
+        self.pid = pid
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+        self.writer = sock.makefile("wb")
+        self.send_lock = threading.Lock()
+        self.alive = True
+        self.inflight = 0
+        self.dispatched = 0
+
+
+class PreforkWorkerPool:
+    def __init__(self, detector, num_workers, threads_per_worker=None):
+        self.detector = detector
+        self.num_workers = max(1, int(num_workers))
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.workers = []
+        self.collectors = []
+
+        self.lock = threading.Lock()  # pending map, ordering state, worker counters
+        self.output_lock = threading.Lock()
+        self.output_stream = None
+        self.pending = {}  # pool id -> dispatch entry
+        self.stats_requests = {}
+        self.sequence = count()
+        self.next_order = 0
+        self.next_release = 0
+        self.completed = {}  # arrival order -> response waiting for earlier ones
+        self.warmups = []
+        self.stream_workers = {}  # voice stream id -> worker holding its state
+
+    def start(self):
+        """Fork the workers - call after models are loaded, before any inference"""
+        # Move everything loaded so far out of the collector's reach so refcount
+        # and GC bookkeeping do not dirty the shared pages in the children
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+
+        for index in range(self.num_workers):
+            parent_sock, child_sock = socket.socketpair()
+            pid = os.fork()
+            if pid == 0:
+                parent_sock.close()
+                for worker in self.workers:
+                    worker.reader.close()
+                    worker.writer.close()
+                    worker.sock.close()
+                self._worker_main(index, child_sock)
+            child_sock.close()
+            self.workers.append(_Worker(index, pid, parent_sock))
+
+        print(f"👷 Pre-fork pool: {self.num_workers} workers x {self.threads_per_worker} torch threads",
+              file=sys.stderr)
+        self._await_workers()
+
+    def _await_workers(self):
+        """Block until every worker has warmed up (first line each worker sends)"""
+        for worker in self.workers:
+            try:
+                message = read_message(worker.reader)
+                message = json.loads(message[1]) if message and message[0] == "line" else None
+            except (OSError, ValueError):
+                message = None
+            if not isinstance(message, dict) or message.get("id") != READY_ID:
+                print(f"❌ Worker {worker.index} exited before it was ready", file=sys.stderr)
+                worker.alive = False
+                continue
+            self.warmups.append(message.get("warmup"))
+
+    def _worker_main(self, index, sock):
+        """Child process: serve the detector over the socket, never return"""
+        exit_code = 0
+        try:
+            try:
+                # Only text modes load torch; voice-only pools have nothing to pin
+                torch = sys.modules.get("torch")
+                if torch is not None:
+                    torch.set_num_threads(self.threads_per_worker)
+            except Exception as thread_error:
+                print(f"⚠️ Worker {index}: could not set torch threads: {thread_error}", file=sys.stderr)
+
+            print(f"👷 Worker {index} (pid {os.getpid()}) started", file=sys.stderr)
+            infile = sock.makefile("rb")
+            outfile = sock.makefile("wb")
+
+            # Warm up here, not in the parent: thread pools do not survive fork
+            warmup = self.detector.warm_up()
+            outfile.write((json.dumps({"id": READY_ID, "warmup": warmup}) + "\n").encode("utf-8"))
+            outfile.flush()
+
+            self.detector.run_server(infile, outfile, announce=False)
+        except BaseException as e:
+            print(f"❌ Worker {index} error: {e}", file=sys.stderr)
+            exit_code = 1
+        finally:
+            sys.stderr.flush()
+            os._exit(exit_code)
+
+    def run(self, input_stream=None, output_stream=None):
+        """Parent loop: read requests, dispatch to workers, relay responses"""
+        input_stream = binary_stream(input_stream or sys.stdin)
+        self.output_stream = binary_stream(output_stream or sys.stdout)
+
+        for worker in self.workers:
+            collector = threading.Thread(target=self._collect, args=(worker,), daemon=True)
+            collector.start()
+            self.collectors.append(collector)
+
+        self.detector.emit_ready(warmup=merge_warmups(self.warmups), pool=self.pool_stats())
+        print("📡 Emotion detection server ready for requests", file=sys.stderr)
+
+        try:
+            while self.detector.running:
+                try:
+                    message = read_message(input_stream)
+                except FrameError as frame_error:
+                    # The stream cannot be resynchronized after a broken frame
+                    self._emit({"emotion": "neutral", "confidence": 0.5, "error": f"Invalid frame: {frame_error}"},
+                               framed=True)
+                    break
+                if message is None:
+                    break
+                self._dispatch(message)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def _emit(self, result, framed=False):
+        data = encode_frame(result) if framed else (json.dumps(result) + "\n").encode("utf-8")
+        with self.output_lock:
+            self.output_stream.write(data)
+            self.output_stream.flush()
+
+    def _release_in_order(self, order, result, framed=False):
+        self.completed[order] = (result, framed)
+        while self.next_release in self.completed:
+            self._emit(*self.completed.pop(self.next_release))
+            self.next_release += 1
+
+    def _deliver(self, entry, result):
+        result.pop("id", None)
+        if entry["has_id"]:
+            result["id"] = entry["id"]
+            self._emit(result, entry["framed"])
+        else:
+            self._release_in_order(entry["order"], result, entry["framed"])
+
+    def _pick_worker(self):
+        alive = [worker for worker in self.workers if worker.alive]
+        if not alive:
+            return None
+        return min(alive, key=lambda worker: worker.inflight)
+
+    def _stream_route(self, request):
+        """Pin a voice stream to one worker: its ring buffer lives in that process"""
+        mode = request.get("mode")
+        if mode == "stream_open":
+            if not request.get("stream_id"):
+                request = dict(request, stream_id=f"stream-{next(self.sequence)}")
+            worker = self._pick_worker()
+            if worker is not None:
+                self.stream_workers[str(request["stream_id"])] = worker
+            return request, worker
+
+        stream_id = str(request.get("stream_id", ""))
+        worker = self.stream_workers.get(stream_id)
+        if mode == "stream_close":
+            self.stream_workers.pop(stream_id, None)
+        if worker is None or not worker.alive:
+            # Any worker answers "Unknown voice stream"
+            worker = self._pick_worker()
+        return request, worker
+
+    def _register(self, worker, entry):
+        pool_id = f"{POOL_ID_PREFIX}{next(self.sequence)}"
+        entry["worker"] = worker
+        self.pending[pool_id] = entry
+        worker.inflight += 1
+        worker.dispatched += 1
+        return pool_id
+
+    def _dispatch(self, message):
+        kind, payload, body = message
+        if kind == "frame":
+            request, error = payload, None
+        else:
+            payload = payload.strip()
+            if not payload:
+                return
+            request, error = self.detector._decode_request(payload)
+            body = None
+        sends = []
+
+        with self.lock:
+            if error is not None:
+                order = self.next_order
+                self.next_order += 1
+                self._release_in_order(order, error)
+                return
+
+            entry = {"has_id": "id" in request, "id": request.get("id"), "order": None, "stats": None,
+                     "framed": kind == "frame"}
+            if not entry["has_id"]:
+                entry["order"] = self.next_order
+                self.next_order += 1
+
+            if request.get("mode") == "stats":
+                # Fan out to every live worker and answer with the merged view
+                alive = [worker for worker in self.workers if worker.alive]
+                stats_key = next(self.sequence)
+                self.stats_requests[stats_key] = {"entry": entry, "remaining": len(alive), "workers": {}}
+                for worker in alive:
+                    pool_id = self._register(worker, {"stats": stats_key})
+                    sends.append((worker, {"mode": "stats", "id": pool_id}, None))
+                if not alive:
+                    self._finish_stats(stats_key)
+            else:
+                if str(request.get("mode", "")).startswith("stream_"):
+                    request, worker = self._stream_route(request)
+                else:
+                    worker = self._pick_worker()
+                if worker is None:
+                    self._deliver(entry, {"emotion": "neutral", "confidence": 0.5, "error": "No emotion workers available"})
+                    return
+                pool_id = self._register(worker, entry)
+                sends.append((worker, dict(request, id=pool_id), body))
+
+        for worker, request, body in sends:
+            self._send(worker, request, body)
+
+    def _send(self, worker, message, body=None):
+        """JSON line, or a frame when the request came with a body to forward"""
+        data = encode_frame(message, body) if body is not None else (json.dumps(message) + "\n").encode("utf-8")
+        try:
+            with worker.send_lock:
+                worker.writer.write(data)
+                worker.writer.flush()
+        except (OSError, ValueError) as send_error:
+            print(f"❌ Failed to send to worker {worker.index}: {send_error}", file=sys.stderr)
+            with self.lock:
+                self._finish(message["id"], {"emotion": "neutral", "confidence": 0.5, "error": "Emotion worker unavailable"})
+
+    def _finish(self, pool_id, result):
+        entry = self.pending.pop(pool_id, None)
+        if entry is None:
+            return
+        entry["worker"].inflight -= 1
+
+        if entry["stats"] is not None:
+            stats = self.stats_requests.get(entry["stats"])
+            if stats is not None:
+                stats["workers"][entry["worker"].index] = result
+                stats["remaining"] -= 1
+                if stats["remaining"] <= 0:
+                    self._finish_stats(entry["stats"])
+            return
+
+        self._deliver(entry, result)
+
+    def _finish_stats(self, stats_key):
+        stats = self.stats_requests.pop(stats_key)
+        per_worker = []
+        for index in sorted(stats["workers"]):
+            worker_stats = stats["workers"][index]
+            worker_stats.pop("id", None)
+            per_worker.append(dict(worker_stats, worker=index))
+        self._deliver(stats["entry"], {"pool": self.pool_stats(), "workers": per_worker})
+
+    def _collect(self, worker):
+        """Per-worker reader thread: route responses back by pool id"""
+        try:
+            while True:
+                message = read_message(worker.reader)
+                if message is None:
+                    break
+                kind, payload, _ = message
+                if kind == "frame":
+                    result = payload
+                else:
+                    try:
+                        result = json.loads(payload)
+                    except json.JSONDecodeError:
+                        continue
+                    if not isinstance(result, dict):
+                        continue
+                with self.lock:
+                    self._finish(result.get("id"), result)
+        except (OSError, ValueError):
+            pass
+
+        with self.lock:
+            worker.alive = False
+            for pool_id, entry in list(self.pending.items()):
+                if entry["worker"] is worker:
+                    self._finish(pool_id, {"emotion": "neutral", "confidence": 0.5, "error": "Emotion worker exited"})
+
+    def pool_stats(self):
+        return {
+            "workers": self.num_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "alive": sum(1 for worker in self.workers if worker.alive),
+            "dispatched": [worker.dispatched for worker in self.workers],
+            "inflight": [worker.inflight for worker in self.workers]
+        }
+
+    def shutdown(self):
+        """Close worker input, let them drain in-flight work, then reap them"""
+        for worker in self.workers:
+            try:
+                worker.sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+        for collector in self.collectors:
+            collector.join(timeout=30)
+
+        for worker in self.workers:
+            try:
+                os.waitpid(worker.pid, 0)
+            except ChildProcessError:
+                pass
+            worker.sock.close()
+
+        print("🛑 Emotion detection worker pool stopped", file=sys.stderr)
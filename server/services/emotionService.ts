@@ -7,6 +7,10 @@
 import { spawn } from 'child_process';
 import path from 'path';
 import fs from 'fs';
+import {
+  detectEmotionFromText as detectEmotionFromTextPersistent,
+  isEmotionServerRunning
+} from './emotionServiceOptimized';
 
 interface EmotionResult {
   emotion: string;
@@ -29,98 +33,52 @@ interface CombinedEmotionResult {
 }
 
 export async function detectEmotionFromText(text: string, language: 'en' | 'ur' = 'en'): Promise<EmotionResult> {
-  return new Promise((resolve, reject) => {
-    try {
-      if (!text || text.trim().length === 0) {
-        resolve({ emotion: 'neutral', confidence: 0.5, context: [] });
-        return;
-      }
-
-      console.log(`Phase 4 Text Emotion with Context: Processing "${text.substring(0, 50)}..." (${language})`);
-
-      // Escape quotes and newlines in the text for Python code
-      const escapedText = text.replace(/"/g, '\\"').replace(/\n/g, '\\n');
-      
-      const pythonCode = `
-from transformers import pipeline
-import spacy
-import sys
-
-try:
-    # Load emotion detection pipeline
-    pipe = pipeline("text-classification", model="SamLowe/roberta-base-go_emotions")
-    result = pipe("${escapedText}")[0]
-    
-    # Load spaCy model for context extraction
-    nlp = spacy.load("en_core_web_sm")
-    doc = nlp("${escapedText}")
-    
-    # Extract context: entities and important words (nouns, verbs, adjectives)
-    entities = [ent.text for ent in doc.ents]
-    important_words = [token.lemma_ for token in doc if token.pos_ in ['NOUN', 'VERB', 'ADJ'] and not token.is_stop and len(token.text) > 2]
-    context = list(set(entities + important_words))  # Remove duplicates
-    
-    # Format output: emotion,score,context1:context2:context3
-    context_str = ':'.join(context) if context else ''
-    print(f"{result['label']},{result['score']},{context_str}")
-    
-except Exception as e:
-    print(f"neutral,0.5,error:{str(e)}")
-    sys.exit(1)
-      `;
+  try {
+    if (!text || text.trim().length === 0) {
+      return { emotion: 'neutral', confidence: 0.5, context: [] };
+    }
 
-      const pythonPath = path.join(process.cwd(), '.venv', 'Scripts', 'python.exe');
-      const python = spawn(pythonPath, ['-c', pythonCode]);
+    console.log(`Phase 4 Text Emotion with Context: Processing "${text.substring(0, 50)}..." (${language})`);
 
-      let output = '';
-      let errorOutput = '';
+    // The persistent emotion server keeps RoBERTa and spaCy loaded; a one-shot
+    // interpreter is only started when that server is not running
+    const result: any = isEmotionServerRunning()
+      ? await detectEmotionFromTextPersistent(text, language)
+      : await detectEmotionFromTextOnce(text, language);
+    if (!result) {
+      return performKeywordBasedEmotionDetection(text, language);
+    }
+    const context: string[] = Array.isArray(result.context) ? result.context : [];
 
-      python.stdout.on('data', (data) => {
-        output += data.toString();
-      });
+    console.log(`✅ Phase 4 Text Emotion Result: ${result.raw_label || result.emotion} (${result.confidence}) with context: [${context.join(', ')}]`);
 
-      python.stderr.on('data', (data) => {
-        errorOutput += data.toString();
-      });
+    return {
+      // Raw GoEmotions label, as the inline pipeline returned before
+      emotion: result.raw_label || result.emotion || 'neutral',
+      confidence: typeof result.confidence === 'number' ? result.confidence : 0.5,
+      context: context
+    };
 
-      python.on('close', (code) => {
-        try {
-          if (code !== 0) {
-            console.error('Python emotion detection error:', errorOutput);
-            resolve(performKeywordBasedEmotionDetection(text, language));
-            return;
-          }
+  } catch (error) {
+    console.error('Phase 4 Text Emotion Detection Error:', error);
+    console.log('Falling back to keyword-based emotion detection');
+    return performKeywordBasedEmotionDetection(text, language);
+  }
+}
 
-          const outputLine = output.trim().split('\n').pop() || '';
-          const [emotion, scoreStr, contextStr] = outputLine.split(',');
-          
-          const score = parseFloat(scoreStr) || 0.5;
-          const context = contextStr ? contextStr.split(':').filter(c => c && c !== 'error') : [];
-          
-          console.log(`✅ Phase 4 Text Emotion Result: ${emotion} (${score}) with context: [${context.join(', ')}]`);
-          
-          resolve({ 
-            emotion: emotion || 'neutral', 
-            confidence: score, 
-            context: context 
-          });
-        } catch (error) {
-          console.error('Error parsing emotion detection result:', error);
-          resolve(performKeywordBasedEmotionDetection(text, language));
-        }
-      });
+// Fallback when the persistent server is not running: the same RoBERTa + slimmed
+// spaCy context path in a one-shot interpreter. Text goes as an argument, so no
+// escaping into generated Python source. null when the script is missing.
+async function detectEmotionFromTextOnce(text: string, language: 'en' | 'ur'): Promise<any> {
+  const pythonPath = path.join(process.cwd(), '.venv', 'Scripts', 'python.exe');
+  const scriptPath = path.join(process.cwd(), 'server', 'python', 'emotion_detector.py');
 
-      python.on('error', (error) => {
-        console.error('Failed to spawn Python process:', error);
-        resolve(performKeywordBasedEmotionDetection(text, language));
-      });
+  if (!fs.existsSync(scriptPath)) {
+    console.error('Emotion detector script not found');
+    return null;
+  }
 
-    } catch (error) {
-      console.error('Phase 4 Text Emotion Detection Error:', error);
-      console.log('Falling back to keyword-based emotion detection');
-      resolve(performKeywordBasedEmotionDetection(text, language));
-    }
-  });
+  return runPythonEmotionDetection(pythonPath, scriptPath, ['text_with_context', text, language]);
 }
 
 export async function detectEmotionFromAudio(audioPath: string): Promise<EmotionResult> {
@@ -1,11 +1,14 @@
 /**
  * IEMOCAP Speech-based Emotion Detection Service
  * Complements GoEmotions text analysis with speech tone/stress detection
+ * Talks to one long-lived iemocap_server.py (JSON lines, matched by id), so an
+ * utterance costs its analysis time instead of a Python start plus model load
  */
 
-import { spawn } from 'child_process';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
 import path from 'path';
 import fs from 'fs';
+import { findReadinessEvent, describeReadiness, ReadinessEvent } from './serverReadiness';
 
 // Get the directory using the server folder structure
 const serverDir = path.resolve(process.cwd(), 'server');
@@ -30,8 +33,20 @@ export interface IEMOCAPResult {
   high_energy?: boolean;
   emotional_intensity?: number;
   method: string;
+  feature_profile?: 'fast' | 'standard' | 'full';
+  voice_activity?: {
+    recording_duration: number;
+    speech_duration: number;
+    speech_ratio: number;
+    segments: number;
+    trimmed: boolean;
+  };
+  processing_ms?: number;
+  error?: string;
 }
 
+export type IEMOCAPFeatureProfile = 'fast' | 'standard' | 'full';
+
 export interface CombinedEmotionResult {
   primary_emotion: string;
   confidence: number;
@@ -44,98 +59,205 @@ export interface CombinedEmotionResult {
   method: string;
 }
 
+interface PendingAnalysis {
+  resolve: (result: any) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+}
+
 class IEMOCAPEmotionService {
-  private pythonScript: string;
+  private serverScript: string;
   private isInitialized: boolean = false;
+  private process: ChildProcessWithoutNullStreams | null = null;
+  private isReady = false;
+  private pendingRequests = new Map<string, PendingAnalysis>();
+  private unsentRequests: string[] = [];
+  private stdoutBuffer = '';
+  private nextRequestId = 0;
+  private readiness: ReadinessEvent | null = null;
 
   constructor() {
-    this.pythonScript = path.join(pythonDir, 'iemocap_emotion_detector.py');
+    this.serverScript = path.join(pythonDir, 'iemocap_server.py');
   }
 
   /**
-   * Initialize the IEMOCAP service
+   * Initialize the IEMOCAP service (starts the persistent analysis server)
    */
   async initialize(): Promise<boolean> {
     try {
       console.log('[IEMOCAP] 🎵 Initializing speech emotion detection...');
       
       // Check if Python script exists
-      if (!fs.existsSync(this.pythonScript)) {
-        console.error('[IEMOCAP] ❌ Python script not found:', this.pythonScript);
+      if (!fs.existsSync(this.serverScript)) {
+        console.error('[IEMOCAP] ❌ Python script not found:', this.serverScript);
         return false;
       }
 
-      this.isInitialized = true;
+      if (!this.process) {
+        this.startServer();
+      }
+      this.isInitialized = this.process !== null;
       console.log('[IEMOCAP] ✅ Speech emotion service initialized');
-      return true;
+      return this.isInitialized;
     } catch (error) {
       console.error('[IEMOCAP] ❌ Initialization failed:', error);
       return false;
     }
   }
 
+  private startServer() {
+    console.log('[IEMOCAP] 🚀 Starting persistent speech emotion server...');
+    this.process = spawn('python', [this.serverScript], {
+      stdio: ['pipe', 'pipe', 'pipe']
+    });
+
+    this.process.stderr.on('data', (data: Buffer) => {
+      const message = data.toString().trim();
+      const readiness = findReadinessEvent(message);
+      if (readiness) {
+        this.readiness = readiness;
+        console.log(`[IEMOCAP] ⏱️ Server startup: ${describeReadiness(readiness)}`);
+      }
+      if (!this.isReady && (readiness || message.includes('ready for requests'))) {
+        this.isReady = true;
+        console.log('[IEMOCAP] ✅ Persistent speech emotion server is ready');
+        const queued = this.unsentRequests;
+        this.unsentRequests = [];
+        for (const jsonRequest of queued) {
+          this.process?.stdin.write(jsonRequest);
+        }
+      }
+    });
+
+    this.process.stdout.on('data', (data: Buffer) => {
+      // Responses can be split across chunks - only handle complete lines
+      this.stdoutBuffer += data.toString();
+      const lines = this.stdoutBuffer.split('\n');
+      this.stdoutBuffer = lines.pop() || '';
+      for (const line of lines) {
+        if (line.trim()) {
+          this.handleResponse(line.trim());
+        }
+      }
+    });
+
+    this.process.on('close', (code) => {
+      console.log(`[IEMOCAP] ❌ Speech emotion server exited with code ${code}`);
+      this.resetServer('IEMOCAP server process terminated');
+    });
+
+    this.process.on('error', (error) => {
+      console.error('[IEMOCAP] ❌ Process spawn error:', error);
+      this.resetServer('IEMOCAP server failed to start');
+    });
+  }
+
+  private resetServer(reason: string) {
+    this.process = null;
+    this.isReady = false;
+    this.isInitialized = false;
+    this.readiness = null;
+    this.unsentRequests = [];
+    this.stdoutBuffer = '';
+    for (const [id, pending] of Array.from(this.pendingRequests.entries())) {
+      clearTimeout(pending.timer);
+      this.pendingRequests.delete(id);
+      pending.reject(new Error(reason));
+    }
+  }
+
+  private handleResponse(jsonLine: string) {
+    let result: any;
+    try {
+      result = JSON.parse(jsonLine);
+    } catch (error) {
+      console.error('[IEMOCAP] ❌ Failed to parse result:', error);
+      return;
+    }
+
+    // Responses without an id (e.g. "Invalid JSON") belong to the oldest request
+    const id = result.id !== undefined ? String(result.id) : this.pendingRequests.keys().next().value;
+    const pending = id !== undefined ? this.pendingRequests.get(id) : undefined;
+    if (!pending) {
+      console.warn(`[IEMOCAP] ⚠️ Response for unknown request id: ${result.id}`);
+      return;
+    }
+
+    clearTimeout(pending.timer);
+    this.pendingRequests.delete(id!);
+    delete result.id;
+    pending.resolve(result);
+  }
+
+  private sendRequest(request: any): Promise<any> {
+    return new Promise((resolve, reject) => {
+      if (!this.process) {
+        reject(new Error('IEMOCAP server not running'));
+        return;
+      }
+
+      const id = `${Date.now()}-${this.nextRequestId++}`;
+      const jsonRequest = JSON.stringify({ ...request, id }) + '\n';
+
+      // The first request may wait for model load and warm-up
+      const timer = setTimeout(() => {
+        if (this.pendingRequests.delete(id)) {
+          reject(new Error('IEMOCAP analysis timeout'));
+        }
+      }, 60000);
+      this.pendingRequests.set(id, { resolve, reject, timer });
+
+      if (!this.isReady) {
+        this.unsentRequests.push(jsonRequest);
+        return;
+      }
+      this.process.stdin.write(jsonRequest);
+    });
+  }
+
+  getReadiness(): ReadinessEvent | null {
+    return this.readiness;
+  }
+
+  shutdown() {
+    if (this.process) {
+      console.log('[IEMOCAP] 🛑 Shutting down speech emotion server...');
+      this.process.kill('SIGTERM');
+      this.process = null;
+      this.isReady = false;
+    }
+  }
+
   /**
    * Detect emotion from speech audio file
+   * profile: fast / standard / full feature set (server default: standard)
    */
-  async detectSpeechEmotion(audioFilePath: string): Promise<IEMOCAPResult> {
+  async detectSpeechEmotion(audioFilePath: string, profile?: IEMOCAPFeatureProfile): Promise<IEMOCAPResult> {
     if (!this.isInitialized) {
       await this.initialize();
     }
 
-    return new Promise((resolve, reject) => {
-      try {
-        console.log('[IEMOCAP] 🎵 Analyzing speech emotion...');
+    try {
+      console.log('[IEMOCAP] 🎵 Analyzing speech emotion...');
 
-        // Check if audio file exists
-        if (!fs.existsSync(audioFilePath)) {
-          throw new Error(`Audio file not found: ${audioFilePath}`);
-        }
+      // Check if audio file exists
+      if (!fs.existsSync(audioFilePath)) {
+        throw new Error(`Audio file not found: ${audioFilePath}`);
+      }
 
-        const pythonProcess = spawn('python', [this.pythonScript, audioFilePath], {
-          stdio: ['pipe', 'pipe', 'pipe']
-        });
-
-        let outputData = '';
-        let errorData = '';
-
-        pythonProcess.stdout.on('data', (data) => {
-          outputData += data.toString();
-        });
-
-        pythonProcess.stderr.on('data', (data) => {
-          errorData += data.toString();
-        });
-
-        pythonProcess.on('close', (code) => {
-          try {
-            if (code !== 0) {
-              console.error('[IEMOCAP] ❌ Python process error:', errorData);
-              resolve(this.getDefaultResult());
-              return;
-            }
-
-            const result = JSON.parse(outputData) as IEMOCAPResult;
-            
-            console.log(`[IEMOCAP] ✅ Speech emotion: ${result.emotion} (${result.confidence.toFixed(3)})`);
-            console.log(`[IEMOCAP] 🎯 Stress: ${result.speech_characteristics.stress_level.toFixed(3)}, Anxiety: ${result.speech_characteristics.anxiety_level.toFixed(3)}`);
-            
-            resolve(result);
-          } catch (parseError) {
-            console.error('[IEMOCAP] ❌ Failed to parse result:', parseError);
-            resolve(this.getDefaultResult());
-          }
-        });
-
-        pythonProcess.on('error', (error) => {
-          console.error('[IEMOCAP] ❌ Process spawn error:', error);
-          resolve(this.getDefaultResult());
-        });
-
-      } catch (error) {
-        console.error('[IEMOCAP] ❌ Speech emotion detection failed:', error);
-        resolve(this.getDefaultResult());
+      const result = await this.sendRequest({ audio_path: audioFilePath, ...(profile ? { profile } : {}) }) as IEMOCAPResult;
+      if (result.error) {
+        console.error('[IEMOCAP] ❌ Analysis error:', result.error);
       }
-    });
+
+      console.log(`[IEMOCAP] ✅ Speech emotion: ${result.emotion} (${result.confidence.toFixed(3)})`);
+      console.log(`[IEMOCAP] 🎯 Stress: ${result.speech_characteristics.stress_level.toFixed(3)}, Anxiety: ${result.speech_characteristics.anxiety_level.toFixed(3)}`);
+
+      return result;
+    } catch (error) {
+      console.error('[IEMOCAP] ❌ Speech emotion detection failed:', error);
+      return this.getDefaultResult();
+    }
   }
 
   /**
@@ -303,3 +425,6 @@ class IEMOCAPEmotionService {
 
 // Export singleton instance
 export const iemocapService = new IEMOCAPEmotionService();
+
+// Cleanup on process exit
+process.on('exit', () => iemocapService.shutdown());
@@ -5,6 +5,9 @@
 import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
 import path from 'path';
 import fs from 'fs';
+import net from 'net';
+import { findReadinessEvent, describeReadiness, ReadinessEvent } from './serverReadiness';
+import { encodeFrame, MessageDecoder } from './frameProtocol';
 
 interface EmotionResult {
   emotion: string;
@@ -13,6 +16,7 @@ interface EmotionResult {
   context?: string[];
   error?: string;
   method?: string;
+  raw_label?: string;
 }
 
 interface CombinedEmotionResult {
@@ -25,20 +29,68 @@ interface CombinedEmotionResult {
   };
   text: EmotionResult;
   voice: EmotionResult;
+  // Branch latencies; the two branches run concurrently, so total_ms ~ max(text_ms, voice_ms)
+  timings?: { text_ms: number; voice_ms: number; total_ms: number };
+}
+
+export interface VoiceStreamEstimate extends EmotionResult {
+  stream_id: string;
+  features?: {
+    energy: number;
+    zcr: number;
+    pitch: number;
+    pitch_std: number;
+    voiced_ratio: number;
+  };
+  window_seconds?: number;
+  stream_seconds?: number;
+  chunks?: number;
+  closed?: boolean;
+}
+
+// Raw PCM sent in-band (detectEmotionFromAudio with a Buffer); WAV buffers need no options
+export interface AudioBufferOptions {
+  format?: 's16le' | 'f32le';
+  sampleRate?: number;
+  channels?: number;
+}
+
+export interface VoiceStreamOptions {
+  sampleRate?: number;
+  windowSeconds?: number;
+  format?: 's16le' | 'f32le';
+}
+
+interface PendingRequest {
+  resolve: (result: any) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
 }
 
 class PersistentEmotionServer {
   private static instance: PersistentEmotionServer;
   private process: ChildProcessWithoutNullStreams | null = null;
+  // Set instead of `process` when sharing an emotion server started with --listen
+  private socket: net.Socket | null = null;
   private isReady = false;
-  private requestQueue: Array<{
-    request: any;
-    resolve: (result: any) => void;
-    reject: (error: Error) => void;
-  }> = [];
+  // Requests are sent with an `id` that the server echoes back, so responses
+  // are matched by id and may arrive out of order (slow voice vs fast text)
+  private pendingRequests = new Map<string, PendingRequest>();
+  private unsentRequests: (string | Buffer)[] = [];
+  // Responses are JSON lines, or binary frames for requests sent as frames
+  private decoder = new MessageDecoder();
+  private nextRequestId = 0;
+  private readiness: ReadinessEvent | null = null;
 
   private constructor() {
-    this.startServer();
+    // EMOTION_SERVER_ADDRESS=unix:/path/to.sock or tcp:host:port shares one warm
+    // model between app processes instead of spawning a private copy
+    const address = process.env.EMOTION_SERVER_ADDRESS;
+    if (address) {
+      this.connectToServer(address);
+    } else {
+      this.startServer();
+    }
   }
 
   static getInstance(): PersistentEmotionServer {
@@ -69,32 +121,26 @@ class PersistentEmotionServer {
         const message = data.toString().trim();
         console.log(`[Emotion Server] ${message}`);
         
-        if (message.includes('ready for requests')) {
+        // Structured event after warm-up; the plain "ready" line is kept for older servers
+        const readiness = findReadinessEvent(message);
+        if (readiness) {
+          this.readiness = readiness;
+          console.log(`⏱️ Emotion server startup: ${describeReadiness(readiness)}`);
+        }
+        
+        if (!this.isReady && (readiness || message.includes('ready for requests'))) {
           this.isReady = true;
           console.log('✅ Persistent emotion server is ready');
           this.processQueue();
         }
       });
 
-      this.process.stdout.on('data', (data: Buffer) => {
-        const lines = data.toString().trim().split('\n');
-        for (const line of lines) {
-          if (line.trim()) {
-            this.handleResponse(line.trim());
-          }
-        }
-      });
+      this.process.stdout.on('data', (data: Buffer) => this.handleData(data));
 
       this.process.on('close', (code) => {
         console.log(`❌ Emotion server process exited with code ${code}`);
-        this.isReady = false;
         this.process = null;
-        
-        // Reject any pending requests
-        while (this.requestQueue.length > 0) {
-          const { reject } = this.requestQueue.shift()!;
-          reject(new Error('Emotion server process terminated'));
-        }
+        this.resetConnection('Emotion server process terminated');
       });
 
       this.process.on('error', (error) => {
@@ -107,81 +153,168 @@ class PersistentEmotionServer {
     }
   }
 
-  private handleResponse(jsonLine: string) {
+  private connectToServer(address: string) {
+    const [kind, ...rest] = address.split(':');
+    const target = rest.join(':');
+    const portSeparator = target.lastIndexOf(':');
+    const options: net.NetConnectOpts = kind === 'unix'
+      ? { path: target }
+      : { host: target.slice(0, portSeparator) || '127.0.0.1', port: Number(target.slice(portSeparator + 1)) };
+
+    console.log(`🔌 Connecting to shared emotion server at ${address}...`);
+    this.socket = net.createConnection(options, () => {
+      this.isReady = true;
+      console.log('✅ Connected to shared emotion server');
+      this.processQueue();
+    });
+
+    this.socket.on('data', (data: Buffer) => this.handleData(data));
+
+    this.socket.on('close', () => {
+      console.log('❌ Shared emotion server connection closed');
+      this.socket = null;
+      this.resetConnection('Emotion server connection closed');
+    });
+
+    this.socket.on('error', (error) => {
+      console.error('❌ Shared emotion server connection error:', error);
+      this.isReady = false;
+    });
+  }
+
+  private handleData(data: Buffer) {
+    // Responses can be split across chunks - only complete lines/frames come out
+    let messages;
     try {
-      const result = JSON.parse(jsonLine);
-      
-      if (this.requestQueue.length > 0) {
-        const { resolve } = this.requestQueue.shift()!;
-        resolve(result);
-        
-        // Process next request in queue if any
-        if (this.requestQueue.length > 0) {
-          try {
-            const nextRequest = this.requestQueue[0].request;
-            const jsonRequest = JSON.stringify(nextRequest) + '\n';
-            this.process?.stdin.write(jsonRequest);
-          } catch (error) {
-            console.error('❌ Failed to send next request in queue:', error);
-          }
-        }
+      messages = this.decoder.push(data);
+    } catch (error) {
+      console.error('❌ Failed to decode emotion server output:', error);
+      return;
+    }
+    for (const message of messages) {
+      if (message.kind === 'frame') {
+        this.handleResult(message.header);
+      } else {
+        this.handleResponse(message.text);
       }
+    }
+  }
+
+  private resetConnection(reason: string) {
+    this.isReady = false;
+    this.readiness = null;
+    this.unsentRequests = [];
+    this.decoder.reset();
+
+    // Reject any pending requests
+    for (const [id, pending] of Array.from(this.pendingRequests.entries())) {
+      clearTimeout(pending.timer);
+      this.pendingRequests.delete(id);
+      pending.reject(new Error(reason));
+    }
+  }
+
+  private writeMessage(message: string | Buffer) {
+    if (this.socket) {
+      this.socket.write(message);
+    } else {
+      this.process?.stdin.write(message);
+    }
+  }
+
+  private handleResponse(jsonLine: string) {
+    let result: any;
+    try {
+      result = JSON.parse(jsonLine);
     } catch (error) {
       console.error('❌ Failed to parse emotion server response:', error);
-      
-      if (this.requestQueue.length > 0) {
-        const { reject } = this.requestQueue.shift()!;
-        reject(new Error('Invalid response from emotion server'));
-      }
+      return;
+    }
+    this.handleResult(result);
+  }
+
+  private handleResult(result: any) {
+    // Responses without an id (e.g. "Invalid JSON") belong to the oldest request
+    const id = result.id !== undefined ? String(result.id) : this.pendingRequests.keys().next().value;
+    const pending = id !== undefined ? this.pendingRequests.get(id) : undefined;
+
+    if (!pending) {
+      console.warn(`⚠️ Emotion server response for unknown request id: ${result.id}`);
+      return;
     }
+
+    clearTimeout(pending.timer);
+    this.pendingRequests.delete(id!);
+    delete result.id;
+    pending.resolve(result);
   }
 
   private processQueue() {
-    // Process any queued requests now that server is ready
-    // (No action needed here as sendRequest handles queuing)
+    // Flush requests that were issued while the server was still loading
+    const queued = this.unsentRequests;
+    this.unsentRequests = [];
+    for (const message of queued) {
+      this.writeMessage(message);
+    }
   }
 
-  async sendRequest(request: any): Promise<any> {
+  // With a body the request goes out as a binary frame (audio in-band, no base64)
+  async sendRequest(request: any, body?: Buffer): Promise<any> {
     return new Promise((resolve, reject) => {
-      if (!this.process) {
+      if (!this.process && !this.socket) {
         reject(new Error('Emotion server not running'));
         return;
       }
 
-      // Add timestamp and unique ID for better tracking
-      const requestId = Date.now() + Math.random();
-      const requestWithId = { ...request, requestId };
-      
-      // Add to queue
-      this.requestQueue.push({ request: requestWithId, resolve, reject });
-
-      if (this.isReady && this.requestQueue.length === 1) {
-        // Send request immediately if no other requests in queue
-        try {
-          const jsonRequest = JSON.stringify(requestWithId) + '\n';
-          this.process.stdin.write(jsonRequest);
-        } catch (error) {
-          // Remove from queue if sending failed
-          const index = this.requestQueue.findIndex(item => item.resolve === resolve);
-          if (index >= 0) {
-            this.requestQueue.splice(index, 1);
-          }
-          reject(error);
-        }
-      }
-      
+      const id = `${Date.now()}-${this.nextRequestId++}`;
+      const message = body
+        ? encodeFrame({ ...request, id }, body)
+        : JSON.stringify({ ...request, id }) + '\n';
+
       // Set timeout for request (increased to 30 seconds for GPU loading)
-      setTimeout(() => {
-        const index = this.requestQueue.findIndex(item => item.resolve === resolve);
-        if (index >= 0) {
-          this.requestQueue.splice(index, 1);
+      const timer = setTimeout(() => {
+        if (this.pendingRequests.delete(id)) {
+          // Not sent yet (server still starting): drop it, nobody waits for its reply
+          const unsent = this.unsentRequests.indexOf(message);
+          if (unsent !== -1) {
+            this.unsentRequests.splice(unsent, 1);
+          }
           reject(new Error('Emotion detection request timeout'));
         }
       }, 30000); // 30 second timeout for GPU model loading
+
+      this.pendingRequests.set(id, { resolve, reject, timer });
+
+      if (!this.isReady) {
+        this.unsentRequests.push(message);
+        return;
+      }
+
+      try {
+        this.writeMessage(message);
+      } catch (error) {
+        clearTimeout(timer);
+        this.pendingRequests.delete(id);
+        reject(error as Error);
+      }
     });
   }
 
+  getReadiness(): ReadinessEvent | null {
+    return this.readiness;
+  }
+
+  // Started or connected (requests queue until it is ready); false once it exited or failed to start
+  isRunning(): boolean {
+    return this.process !== null || this.socket !== null;
+  }
+
   shutdown() {
+    if (this.socket) {
+      this.socket.end();
+      this.socket = null;
+      this.isReady = false;
+    }
     if (this.process) {
       console.log('🛑 Shutting down emotion server...');
       this.process.kill('SIGTERM');
@@ -199,6 +332,14 @@ process.on('exit', () => emotionServer.shutdown());
 process.on('SIGINT', () => emotionServer.shutdown());
 process.on('SIGTERM', () => emotionServer.shutdown());
 
+export function getEmotionServerReadiness(): ReadinessEvent | null {
+  return emotionServer.getReadiness();
+}
+
+export function isEmotionServerRunning(): boolean {
+  return emotionServer.isRunning();
+}
+
 export async function detectEmotionFromText(text: string, language: 'en' | 'ur' = 'en'): Promise<EmotionResult> {
   try {
     if (!text || text.trim().length === 0) {
@@ -225,8 +366,18 @@ export async function detectEmotionFromText(text: string, language: 'en' | 'ur'
   }
 }
 
-export async function detectEmotionFromAudio(audioPath: string): Promise<EmotionResult> {
+// Audio can be a file path or the recording itself: a Buffer (WAV, or raw PCM
+// described by `options`) travels in a binary frame without touching disk
+export async function detectEmotionFromAudio(audio: string | Buffer, options: AudioBufferOptions = {}): Promise<EmotionResult> {
   try {
+    if (Buffer.isBuffer(audio)) {
+      console.log(`⚡ Fast Voice Emotion: Processing ${audio.length} bytes in-band`);
+      const result = await emotionServer.sendRequest({ mode: 'voice', ...audioFormatFields(options) }, audio);
+      console.log(`✅ Fast Voice Emotion: ${result.emotion} (${result.confidence.toFixed(3)})`);
+      return result;
+    }
+
+    const audioPath = audio;
     if (!audioPath || !fs.existsSync(audioPath)) {
       console.error('❌ Audio file not found for emotion detection');
       return { emotion: 'neutral', confidence: 0.5, error: 'Audio file not found' };
@@ -250,18 +401,15 @@ export async function detectEmotionFromAudio(audioPath: string): Promise<Emotion
   }
 }
 
-export async function detectCombinedEmotion(text: string, audioPath: string, language: 'en' | 'ur' = 'en'): Promise<CombinedEmotionResult> {
+export async function detectCombinedEmotion(text: string, audio: string | Buffer, language: 'en' | 'ur' = 'en', options: AudioBufferOptions = {}): Promise<CombinedEmotionResult> {
   try {
     console.log(`⚡ Fast Combined Emotion: Text + Voice analysis (${language})`);
 
-    const request = {
-      mode: 'combined',
-      text: text,
-      audio_path: audioPath,
-      language: language
-    };
+    const request = Buffer.isBuffer(audio)
+      ? { mode: 'combined', text: text, language: language, ...audioFormatFields(options) }
+      : { mode: 'combined', text: text, audio_path: audio, language: language };
 
-    const result = await emotionServer.sendRequest(request);
+    const result = await emotionServer.sendRequest(request, Buffer.isBuffer(audio) ? audio : undefined);
     
     if (result.combined) {
       console.log(`✅ Fast Combined Emotion: ${result.combined.emotion} (${result.combined.confidence.toFixed(3)})`);
@@ -269,7 +417,7 @@ export async function detectCombinedEmotion(text: string, audioPath: string, lan
     } else {
       // Fallback if unexpected format
       const textResult = await detectEmotionFromText(text, language);
-      const voiceResult = await detectEmotionFromAudio(audioPath);
+      const voiceResult = await detectEmotionFromAudio(audio, options);
       
       return {
         combined: {
@@ -289,7 +437,7 @@ export async function detectCombinedEmotion(text: string, audioPath: string, lan
     
     // Fallback to individual detection
     const textResult = await detectEmotionFromText(text, language);
-    const voiceResult = await detectEmotionFromAudio(audioPath);
+    const voiceResult = await detectEmotionFromAudio(audio, options);
     
     return {
       combined: {
@@ -306,6 +454,36 @@ export async function detectCombinedEmotion(text: string, audioPath: string, lan
   }
 }
 
+function audioFormatFields(options: AudioBufferOptions) {
+  return options.format
+    ? { format: options.format, sample_rate: options.sampleRate ?? 16000, channels: options.channels ?? 1 }
+    : {};
+}
+
+// Live voice chat: open a session, push PCM chunks as they are captured and
+// show the rolling estimate; each push only costs the server O(chunk)
+export async function openVoiceStream(options: VoiceStreamOptions = {}): Promise<string> {
+  const result = await emotionServer.sendRequest({
+    mode: 'stream_open',
+    sample_rate: options.sampleRate ?? 16000,
+    window_seconds: options.windowSeconds ?? 3.0,
+    format: options.format ?? 's16le'
+  });
+  if (result.error) {
+    throw new Error(result.error);
+  }
+  return result.stream_id;
+}
+
+export async function pushVoiceChunk(streamId: string, pcm: Buffer): Promise<VoiceStreamEstimate> {
+  // The chunk is the frame body - no base64 on either side
+  return emotionServer.sendRequest({ mode: 'stream_push', stream_id: streamId }, pcm);
+}
+
+export async function closeVoiceStream(streamId: string): Promise<VoiceStreamEstimate> {
+  return emotionServer.sendRequest({ mode: 'stream_close', stream_id: streamId });
+}
+
 // Fallback keyword-based emotion detection
 function performKeywordBasedEmotionDetection(text: string, language: 'en' | 'ur'): EmotionResult {
   const lowerText = text.toLowerCase();
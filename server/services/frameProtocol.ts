@@ -0,0 +1,62 @@
+// Binary frames for the Python servers (server/python/frame_protocol.py)
+// Audio goes over the pipe/socket as raw bytes instead of a temp file or base64:
+//   "\0FLF" | uint32 header length | uint32 body length | JSON header | body   (little-endian)
+// Frames start with a NUL byte, so they mix freely with plain JSON lines.
+
+export const FRAME_MAGIC = Buffer.from([0x00, 0x46, 0x4c, 0x46]);
+const PREFIX_BYTES = FRAME_MAGIC.length + 8;
+
+export type ServerMessage =
+  | { kind: 'line'; text: string }
+  | { kind: 'frame'; header: any; body: Buffer };
+
+export function encodeFrame(header: object, body: Buffer = Buffer.alloc(0)): Buffer {
+  const headerBytes = Buffer.from(JSON.stringify(header), 'utf8');
+  const prefix = Buffer.alloc(PREFIX_BYTES);
+  FRAME_MAGIC.copy(prefix, 0);
+  prefix.writeUInt32LE(headerBytes.length, FRAME_MAGIC.length);
+  prefix.writeUInt32LE(body.length, FRAME_MAGIC.length + 4);
+  return Buffer.concat([prefix, headerBytes, body]);
+}
+
+// Splits a byte stream into JSON lines and frames; chunks may end anywhere
+export class MessageDecoder {
+  private buffer = Buffer.alloc(0);
+
+  push(chunk: Buffer): ServerMessage[] {
+    this.buffer = this.buffer.length ? Buffer.concat([this.buffer, chunk]) : chunk;
+    const messages: ServerMessage[] = [];
+
+    while (this.buffer.length > 0) {
+      if (this.buffer[0] === FRAME_MAGIC[0]) {
+        if (this.buffer.length < PREFIX_BYTES) break;
+        if (!this.buffer.subarray(0, FRAME_MAGIC.length).equals(FRAME_MAGIC)) {
+          this.reset();
+          throw new Error('Invalid frame magic from server');
+        }
+        const headerLength = this.buffer.readUInt32LE(FRAME_MAGIC.length);
+        const bodyLength = this.buffer.readUInt32LE(FRAME_MAGIC.length + 4);
+        const total = PREFIX_BYTES + headerLength + bodyLength;
+        if (this.buffer.length < total) break;
+
+        const headerText = this.buffer.toString('utf8', PREFIX_BYTES, PREFIX_BYTES + headerLength);
+        const body = Buffer.from(this.buffer.subarray(PREFIX_BYTES + headerLength, total));
+        this.buffer = this.buffer.subarray(total);
+        messages.push({ kind: 'frame', header: JSON.parse(headerText), body });
+      } else {
+        const newline = this.buffer.indexOf(0x0a);
+        if (newline === -1) break;
+        const text = this.buffer.toString('utf8', 0, newline).trim();
+        this.buffer = this.buffer.subarray(newline + 1);
+        if (text) {
+          messages.push({ kind: 'line', text });
+        }
+      }
+    }
+    return messages;
+  }
+
+  reset() {
+    this.buffer = Buffer.alloc(0);
+  }
+}
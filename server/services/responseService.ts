@@ -5,6 +5,7 @@
 import { spawn } from 'child_process';
 import path from 'path';
 import fs from 'fs';
+import { MessageDecoder } from './frameProtocol';
 
 // Type definitions for conversational context
 interface ConversationHistory {
@@ -178,6 +179,13 @@ async function runLlamaResponse(request: ResponseRequest): Promise<string> {
 
 // TTS Generation using Coqui XTTS-v2
 export async function generateTTS(text: string, language: 'en' | 'ur' = 'en'): Promise<string> {
+  // Callers hand the audio to the client inside JSON; encoding happens once, here
+  const audio = await generateTTSAudio(text, language);
+  return audio.toString('base64');
+}
+
+// WAV bytes from tts_generator.py, sent back as the body of a binary frame
+export async function generateTTSAudio(text: string, language: 'en' | 'ur' = 'en'): Promise<Buffer> {
   return new Promise((resolve, reject) => {
     const pythonPath = path.join(process.cwd(), '.venv', 'Scripts', 'python.exe');
     const scriptPath = path.join(process.cwd(), 'server', 'python', 'tts_generator.py');
@@ -190,7 +198,8 @@ export async function generateTTS(text: string, language: 'en' | 'ur' = 'en'): P
     const requestData = {
       text: text.substring(0, 500), // Limit text length for performance
       language,
-      voice: language === 'en' ? 'female_voice' : 'urdu_voice'
+      voice: language === 'en' ? 'female_voice' : 'urdu_voice',
+      response_format: 'frame'
     };
     
     console.log(`Phase 4 TTS: Generating audio for text: "${text.substring(0, 50)}..."`);
@@ -200,11 +209,16 @@ export async function generateTTS(text: string, language: 'en' | 'ur' = 'en'): P
       windowsHide: true
     });
     
-    let stdout = '';
+    const decoder = new MessageDecoder();
+    const messages: ReturnType<MessageDecoder['push']> = [];
     let stderr = '';
     
-    pythonProcess.stdout.on('data', (data) => {
-      stdout += data.toString();
+    pythonProcess.stdout.on('data', (data: Buffer) => {
+      try {
+        messages.push(...decoder.push(data));
+      } catch (decodeError) {
+        stderr += String(decodeError);
+      }
     });
     
     pythonProcess.stderr.on('data', (data) => {
@@ -214,11 +228,12 @@ export async function generateTTS(text: string, language: 'en' | 'ur' = 'en'): P
     pythonProcess.on('close', (code) => {
       if (code === 0) {
         try {
-          const result = JSON.parse(stdout.trim());
-          if (result.audioBase64) {
-            resolve(result.audioBase64);
+          const message = messages[0];
+          if (message?.kind === 'frame' && message.body.length > 0) {
+            resolve(message.body);
           } else {
-            reject(new Error('No audio data in TTS output'));
+            const result = message?.kind === 'frame' ? message.header : JSON.parse(message?.text || '{}');
+            reject(new Error(result.error || 'No audio data in TTS output'));
           }
         } catch (parseError) {
           reject(new Error(`Failed to parse TTS response: ${parseError}`));
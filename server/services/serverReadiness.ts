@@ -0,0 +1,47 @@
+// Readiness events emitted by the persistent Python servers (server_readiness.py)
+// After warm-up each server writes one stderr line:
+//   @@FLUENTI_READY {"server": "emotion", "import_s": 2.1, "load_s": 3.4, "warmup": {...}}
+
+export const READY_EVENT_PREFIX = '@@FLUENTI_READY ';
+
+export interface WarmupSummary {
+  runs: number;
+  errors: number;
+  first_ms: number | null;
+  p50_ms: number | null;
+  max_ms: number | null;
+  latencies_ms?: number[];
+  processes?: number;
+}
+
+export interface ReadinessEvent {
+  server: string;
+  pid: number;
+  import_s: number;
+  load_s: number;
+  warmup: WarmupSummary | null;
+  [key: string]: any;
+}
+
+// stderr chunks can hold several lines (or a partial one) - scan line by line
+export function findReadinessEvent(chunk: string): ReadinessEvent | null {
+  for (const line of chunk.split('\n')) {
+    const start = line.indexOf(READY_EVENT_PREFIX);
+    if (start === -1) {
+      continue;
+    }
+    try {
+      return JSON.parse(line.slice(start + READY_EVENT_PREFIX.length));
+    } catch {
+      return null;
+    }
+  }
+  return null;
+}
+
+export function describeReadiness(event: ReadinessEvent): string {
+  const warmup = event.warmup && event.warmup.runs
+    ? `, warm-up p50 ${event.warmup.p50_ms?.toFixed(1)}ms over ${event.warmup.runs} runs`
+    : ', no warm-up';
+  return `imports ${event.import_s.toFixed(2)}s, load ${event.load_s.toFixed(2)}s${warmup}`;
+}
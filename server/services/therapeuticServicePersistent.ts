@@ -5,6 +5,7 @@
 import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
 import path from 'path';
 import fs from 'fs';
+import { findReadinessEvent, describeReadiness, ReadinessEvent } from './serverReadiness';
 
 export interface TherapeuticResponse {
   response: string;
@@ -29,6 +30,7 @@ class PersistentTherapeuticServer {
   private static instance: PersistentTherapeuticServer;
   private process: ChildProcessWithoutNullStreams | null = null;
   private isReady = false;
+  private readiness: ReadinessEvent | null = null;
   private requestQueue: Array<{
     request: any;
     resolve: (result: TherapeuticResponse) => void;
@@ -67,7 +69,13 @@ class PersistentTherapeuticServer {
         const message = data.toString().trim();
         console.log(`[Therapeutic Server] ${message}`);
         
-        if (message.includes('ready for requests')) {
+        const readiness = findReadinessEvent(message);
+        if (readiness) {
+          this.readiness = readiness;
+          console.log(`⏱️ Therapeutic server startup: ${describeReadiness(readiness)}`);
+        }
+        
+        if (!this.isReady && (readiness || message.includes('ready for requests'))) {
           this.isReady = true;
           console.log('✅ Persistent therapeutic server is ready');
           this.processQueue();
@@ -86,6 +94,7 @@ class PersistentTherapeuticServer {
       this.process.on('close', (code) => {
         console.log(`❌ Therapeutic server process exited with code ${code}`);
         this.isReady = false;
+        this.readiness = null;
         this.process = null;
         
         // Reject any pending requests
@@ -191,6 +200,10 @@ class PersistentTherapeuticServer {
   isServerReady(): boolean {
     return this.isReady;
   }
+
+  getReadiness(): ReadinessEvent | null {
+    return this.readiness;
+  }
 }
 
 // Initialize the persistent server
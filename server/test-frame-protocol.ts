@@ -0,0 +1,127 @@
+// Binary frame protocol regression checks (server/services/frameProtocol.ts)
+// Run with: npx tsx server/test-frame-protocol.ts
+// The Python side is covered by server/test_frame_protocol.py.
+
+import { encodeFrame, MessageDecoder, ServerMessage } from './services/frameProtocol';
+
+// encode_frame({"emotion": "joy", "confidence": 0.9}, b"\x00\x01\xff") from frame_protocol.py
+const PYTHON_FRAME = Buffer.from(
+  '00464c4625000000030000007b22656d6f74696f6e223a20226a6f79222c2022636f6e666964656e6365223a20302e397d0001ff',
+  'hex'
+);
+
+function decodeInChunks(data: Buffer, chunkSize: number): ServerMessage[] {
+  const decoder = new MessageDecoder();
+  const messages: ServerMessage[] = [];
+  for (let start = 0; start < data.length; start += chunkSize) {
+    messages.push(...decoder.push(data.subarray(start, start + chunkSize)));
+  }
+  return messages;
+}
+
+function testRoundTrip(): [boolean, string] {
+  const body = Buffer.concat([Buffer.from(Array.from({ length: 256 }, (_, i) => i)), Buffer.from('\n\0FLF')]);
+  const header = { mode: 'voice', id: 'ünïcode ✅' };
+  const data = encodeFrame(header, body);
+
+  for (const chunkSize of [data.length, 1, 5]) {
+    const messages = decodeInChunks(data, chunkSize);
+    const frame = messages[0];
+    if (messages.length !== 1 || frame.kind !== 'frame') {
+      return [false, `chunk size ${chunkSize}: ${messages.length} messages`];
+    }
+    if (JSON.stringify(frame.header) !== JSON.stringify(header) || !frame.body.equals(body)) {
+      return [false, `chunk size ${chunkSize}: header or body changed`];
+    }
+  }
+  return [true, 'header and body intact, whole or split into 1- and 5-byte chunks'];
+}
+
+function testMixedLines(): [boolean, string] {
+  const line = Buffer.from(JSON.stringify({ emotion: 'neutral' }) + '\n');
+  const data = Buffer.concat([line, encodeFrame({ a: 1 }, Buffer.from('xyz')), line, encodeFrame({ b: 2 }), line]);
+  const kinds = decodeInChunks(data, 4).map((message) => message.kind).join(',');
+  if (kinds !== 'line,frame,line,frame,line') {
+    return [false, `kinds ${kinds}`];
+  }
+  return [true, 'lines and frames interleave'];
+}
+
+function testTruncatedInput(): [boolean, string] {
+  const data = encodeFrame({ mode: 'voice' }, Buffer.from('0123456789'));
+  for (let cut = 1; cut < data.length; cut++) {
+    const decoder = new MessageDecoder();
+    if (decoder.push(data.subarray(0, cut)).length !== 0) {
+      return [false, `frame cut at byte ${cut} produced a message`];
+    }
+    const rest = decoder.push(data.subarray(cut));
+    const frame = rest[0];
+    if (rest.length !== 1 || frame.kind !== 'frame' || frame.body.toString() !== '0123456789') {
+      return [false, `frame cut at byte ${cut} did not complete with the rest`];
+    }
+  }
+  return [true, `all ${data.length - 1} cut points wait for the rest, then decode`];
+}
+
+function testBadMagic(): [boolean, string] {
+  const decoder = new MessageDecoder();
+  const bad = Buffer.from(PYTHON_FRAME);
+  bad[3] = 0x58;
+  try {
+    decoder.push(bad);
+  } catch {
+    const after = decoder.push(Buffer.from('{"ok": true}\n'));
+    if (after.length !== 1 || after[0].kind !== 'line') {
+      return [false, 'decoder kept the broken frame after reset'];
+    }
+    return [true, 'bad magic throws and resets the decoder'];
+  }
+  return [false, 'bad magic was accepted'];
+}
+
+function testPythonFrame(): [boolean, string] {
+  const messages = decodeInChunks(PYTHON_FRAME, 2);
+  const frame = messages[0];
+  if (messages.length !== 1 || frame.kind !== 'frame') {
+    return [false, `${messages.length} messages`];
+  }
+  const { header, body } = frame;
+  if (header.emotion !== 'joy' || header.confidence !== 0.9 || !body.equals(Buffer.from([0x00, 0x01, 0xff]))) {
+    return [false, `header ${JSON.stringify(header)}, body ${body.toString('hex')}`];
+  }
+  return [true, 'frame written by frame_protocol.py decodes'];
+}
+
+function main() {
+  console.log('🧪 Frame Protocol Test (TypeScript)');
+  console.log('==================================================');
+
+  const tests: [string, () => [boolean, string]][] = [
+    ['Round trip', testRoundTrip],
+    ['Mixed lines', testMixedLines],
+    ['Truncated input', testTruncatedInput],
+    ['Bad magic', testBadMagic],
+    ['Python frame', testPythonFrame],
+  ];
+
+  let passed = 0;
+  for (const [name, test] of tests) {
+    try {
+      const [success, message] = test();
+      console.log(`${success ? '✅ PASS' : '❌ FAIL'} ${name}: ${message}`);
+      if (success) passed++;
+    } catch (error) {
+      console.log(`❌ FAIL ${name}: Exception - ${error}`);
+    }
+  }
+
+  console.log('\n==================================================');
+  if (passed === tests.length) {
+    console.log(`🎉 ALL TESTS PASSED (${passed}/${tests.length})`);
+  } else {
+    console.log(`⚠️  SOME TESTS FAILED (${passed}/${tests.length})`);
+    process.exitCode = 1;
+  }
+}
+
+main();
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Batched voice feature regression checks (server/python/batch_features.py)
+Bucketing and padding must be invisible: every clip's features equal what the
+single-clip code computes for it alone, edge cases (empty, 1-sample and
+sub-frame clips) included, and the batched voice analyses answer exactly like
+one detect_voice_emotion / IEMOCAP analysis per file.
+Run with: python server/test_batch_features.py
+(the |STFT| and voice analysis checks need librosa)
+"""
+
+import os
+import sys
+import math
+import wave
+import shutil
+import tempfile
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+
+from batch_features import (length_buckets, batch_pitch_contours, batch_fast_spectral_features,
+                            batch_stft_features, STFT_FEATURES)
+from pitch_engine import pitch_contour, pitch_summary, index_spectral_centroid
+from voice_activity import trim_to_speech
+
+SR = 16000
+
+
+def single_clip_features(y, sr, trim=True):
+    """EmotionDetector._spectral_features' computation for one decoded clip"""
+    features = {}
+    if trim:
+        y, features["voice_activity"] = trim_to_speech(y, sr)
+    features["energy"] = float(np.sqrt(np.mean(y**2)))
+    pitch_estimate = 0.0
+    if len(y) > 50:
+        contour = pitch_contour(y, sr)
+        pitch_estimate = contour["pitch"]
+        features["pitch_stats"] = pitch_summary(contour)
+    features["pitch"] = float(pitch_estimate)
+    features["spectral_centroid"] = index_spectral_centroid(y, sr)
+    features["zcr"] = float(np.mean(np.abs(np.diff(np.sign(y)))))
+    return features
+
+
+def test_clips(count=60, seed=0):
+    """Voiced clips of many lengths, some with leading silence, plus edge cases"""
+    rng = np.random.default_rng(seed)
+    clips = []
+    for index in range(count):
+        n = int(rng.integers(30, SR * 3))
+        t = np.arange(n) / SR
+        y = rng.uniform(0.02, 0.5) * np.sin(2 * np.pi * rng.uniform(90, 400) * t) + rng.normal(0, 0.01, n)
+        if index % 5 == 0:
+            y[: n // 3] *= 0.0005
+        clips.append(y.astype(np.float32))
+    clips += [clips[7].copy(), clips[7][:1000].copy(), np.zeros(SR, dtype=np.float32)]
+    return clips
+
+
+def same(expected, actual):
+    """Exact equality, with nan equal to nan"""
+    if isinstance(expected, dict):
+        return isinstance(actual, dict) and expected.keys() == actual.keys() and all(
+            same(expected[key], actual[key]) for key in expected)
+    if isinstance(expected, float) and math.isnan(expected):
+        return isinstance(actual, float) and math.isnan(actual)
+    return expected == actual
+
+
+def without_timing(features):
+    features = dict(features)
+    if "voice_activity" in features:
+        features["voice_activity"] = {key: value for key, value in features["voice_activity"].items()
+                                      if not key.endswith("_ms")}
+    return features
+
+
+def test_length_buckets():
+    """Every clip in exactly one bucket, none over the size or padding limits"""
+    lengths = [int(n) for n in np.random.default_rng(1).integers(100, 50000, 500)]
+    buckets = length_buckets(lengths, max_batch=16, max_padding=0.25)
+    flat = sorted(index for bucket in buckets for index in bucket)
+    if flat != list(range(len(lengths))):
+        return False, "clips lost or repeated"
+    for bucket in buckets:
+        shortest, longest = min(lengths[i] for i in bucket), max(lengths[i] for i in bucket)
+        if len(bucket) > 16 or longest > shortest * 1.25:
+            return False, f"bucket of {len(bucket)} spans {shortest}-{longest}"
+    return True, f"{len(lengths)} clips in {len(buckets)} buckets"
+
+
+def test_pitch_contours_match():
+    """batch_pitch_contours gives pitch_contour's arrays and clip pitch bit for bit"""
+    clips = [clip for clip in test_clips(30, seed=2) if len(clip) > 50]
+    for clip, contour in zip(clips, batch_pitch_contours(clips, SR)):
+        expected = pitch_contour(clip, SR)
+        if contour["pitch"] != expected["pitch"] or any(
+                not np.array_equal(contour[key], expected[key]) for key in ("f0", "voiced", "times")):
+            return False, f"{len(clip)}-sample clip differs"
+    return True, f"{len(clips)} contours identical"
+
+
+def test_fast_features_match():
+    """batch_fast_spectral_features equals the single-clip features, trimmed or not"""
+    clips = test_clips()
+    for trim in (True, False):
+        batch = batch_fast_spectral_features(clips, SR, trim=trim)
+        for clip, features in zip(clips, batch):
+            expected = single_clip_features(clip, SR, trim)
+            if not same(without_timing(expected), without_timing(features)):
+                return False, f"trim={trim}: {len(clip)}-sample clip differs"
+    return True, f"{len(clips)} clips identical with and without trimming"
+
+
+def test_degenerate_clips():
+    """Empty and 1-sample clips match the single-clip values (nan zcr, not -0.0)"""
+    clips = [np.zeros(0, dtype=np.float32), np.ones(1, dtype=np.float32), np.ones(2, dtype=np.float32)]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # np.mean of no samples
+        batch = batch_fast_spectral_features(clips, SR, trim=False)
+        expected = [single_clip_features(clip, SR, trim=False) for clip in clips]
+    for clip, want, got in zip(clips, expected, batch):
+        if not same(want, got) or math.copysign(1.0, got["zcr"]) < 0:
+            return False, f"{len(clip)} samples: expected {want}, got {got}"
+    return True, "zcr " + ", ".join(str(features["zcr"]) for features in batch)
+
+
+def test_stft_features_match_engine():
+    """batch_stft_features gives SpectralFeatureEngine's centroid, bandwidth, rolloff and contrast bit for bit"""
+    from spectral_features import SpectralFeatureEngine, feature_pad_mode
+    clips = test_clips(40, seed=4)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # librosa: n_fft too large for the shortest clips
+        batch = batch_stft_features(clips, SR)
+        for clip, features in zip(clips, batch):
+            engine = SpectralFeatureEngine(clip, SR)
+            for name in STFT_FEATURES:
+                expected = getattr(engine, name)()
+                if name not in features or not np.array_equal(features[name], expected):
+                    return False, f"{len(clip)}-sample clip: {name} differs"
+    empty = batch_stft_features([np.zeros(0, dtype=np.float32)], SR)
+    if empty != [{}]:
+        return False, "empty clip got features"
+    return True, f"{len(clips)} clips identical (pad_mode {feature_pad_mode()!r})"
+
+
+def write_wavs(directory, clips):
+    paths = []
+    for index, clip in enumerate(clips):
+        path = os.path.join(directory, f"clip{index}.wav")
+        with wave.open(path, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(SR)
+            wav_file.writeframes((np.clip(clip, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+        paths.append(path)
+    return paths
+
+
+def test_voice_batch_matches_single_calls():
+    """detect_voice_emotion_batch answers like detect_voice_emotion per file"""
+    from emotion_detector import EmotionDetector
+
+    directory = tempfile.mkdtemp(prefix="batch_features_test_")
+    try:
+        paths = write_wavs(directory, test_clips(12, seed=3)[:12])
+        os.environ["FEATURE_CACHE_MAX_ENTRIES"] = "0"  # both paths decode and analyze every file
+        detector = EmotionDetector()
+        batch = detector.detect_voice_emotion_batch(paths)
+        single = [detector.detect_voice_emotion(path) for path in paths]
+
+        def comparable(result):
+            result = {key: value for key, value in result.items() if not key.endswith("_ms") and key != "feature_cache"}
+            if "features" in result:
+                result["features"] = without_timing(result["features"])
+            return result
+        different = [os.path.basename(path) for path, a, b in zip(paths, batch, single)
+                     if comparable(a) != comparable(b)]
+        if different:
+            return False, f"differ: {different}"
+        return True, f"{len(paths)} files identical"
+    finally:
+        os.environ.pop("FEATURE_CACHE_MAX_ENTRIES", None)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_iemocap_batch_matches_single_files():
+    """detect_speech_emotion_batch (batched |STFT|) analyzes like extract_comprehensive_features per file"""
+    import logging
+    from iemocap_emotion_detector import EnhancedEmotionDetector
+
+    directory = tempfile.mkdtemp(prefix="batch_features_test_")
+    logging.disable(logging.INFO)  # several log lines per file
+    try:
+        paths = write_wavs(directory, test_clips(12, seed=5)[:12])
+        detector = EnhancedEmotionDetector()
+        batch = detector.detect_speech_emotion_batch(paths, "standard", use_cache=False)
+        for path, result in zip(paths, batch):
+            _, _, features = detector.extract_comprehensive_features(path, "standard")
+            characteristics = detector.analyze_advanced_characteristics(features)
+            if result["speech_characteristics"] != characteristics:
+                return False, f"{os.path.basename(path)}: characteristics differ"
+            if "stft_batch" not in result["feature_timings"] or "stft" in result["feature_timings"]:
+                return False, f"{os.path.basename(path)}: |STFT| not from the batch ({result['feature_timings']})"
+        return True, f"{len(paths)} files identical"
+    finally:
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    print("🧪 Batch Features Test")
+    print("=" * 50)
+
+    tests = [
+        ("Length buckets", test_length_buckets),
+        ("Pitch contours", test_pitch_contours_match),
+        ("Fast spectral features", test_fast_features_match),
+        ("Degenerate clips", test_degenerate_clips),
+        ("|STFT| features", test_stft_features_match_engine),
+        ("Voice batch vs single", test_voice_batch_matches_single_calls),
+        ("IEMOCAP batch vs single", test_iemocap_batch_matches_single_files)
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            success, message = test_func()
+            status = "✅ PASS" if success else "❌ FAIL"
+            print(f"{status} {test_name}: {message}")
+            results.append(success)
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: Exception - {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    passed = sum(results)
+    total = len(results)
+
+    if passed == total:
+        print(f"🎉 ALL TESTS PASSED ({passed}/{total})")
+    else:
+        print(f"⚠️  SOME TESTS FAILED ({passed}/{total})")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
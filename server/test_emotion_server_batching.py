@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Emotion server scheduler regression checks
+Drives PersistentEmotionDetector.run_server over in-memory streams with a
+stand-in text classifier, so no model is downloaded: micro-batching must group
+consecutive text requests into one classifier call and keep replies in order,
+and requests with an "id" must get it back, answered as soon as they finish.
+Run with: python server/test_emotion_server_batching.py
+(needs numpy and librosa, which the voice mode imports)
+"""
+
+import io
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+
+
+class RecordingClassifier:
+    """Pipeline stand-in: labels each text by its first word, records every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, batch_size=None):
+        self.calls.append(list(texts))
+        return [[{"label": text.split()[0].lower(), "score": 0.9}, {"label": "neutral", "score": 0.1}]
+                for text in texts]
+
+
+def make_server(window_ms=200.0):
+    from emotion_server import PersistentEmotionDetector
+    os.environ["EMOTION_BATCH_WINDOW_MS"] = str(window_ms)
+    server = PersistentEmotionDetector(modes={"voice"})
+    # Text mode on, with the stand-in in place of the GoEmotions pipeline
+    server.modes.add("text")
+    server.text_model = RecordingClassifier()
+    server.model_loaded = True
+    return server
+
+
+def serve(server, requests):
+    """Run the server over the given requests; returns the JSON replies in output order"""
+    lines = [request if isinstance(request, str) else json.dumps(request) for request in requests]
+    output = io.BytesIO()
+    server.run_server(io.BytesIO(("\n".join(lines) + "\n").encode("utf-8")), output, announce=False)
+    return [json.loads(line) for line in output.getvalue().decode("utf-8").splitlines() if line.strip()]
+
+
+def test_text_requests_share_one_batch():
+    """Consecutive text requests inside the window go through one classifier call"""
+    server = make_server()
+    texts = ["joy is here", "anger again", "fear of calls", "sadness today", "joy once more"]
+    replies = serve(server, [{"mode": "text", "text": text} for text in texts])
+
+    if [reply.get("emotion") for reply in replies] != [text.split()[0] for text in texts]:
+        return False, f"replies out of order: {[reply.get('emotion') for reply in replies]}"
+    if len(server.text_model.calls) != 1:
+        return False, f"expected 1 classifier call, got {len(server.text_model.calls)}"
+    return True, f"{len(texts)} texts answered in order from 1 batch"
+
+
+def test_batch_size_limit():
+    """No batch grows past EMOTION_BATCH_SIZE"""
+    os.environ["EMOTION_BATCH_SIZE"] = "2"
+    try:
+        server = make_server()
+    finally:
+        del os.environ["EMOTION_BATCH_SIZE"]
+    replies = serve(server, [{"mode": "text", "text": f"joy number {index}"} for index in range(5)])
+
+    sizes = [len(call) for call in server.text_model.calls]
+    if len(replies) != 5 or max(sizes) > 2:
+        return False, f"{len(replies)} replies, batch sizes {sizes}"
+    return True, f"batch sizes {sizes}"
+
+
+def test_other_requests_keep_their_place():
+    """A non-batchable request between texts is carried over, not answered early or late"""
+    server = make_server()
+    replies = serve(server, [
+        {"mode": "text", "text": "joy first"},
+        "not json",
+        {"mode": "text", "text": "anger third"},
+    ])
+
+    order = [reply.get("error") or reply.get("emotion") for reply in replies]
+    if order != ["joy", "Invalid JSON", "anger"]:
+        return False, f"reply order {order}"
+    return True, "replies keep arrival order around a carried request"
+
+
+def test_duplicate_texts_run_once():
+    """The same text twice in one batch is classified once and answered twice"""
+    server = make_server()
+    replies = serve(server, [{"mode": "text", "text": "joy again"}] * 3)
+
+    classified = [text for call in server.text_model.calls for text in call]
+    if len(replies) != 3 or classified != ["joy again"]:
+        return False, f"{len(replies)} replies, classified {classified}"
+    return True, "3 replies from 1 classification"
+
+
+def test_ids_are_echoed():
+    """Batched replies carry their request's id; requests without one get none"""
+    server = make_server()
+    replies = serve(server, [
+        {"mode": "text", "text": "joy tagged", "id": "a"},
+        {"mode": "text", "text": "anger untagged"},
+        {"mode": "text", "text": "fear tagged", "id": 7},
+    ])
+
+    pairs = [(reply.get("emotion"), reply.get("id")) for reply in replies]
+    if pairs != [("joy", "a"), ("anger", None), ("fear", 7)]:
+        return False, f"replies {pairs}"
+    return True, "ids echoed on batched replies"
+
+
+def test_tagged_requests_answer_out_of_order():
+    """A slow request with an id does not hold back a faster one sent after it"""
+    server = make_server()
+
+    def fake_voice(audio_path, audio_bytes=None, audio_format=None, use_cache=True):
+        time.sleep(0.5 if audio_path == "slow.wav" else 0.0)
+        return {"emotion": "neutral", "confidence": 0.5, "audio_path": audio_path}
+    server.detect_voice_emotion = fake_voice
+
+    replies = serve(server, [
+        {"mode": "voice", "audio_path": "slow.wav", "id": "slow"},
+        {"mode": "voice", "audio_path": "fast.wav", "id": "fast"},
+    ])
+
+    order = [reply.get("id") for reply in replies]
+    if order != ["fast", "slow"]:
+        return False, f"reply order {order}"
+    if any(reply["audio_path"] != f"{reply['id']}.wav" for reply in replies):
+        return False, "an id was attached to the wrong reply"
+    return True, "fast reply overtook the slow one, ids matched"
+
+
+def main():
+    print("🧪 Emotion Server Batching Test")
+    print("=" * 50)
+
+    tests = [
+        ("One batch", test_text_requests_share_one_batch),
+        ("Batch size limit", test_batch_size_limit),
+        ("Carried requests", test_other_requests_keep_their_place),
+        ("Duplicate texts", test_duplicate_texts_run_once),
+        ("Echoed ids", test_ids_are_echoed),
+        ("Out-of-order ids", test_tagged_requests_answer_out_of_order)
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            success, message = test_func()
+            status = "✅ PASS" if success else "❌ FAIL"
+            print(f"{status} {test_name}: {message}")
+            results.append(success)
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: Exception - {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    passed = sum(results)
+    total = len(results)
+
+    if passed == total:
+        print(f"🎉 ALL TESTS PASSED ({passed}/{total})")
+    else:
+        print(f"⚠️  SOME TESTS FAILED ({passed}/{total})")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
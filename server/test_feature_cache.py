@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Feature cache regression checks (server/python/feature_cache.py)
+Keys follow audio content and profile (trimming settings included), the
+memory tier evicts least recently used entries past its entry and byte limits,
+the disk tier survives a new cache instance and evicts its oldest files,
+stored arrays are frozen copies, uncached analyses (server warm-up) leave the
+cache untouched, and a hit reports no decode time.
+Run with: python server/test_feature_cache.py
+(the last check needs librosa)
+"""
+
+import os
+import sys
+import time
+import wave
+import shutil
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+
+from feature_cache import FeatureCache
+
+
+def write_file(directory, name, data):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as handle:
+        handle.write(data)
+    return path
+
+
+def test_content_keys():
+    """Same bytes under another name share a key; other bytes or profiles do not"""
+    directory = tempfile.mkdtemp(prefix="feature_cache_test_")
+    try:
+        cache = FeatureCache()
+        first = write_file(directory, "a.wav", b"RIFF" + bytes(100))
+        copy = write_file(directory, "b.wav", b"RIFF" + bytes(100))
+        other = write_file(directory, "c.wav", b"RIFF" + bytes(99) + b"\x01")
+
+        key = cache.key_for_file(first, "iemocap:standard")
+        if cache.key_for_file(copy, "iemocap:standard") != key:
+            return False, "copied file got another key"
+        if cache.key_for_file(other, "iemocap:standard") == key or cache.key_for_file(first, "iemocap:fast") == key:
+            return False, "changed content or profile kept the key"
+        if cache.key_for_bytes(b"RIFF" + bytes(100), "iemocap:standard") != key:
+            return False, "in-memory bytes keyed differently from the same file"
+
+        # Rewriting a file (new mtime) must re-hash, not reuse the remembered digest
+        time.sleep(0.01)
+        write_file(directory, "a.wav", b"RIFF" + bytes(99) + b"\x01")
+        if cache.key_for_file(first, "iemocap:standard") != cache.key_for_file(other, "iemocap:standard"):
+            return False, "rewritten file kept its old digest"
+        return True, "keys follow content and profile"
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_trim_settings_in_profile():
+    """Trimming on/off and VOICE_ACTIVITY_TOP_DB both change the cache profile"""
+    from voice_activity import trim_profile
+    previous = {name: os.environ.pop(name, None) for name in ("VOICE_ACTIVITY_TRIM", "VOICE_ACTIVITY_TOP_DB")}
+    try:
+        default = trim_profile()
+        os.environ["VOICE_ACTIVITY_TOP_DB"] = "30"
+        other_top_db = trim_profile()
+        os.environ["VOICE_ACTIVITY_TRIM"] = "false"
+        disabled = trim_profile()
+        if len({default, other_top_db, disabled}) != 3:
+            return False, f"profiles {default}, {other_top_db}, {disabled}"
+        return True, f"{default}, {other_top_db}, {disabled}"
+    finally:
+        for name, value in previous.items():
+            os.environ.pop(name, None)
+            if value is not None:
+                os.environ[name] = value
+
+
+def test_memory_lru():
+    """Entry limit evicts the least recently used; byte limit counts array bytes"""
+    cache = FeatureCache(max_entries=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")
+    cache.put("c", {"n": 3})
+    present = [key for key in "abc" if cache.get(key) is not None]
+    if present != ["a", "c"]:
+        return False, f"kept {present}"
+
+    cache = FeatureCache(max_entries=100, max_bytes=10000)
+    for index in range(5):
+        cache.put(f"k{index}", {}, {"embedding": np.zeros(500, dtype=np.float32)})  # ~2.2 KB each
+    stats = cache.stats()
+    if stats["bytes_used"] > 10000 or stats["entries"] != 4 or cache.get("k0") is not None:
+        return False, f"stats {stats}"
+
+    cache.put("huge", {}, {"embedding": np.zeros(5000, dtype=np.float32)})
+    if cache.get("huge") is not None:
+        return False, "entry larger than max_bytes was stored"
+    return True, f"LRU order kept, {stats['entries']} entries in {stats['bytes_used']} bytes"
+
+
+def test_frozen_copies():
+    """The caller's array stays writable and unshared; cached arrays and summaries cannot be changed"""
+    cache = FeatureCache()
+    embedding = np.arange(4, dtype=np.float32)
+    summary = {"pitch": {"mean": 180.0}}
+    cache.put("k", summary, {"embedding": embedding})
+
+    embedding[0] = 99.0  # would raise if put() had frozen the caller's array
+    summary["pitch"]["mean"] = 0.0
+    cached_summary, arrays, tier = cache.get("k")
+    if arrays["embedding"][0] != 0.0 or cached_summary["pitch"]["mean"] != 180.0:
+        return False, "cache shares the caller's objects"
+    if arrays["embedding"].flags.writeable:
+        return False, "cached array is writable"
+
+    cached_summary["pitch"]["mean"] = -1.0
+    if cache.get("k")[0]["pitch"]["mean"] != 180.0:
+        return False, "mutating a returned summary changed the cache"
+    return True, f"{tier} hit returns frozen arrays and fresh summaries"
+
+
+def test_disk_tier():
+    """A new instance over the same directory hits on disk, then in memory; oldest files go first"""
+    directory = tempfile.mkdtemp(prefix="feature_cache_test_")
+    try:
+        FeatureCache(disk_dir=directory).put("k", {"n": 1}, {"embedding": np.ones(8, dtype=np.float32)})
+        restarted = FeatureCache(disk_dir=directory)
+        first, second = restarted.get("k"), restarted.get("k")
+        if first is None or first[2] != "disk" or second[2] != "memory":
+            return False, f"tiers {first and first[2]}, {second and second[2]}"
+        if first[0] != {"n": 1} or not np.array_equal(first[1]["embedding"], np.ones(8)):
+            return False, "disk entry changed on the round trip"
+
+        small = FeatureCache(max_entries=0, disk_dir=directory, disk_max_bytes=3000)
+        for index in range(6):
+            small.put(f"d{index}", {}, {"embedding": np.zeros(100, dtype=np.float32)})
+            # mtime is the disk tier's recency; keep the files' ages distinct
+            os.utime(small._disk_path(f"d{index}"), (index + 1000, index + 1000))
+        kept = [index for index in range(6) if os.path.exists(small._disk_path(f"d{index}"))]
+        disk_bytes = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        if disk_bytes > 3000 or kept != list(range(6 - len(kept), 6)):
+            return False, f"kept {kept}, {disk_bytes} bytes on disk"
+        return True, f"restart hit on disk; disk limit kept newest {len(kept)}"
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_uncached_analysis_skips_cache():
+    """detect_speech_emotion(use_cache=False) - the servers' warm-up - neither reads nor fills the cache"""
+    from feature_cache import get_feature_cache
+    from iemocap_emotion_detector import EnhancedEmotionDetector
+
+    handle, audio_path = tempfile.mkstemp(suffix=".wav")
+    os.close(handle)
+    try:
+        sr = 16000
+        t = np.arange(sr) / sr
+        with wave.open(audio_path, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sr)
+            wav_file.writeframes((0.3 * np.sin(2 * np.pi * 180.0 * t) * 32767).astype("<i2").tobytes())
+
+        detector = EnhancedEmotionDetector()
+        cache = get_feature_cache()
+        before = cache.stats()
+        detector.detect_speech_emotion(audio_path, "fast", use_cache=False)
+        after = cache.stats()
+        if (after["entries"], after["hits"], after["misses"]) != (before["entries"], before["hits"], before["misses"]):
+            return False, f"cache changed: {before} -> {after}"
+
+        detector.detect_speech_emotion(audio_path, "fast")
+        if cache.stats()["entries"] != before["entries"] + 1:
+            return False, "cached analysis did not store its entry"
+        hit = detector.detect_speech_emotion(audio_path, "fast")
+        if hit["feature_cache"] != "memory" or hit["decode_ms"] != 0.0:
+            return False, f"hit reported {hit['feature_cache']}, decode_ms {hit['decode_ms']}"
+        return True, "uncached run left the cache as it was; the hit decoded nothing"
+    finally:
+        os.remove(audio_path)
+
+
+def main():
+    print("🧪 Feature Cache Test")
+    print("=" * 50)
+
+    tests = [
+        ("Content keys", test_content_keys),
+        ("Trim settings", test_trim_settings_in_profile),
+        ("Memory LRU", test_memory_lru),
+        ("Frozen copies", test_frozen_copies),
+        ("Disk tier", test_disk_tier),
+        ("Uncached analysis", test_uncached_analysis_skips_cache)
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            success, message = test_func()
+            status = "✅ PASS" if success else "❌ FAIL"
+            print(f"{status} {test_name}: {message}")
+            results.append(success)
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: Exception - {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    passed = sum(results)
+    total = len(results)
+
+    if passed == total:
+        print(f"🎉 ALL TESTS PASSED ({passed}/{total})")
+    else:
+        print(f"⚠️  SOME TESTS FAILED ({passed}/{total})")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
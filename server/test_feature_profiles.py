@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+IEMOCAP feature profile regression checks (server/python/spectral_features.py)
+fast / standard / full must compute exactly their own features, "standard"
+must hold everything analyze_advanced_characteristics reads, and the queue
+depth hook must drop to "fast" only past its threshold.
+Run with: python server/test_feature_profiles.py
+(needs numpy and librosa)
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+
+from spectral_features import (FEATURE_PROFILES, SpectralFeatureEngine, resolve_profile,
+                               profile_for_queue_depth)
+
+SR = 16000
+
+
+def speech_like(seconds=2.0, seed=0):
+    """A gliding voiced tone with syllable-rate loudness changes and some noise"""
+    t = np.arange(int(SR * seconds)) / SR
+    f0 = 160.0 + 40.0 * np.sin(2 * np.pi * 0.7 * t)
+    y = 0.3 * np.sin(2 * np.pi * np.cumsum(f0) / SR) * (0.6 + 0.4 * np.sin(2 * np.pi * 4.0 * t))
+    return (y + 0.01 * np.random.default_rng(seed).standard_normal(len(t))).astype(np.float32)
+
+
+def test_resolve_profile():
+    """Explicit profile, then IEMOCAP_FEATURE_PROFILE, then standard; unknown names raise"""
+    previous = os.environ.pop("IEMOCAP_FEATURE_PROFILE", None)
+    try:
+        if resolve_profile() != "standard" or resolve_profile("full") != "full":
+            return False, "default or explicit profile wrong"
+        os.environ["IEMOCAP_FEATURE_PROFILE"] = "fast"
+        if resolve_profile() != "fast" or resolve_profile("standard") != "standard":
+            return False, "environment default wrong"
+        try:
+            resolve_profile("quick")
+        except ValueError:
+            return True, "explicit > environment > standard, unknown rejected"
+        return False, "unknown profile accepted"
+    finally:
+        os.environ.pop("IEMOCAP_FEATURE_PROFILE", None)
+        if previous is not None:
+            os.environ["IEMOCAP_FEATURE_PROFILE"] = previous
+
+
+def test_queue_depth_fallback():
+    """"fast" from the threshold on; a threshold of 0 never sheds"""
+    depths = {depth: profile_for_queue_depth("full", depth, threshold=4) for depth in (0, 3, 4, 9)}
+    if depths != {0: "full", 3: "full", 4: "fast", 9: "fast"}:
+        return False, f"profiles by depth {depths}"
+    if profile_for_queue_depth("standard", 100, threshold=0) != "standard":
+        return False, "threshold 0 still fell back"
+    return True, "falls back at depth >= threshold only"
+
+
+def test_profiles_compute_only_their_features():
+    """Each profile returns its own features; fast does no onset or mel work"""
+    y = speech_like()
+    for profile, names in FEATURE_PROFILES.items():
+        engine = SpectralFeatureEngine(y, SR)
+        features = engine.extract(profile)
+        if set(features) != set(names):
+            return False, f"{profile}: got {sorted(features)}"
+        if profile == "fast" and any(name.startswith("onset") or name == "log_mel" for name in engine.timings):
+            return False, f"fast computed {sorted(engine.timings)}"
+    return True, ", ".join(f"{profile} {len(names)}" for profile, names in FEATURE_PROFILES.items())
+
+
+def test_standard_is_enough_for_characteristics():
+    """analyze_advanced_characteristics gives the same result from standard as from full"""
+    from iemocap_emotion_detector import EnhancedEmotionDetector
+    detector = EnhancedEmotionDetector()
+    y = speech_like(seconds=3.0)
+    standard = detector.analyze_advanced_characteristics(SpectralFeatureEngine(y, SR).extract("standard"))
+    full = detector.analyze_advanced_characteristics(SpectralFeatureEngine(y, SR).extract("full"))
+    if standard != full:
+        return False, f"standard {standard} != full {full}"
+    return True, f"{len(standard)} characteristics identical"
+
+
+def main():
+    print("🧪 Feature Profile Test")
+    print("=" * 50)
+
+    tests = [
+        ("Profile resolution", test_resolve_profile),
+        ("Queue depth fallback", test_queue_depth_fallback),
+        ("Profile contents", test_profiles_compute_only_their_features),
+        ("Standard covers characteristics", test_standard_is_enough_for_characteristics)
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            success, message = test_func()
+            status = "✅ PASS" if success else "❌ FAIL"
+            print(f"{status} {test_name}: {message}")
+            results.append(success)
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: Exception - {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    passed = sum(results)
+    total = len(results)
+
+    if passed == total:
+        print(f"🎉 ALL TESTS PASSED ({passed}/{total})")
+    else:
+        print(f"⚠️  SOME TESTS FAILED ({passed}/{total})")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
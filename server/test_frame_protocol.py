@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Binary frame protocol regression checks (server/python/frame_protocol.py)
+Frames must round-trip header and body exactly, mix with JSON lines on one
+stream, and fail with FrameError - never a partial message - when the stream
+is cut short or the prefix is invalid.
+The TypeScript side is covered by server/test-frame-protocol.ts.
+Run with: python server/test_frame_protocol.py
+"""
+
+import io
+import os
+import sys
+import json
+import struct
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+
+from frame_protocol import (MAGIC, MAX_BODY_BYTES, FrameError, encode_frame, read_message,
+                            read_message_async)
+
+
+class TrickleStream(io.RawIOBase):
+    """Binary stream that returns at most `step` bytes per read, like a pipe"""
+
+    def __init__(self, data, step=3):
+        self.data = io.BytesIO(data)
+        self.step = step
+
+    def readable(self):
+        return True
+
+    def read(self, count=-1):
+        return self.data.read(self.step if count < 0 else min(count, self.step))
+
+    def readline(self):
+        return self.data.readline()
+
+
+def read_all(data, step=None):
+    stream = TrickleStream(data, step) if step else io.BytesIO(data)
+    messages = []
+    while True:
+        message = read_message(stream)
+        if message is None:
+            return messages
+        messages.append(message)
+
+
+def test_round_trip():
+    """Header and body come back exactly, including empty and binary bodies"""
+    body = bytes(range(256)) * 40 + b"\n\x00FLF"
+    cases = [({"mode": "voice", "audio_format": "wav"}, body), ({"id": 3, "text": "ünïcode ✅"}, b"")]
+    for header, payload in cases:
+        for step in (None, 1, 7):
+            messages = read_all(encode_frame(header, payload), step)
+            if messages != [("frame", header, payload)]:
+                return False, f"step {step}: got {messages[:1]}"
+    return True, "headers and bodies intact, also when read a few bytes at a time"
+
+
+def test_frames_mix_with_lines():
+    """JSON lines before, between and after frames are read as lines"""
+    line = json.dumps({"mode": "text", "text": "hello"}) + "\n"
+    data = line.encode() + encode_frame({"a": 1}, b"xyz") + line.encode() + encode_frame({"b": 2}) + line.encode()
+    kinds = [message[0] for message in read_all(data)]
+    if kinds != ["line", "frame", "line", "frame", "line"]:
+        return False, f"kinds {kinds}"
+    return True, "lines and frames interleave"
+
+
+def test_truncated_frames():
+    """Every cut inside a frame raises FrameError"""
+    data = encode_frame({"mode": "voice"}, b"0123456789")
+    for cut in range(1, len(data)):
+        try:
+            read_all(data[:cut])
+        except FrameError:
+            continue
+        return False, f"frame cut at byte {cut} of {len(data)} did not raise"
+    return True, f"all {len(data) - 1} cut points raise FrameError"
+
+
+def test_invalid_prefixes():
+    """Bad magic, oversized lengths and non-object headers are rejected"""
+    bad_magic = b"\x00FLX" + struct.pack("<II", 2, 0) + b"{}"
+    too_large = MAGIC + struct.pack("<II", 2, MAX_BODY_BYTES + 1) + b"{}"
+    not_object = encode_frame([1, 2])
+    not_json = MAGIC + struct.pack("<II", 3, 0) + b"{x}"
+    for name, data in (("bad magic", bad_magic), ("too large", too_large),
+                       ("array header", not_object), ("invalid JSON", not_json)):
+        try:
+            read_all(data)
+        except FrameError:
+            continue
+        return False, f"{name} was accepted"
+    return True, "bad magic, oversize, array and invalid headers rejected"
+
+
+def test_async_reader():
+    """read_message_async reads the same messages and stops with IncompleteReadError on a cut"""
+    async def read(data):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        messages = []
+        while True:
+            message = await read_message_async(reader)
+            if message is None:
+                return messages
+            messages.append(message)
+
+    data = b'{"mode": "stats"}\n' + encode_frame({"id": "x"}, b"body")
+    if asyncio.run(read(data)) != read_all(data):
+        return False, "async and blocking readers disagree"
+    try:
+        asyncio.run(read(data[:-2]))
+    except asyncio.IncompleteReadError:
+        return True, "same messages; a cut frame raises IncompleteReadError"
+    return False, "cut frame did not raise"
+
+
+def main():
+    print("🧪 Frame Protocol Test")
+    print("=" * 50)
+
+    tests = [
+        ("Round trip", test_round_trip),
+        ("Mixed lines", test_frames_mix_with_lines),
+        ("Truncated frames", test_truncated_frames),
+        ("Invalid prefixes", test_invalid_prefixes),
+        ("Async reader", test_async_reader)
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            success, message = test_func()
+            status = "✅ PASS" if success else "❌ FAIL"
+            print(f"{status} {test_name}: {message}")
+            results.append(success)
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: Exception - {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    passed = sum(results)
+    total = len(results)
+
+    if passed == total:
+        print(f"🎉 ALL TESTS PASSED ({passed}/{total})")
+    else:
+        print(f"⚠️  SOME TESTS FAILED ({passed}/{total})")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
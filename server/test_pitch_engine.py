@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Pitch engine regression checks (server/python/pitch_engine.py)
+The fast voice analysis used to peak-pick lags 20-200 of a full-clip
+np.correlate and to take the index centroid of a full complex FFT; the
+frame-wise engine must keep giving the rules the same values.
+Run with: python server/test_pitch_engine.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+
+from pitch_engine import pitch_contour, pitch_summary, index_spectral_centroid
+
+SR = 16000
+
+
+def old_pitch(y, sr):
+    """The pre-engine estimate: full autocorrelation, best lag in 20..199"""
+    autocorr = np.correlate(y, y, mode='full')
+    autocorr = autocorr[len(autocorr)//2:]
+    pitch_estimate = 0
+    if len(autocorr) > 50:
+        pitch_estimate = np.argmax(autocorr[20:200]) + 20
+        pitch_estimate = sr / pitch_estimate if pitch_estimate > 0 else 0
+    return float(pitch_estimate)
+
+
+def old_spectral_centroid(y, sr):
+    """The pre-engine index centroid over a full complex FFT"""
+    fft = np.abs(np.fft.fft(y))
+    return float(np.mean(np.where(fft > 0.01)[0])) * sr / len(fft) if np.any(fft > 0.01) else 1000
+
+
+def voiced_tone(f0, seconds=1.0, seed=0):
+    """A voiced-like tone: f0 plus two weaker harmonics and a little noise"""
+    t = np.arange(int(SR * seconds)) / SR
+    y = 0.3 * np.sin(2 * np.pi * f0 * t) + 0.1 * np.sin(4 * np.pi * f0 * t) + 0.05 * np.sin(6 * np.pi * f0 * t)
+    return (y + 0.01 * np.random.default_rng(seed).standard_normal(len(t))).astype(np.float32)
+
+
+def test_clip_pitch_matches_full_correlation():
+    """Same clip-level pitch as the full np.correlate for tones across the search range"""
+    mismatches = []
+    for index, f0 in enumerate(np.linspace(110.0, 700.0, 24)):
+        y = voiced_tone(f0, seed=index)
+        new, old = pitch_contour(y, SR)["pitch"], old_pitch(y, SR)
+        if new != old:
+            mismatches.append((round(float(f0), 1), old, new))
+    if mismatches:
+        return False, f"(f0, old, new) differ: {mismatches[:4]}"
+    return True, "24 tones from 110 to 700 Hz agree"
+
+
+def test_frame_contour_tracks_f0():
+    """Voiced frames of a steady tone sit within one lag step of the true f0"""
+    for f0 in (120.0, 220.0, 400.0):
+        stats = pitch_summary(pitch_contour(voiced_tone(f0, seconds=2.0), SR))
+        lag = SR / f0
+        tolerance = SR / (lag - 1) - SR / lag
+        if stats["voiced_ratio"] < 0.9 or abs(stats["median"] - f0) > tolerance:
+            return False, f"{f0} Hz tone: {stats}"
+    return True, "median f0 within a lag step at 120, 220 and 400 Hz"
+
+
+def test_silence_is_unvoiced():
+    """Digital silence has no voiced frames and an empty summary"""
+    stats = pitch_summary(pitch_contour(np.zeros(SR, dtype=np.float32), SR))
+    if stats["voiced_ratio"] != 0.0 or stats["mean"] != 0.0 or stats["frames"] == 0:
+        return False, f"summary {stats}"
+    return True, f"{stats['frames']} frames, none voiced"
+
+
+def test_short_clips():
+    """Clips shorter than a frame or the lag range still give a contour"""
+    for length in (51, 300, 1023):
+        contour = pitch_contour(voiced_tone(200.0)[:length], SR)
+        if len(contour["f0"]) != 1 or not contour["pitch"] > 0:
+            return False, f"{length} samples: {len(contour['f0'])} frames, pitch {contour['pitch']}"
+    return True, "51, 300 and 1023 samples give one frame each"
+
+
+def test_index_centroid_matches_full_fft():
+    """rfft-based index centroid equals the full complex FFT one (odd and even lengths)"""
+    rng = np.random.default_rng(1)
+    clips = [voiced_tone(180.0)[:length] for length in (16000, 15999, 4097)]
+    clips += [(0.001 * rng.standard_normal(2000)).astype(np.float32), np.zeros(512, dtype=np.float32)]
+    for y in clips:
+        new, old = index_spectral_centroid(y, SR), old_spectral_centroid(y, SR)
+        if not np.isclose(new, old, rtol=1e-9, atol=0.0):
+            return False, f"{len(y)} samples: old {old}, new {new}"
+    return True, f"{len(clips)} clips agree"
+
+
+def main():
+    print("🧪 Pitch Engine Test")
+    print("=" * 50)
+
+    tests = [
+        ("Clip pitch vs np.correlate", test_clip_pitch_matches_full_correlation),
+        ("Frame contour", test_frame_contour_tracks_f0),
+        ("Silence", test_silence_is_unvoiced),
+        ("Short clips", test_short_clips),
+        ("Index centroid vs full FFT", test_index_centroid_matches_full_fft)
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            success, message = test_func()
+            status = "✅ PASS" if success else "❌ FAIL"
+            print(f"{status} {test_name}: {message}")
+            results.append(success)
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: Exception - {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    passed = sum(results)
+    total = len(results)
+
+    if passed == total:
+        print(f"🎉 ALL TESTS PASSED ({passed}/{total})")
+    else:
+        print(f"⚠️  SOME TESTS FAILED ({passed}/{total})")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
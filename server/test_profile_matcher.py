@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Emotion-profile matcher regression checks (server/python/profile_matcher.py)
+The vectorized matcher replaced a per-emotion Python loop; for any
+characteristics it must pick the same emotion, confidence and top-3 list,
+ties included.
+Run with: python server/test_profile_matcher.py
+(needs numpy)
+"""
+
+import os
+import sys
+import logging
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+
+KEYS = ("energy_level", "stress_level", "pitch_variability", "tempo_indicator")
+
+
+def old_detect(emotion_characteristics, characteristics):
+    """The loop detect_emotion_dynamically ran before the matcher"""
+    best_emotion = "neutral"
+    best_score = 0.0
+    emotion_scores = {}
+    for emotion, emotion_profile in emotion_characteristics.items():
+        score = 0.0
+        weight_sum = 0.0
+        for profile_key, key, weight in (("energy", "energy_level", 0.3), ("stress", "stress_level", 0.3),
+                                         ("pitch_var", "pitch_variability", 0.2), ("tempo", "tempo_indicator", 0.2)):
+            score += max(0.0, 1.0 - abs(characteristics[key] - emotion_profile[profile_key])) * weight
+            weight_sum += weight
+        final_score = score / weight_sum if weight_sum > 0 else 0.0
+        emotion_scores[emotion] = final_score
+        if final_score > best_score:
+            best_score = final_score
+            best_emotion = emotion
+    confidence = max(0.1, min(0.95, best_score))
+    return best_emotion, float(confidence), sorted(emotion_scores.items(), key=lambda x: x[1], reverse=True)[:3]
+
+
+def make_detector():
+    from iemocap_emotion_detector import EnhancedEmotionDetector
+    return EnhancedEmotionDetector()
+
+
+def compare(detector, characteristics_list):
+    new = detector.detect_emotions_batch(characteristics_list)
+    return [index for index, (characteristics, detection) in enumerate(zip(characteristics_list, new))
+            if old_detect(detector.emotion_characteristics, characteristics) != detection]
+
+
+def test_random_characteristics():
+    """Continuous characteristics in [0, 1]"""
+    rng = np.random.default_rng(1)
+    cases = [dict(zip(KEYS, map(float, row))) for row in rng.random((3000, 4))]
+    mismatches = compare(make_detector(), cases)
+    if mismatches:
+        return False, f"{len(mismatches)} of {len(cases)} differ, first {cases[mismatches[0]]}"
+    return True, f"{len(cases)} identical"
+
+
+def test_ties():
+    """Characteristics on a 0.1 grid, where profiles often score exactly the same"""
+    grid = np.round(np.arange(0.0, 1.01, 0.1), 1)
+    cases = [dict(zip(KEYS, map(float, (energy, stress, pitch, tempo))))
+             for energy in grid for stress in grid for pitch in grid[::2] for tempo in grid[::2]]
+    detector = make_detector()
+    tied = sum(1 for top in detector.profile_matcher.top_k(
+        detector.profile_matcher.score(detector.profile_matcher.characteristics_matrix(cases)), 2)
+        if top[0][1] == top[1][1])
+    mismatches = compare(detector, cases)
+    if mismatches:
+        return False, f"{len(mismatches)} of {len(cases)} differ, first {cases[mismatches[0]]}"
+    return True, f"{len(cases)} identical, {tied} with a tie for first"
+
+
+def test_out_of_range():
+    """Values outside [0, 1], where every score can clip to 0 and neutral wins"""
+    rng = np.random.default_rng(2)
+    cases = [dict(zip(KEYS, map(float, row))) for row in rng.uniform(-3.0, 3.0, (500, 4))]
+    cases.append(dict.fromkeys(KEYS, 5.0))
+    mismatches = compare(make_detector(), cases)
+    if mismatches:
+        return False, f"{len(mismatches)} of {len(cases)} differ, first {cases[mismatches[0]]}"
+    return True, f"{len(cases)} identical"
+
+
+def test_single_matches_batch():
+    """detect_emotion_dynamically is the batch path with one row"""
+    detector = make_detector()
+    rng = np.random.default_rng(3)
+    cases = [dict(zip(KEYS, map(float, row))) for row in rng.random((50, 4))]
+    batch = [(emotion, confidence) for emotion, confidence, _ in detector.detect_emotions_batch(cases)]
+    logging.disable(logging.INFO)  # one log pair per detection
+    try:
+        single = [detector.detect_emotion_dynamically(characteristics) for characteristics in cases]
+    finally:
+        logging.disable(logging.NOTSET)
+    if batch != single:
+        return False, "single and batch detections differ"
+    return True, f"{len(cases)} identical"
+
+
+def main():
+    print("🧪 Profile Matcher Test")
+    print("=" * 50)
+
+    tests = [
+        ("Random characteristics", test_random_characteristics),
+        ("Exact ties", test_ties),
+        ("Out of range", test_out_of_range),
+        ("Single vs batch", test_single_matches_batch)
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            success, message = test_func()
+            status = "✅ PASS" if success else "❌ FAIL"
+            print(f"{status} {test_name}: {message}")
+            results.append(success)
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: Exception - {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    passed = sum(results)
+    total = len(results)
+
+    if passed == total:
+        print(f"🎉 ALL TESTS PASSED ({passed}/{total})")
+    else:
+        print(f"⚠️  SOME TESTS FAILED ({passed}/{total})")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+LRU result cache regression checks (server/python/result_cache.py)
+Entry and byte limits evict least recently used first, TTL expiry counts as a
+miss, and callers get copies they can mutate.
+Run with: python server/test_result_cache.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+
+from result_cache import LRUResultCache, text_cache_key
+
+
+def test_entry_limit_evicts_least_recent():
+    """Reading an entry protects it; the untouched one is evicted"""
+    cache = LRUResultCache(max_entries=2)
+    cache.put("a", {"emotion": "joy"})
+    cache.put("b", {"emotion": "anger"})
+    cache.get("a")
+    cache.put("c", {"emotion": "fear"})
+
+    present = [key for key in "abc" if cache.get(key) is not None]
+    if present != ["a", "c"] or cache.stats()["evictions"] != 1:
+        return False, f"kept {present}, stats {cache.stats()}"
+    return True, "b evicted, a and c kept"
+
+
+def test_byte_limit():
+    """bytes_used never passes max_bytes, and an oversized value is not stored"""
+    cache = LRUResultCache(max_entries=1000, max_bytes=1000)
+    for index in range(20):
+        cache.put(f"key{index}", {"text": "x" * 100})
+    stats = cache.stats()
+    if stats["bytes_used"] > 1000 or stats["entries"] >= 20 or cache.get("key19") is None:
+        return False, f"stats {stats}"
+
+    cache.put("huge", {"text": "x" * 5000})
+    if cache.get("huge") is not None:
+        return False, "value larger than max_bytes was stored"
+    return True, f"{stats['entries']} entries in {stats['bytes_used']} bytes"
+
+
+def test_replacing_a_key_keeps_byte_count():
+    """Putting the same key again replaces its size, not adds to it"""
+    cache = LRUResultCache()
+    cache.put("a", {"emotion": "joy"})
+    used = cache.stats()["bytes_used"]
+    cache.put("a", {"emotion": "joy"})
+    if cache.stats()["bytes_used"] != used or cache.stats()["entries"] != 1:
+        return False, f"stats {cache.stats()}"
+    return True, f"{used} bytes after two puts"
+
+
+def test_ttl_expiry():
+    """Entries older than ttl_seconds are misses and are dropped"""
+    cache = LRUResultCache(ttl_seconds=0.05)
+    cache.put("a", {"emotion": "joy"})
+    if cache.get("a") is None:
+        return False, "fresh entry missed"
+    time.sleep(0.1)
+    if cache.get("a") is not None:
+        return False, "expired entry returned"
+
+    stats = cache.stats()
+    if stats["expirations"] != 1 or stats["entries"] != 0 or stats["bytes_used"] != 0:
+        return False, f"stats {stats}"
+    return True, "expired after TTL, bytes released"
+
+
+def test_values_are_copies():
+    """Mutating a returned value does not change the cached one"""
+    cache = LRUResultCache()
+    value = {"emotion": "joy", "all_scores": {"joy": 0.9}}
+    cache.put("a", value)
+    value["emotion"] = "changed"
+    first = cache.get("a")
+    first["all_scores"]["joy"] = 0.0
+
+    second = cache.get("a")
+    if second != {"emotion": "joy", "all_scores": {"joy": 0.9}}:
+        return False, f"cached value changed to {second}"
+    return True, "stored and returned values are independent"
+
+
+def test_text_cache_key():
+    """Keys follow the model input: case and language matter, outer whitespace does not"""
+    if text_cache_key("  I'm fine ") != text_cache_key("I'm fine"):
+        return False, "surrounding whitespace changed the key"
+    if text_cache_key("I'm fine") == text_cache_key("i'm fine"):
+        return False, "case was folded"
+    if text_cache_key("I'm fine", "en") == text_cache_key("I'm fine", "ur"):
+        return False, "language ignored"
+    if text_cache_key("a" * 600) != text_cache_key("a" * 512):
+        return False, "text past max_chars changed the key"
+    return True, "keys match the model input"
+
+
+def main():
+    print("🧪 Result Cache Test")
+    print("=" * 50)
+
+    tests = [
+        ("Entry limit", test_entry_limit_evicts_least_recent),
+        ("Byte limit", test_byte_limit),
+        ("Replaced key", test_replacing_a_key_keeps_byte_count),
+        ("TTL", test_ttl_expiry),
+        ("Copies", test_values_are_copies),
+        ("Text keys", test_text_cache_key)
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            success, message = test_func()
+            status = "✅ PASS" if success else "❌ FAIL"
+            print(f"{status} {test_name}: {message}")
+            results.append(success)
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: Exception - {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    passed = sum(results)
+    total = len(results)
+
+    if passed == total:
+        print(f"🎉 ALL TESTS PASSED ({passed}/{total})")
+    else:
+        print(f"⚠️  SOME TESTS FAILED ({passed}/{total})")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Shared-spectrogram engine regression checks (server/python/spectral_features.py)
+Every feature the engine derives from its one STFT / log-mel must equal what
+the corresponding librosa y= call computes on the installed librosa.
+Run with: python server/test_spectral_features.py
+(needs numpy and librosa)
+"""
+
+import os
+import sys
+import inspect
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+
+from spectral_features import SpectralFeatureEngine, feature_pad_mode
+
+SR = 16000
+
+
+def speech_like(seconds=2.0, seed=0):
+    """A gliding voiced tone with syllable-rate loudness changes and some noise"""
+    t = np.arange(int(SR * seconds)) / SR
+    f0 = 160.0 + 40.0 * np.sin(2 * np.pi * 0.7 * t)
+    y = 0.3 * np.sin(2 * np.pi * np.cumsum(f0) / SR) * (0.6 + 0.4 * np.sin(2 * np.pi * 4.0 * t))
+    return (y + 0.01 * np.random.default_rng(seed).standard_normal(len(t))).astype(np.float32)
+
+
+def test_pad_mode_follows_librosa():
+    """The shared STFT pads the way librosa's own feature STFT does"""
+    import librosa
+    default = inspect.signature(librosa.feature.spectral_centroid).parameters["pad_mode"].default
+    if feature_pad_mode() != default:
+        return False, f"engine pads with {feature_pad_mode()!r}, librosa {librosa.__version__} with {default!r}"
+    return True, f"librosa {librosa.__version__}: {default!r}"
+
+
+def test_features_match_librosa():
+    """S= features from the shared spectrogram equal the y= calls"""
+    import librosa
+    y = speech_like()
+    engine = SpectralFeatureEngine(y, SR)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        expected = {
+            "spectral_centroid": (engine.spectral_centroid(), librosa.feature.spectral_centroid(y=y, sr=SR)),
+            "spectral_bandwidth": (engine.spectral_bandwidth(), librosa.feature.spectral_bandwidth(y=y, sr=SR)),
+            "spectral_rolloff": (engine.spectral_rolloff(), librosa.feature.spectral_rolloff(y=y, sr=SR)),
+            "spectral_contrast": (engine.spectral_contrast(), librosa.feature.spectral_contrast(y=y, sr=SR)),
+            "chroma": (engine.chroma(), librosa.feature.chroma_stft(y=y, sr=SR)),
+            "mfcc": (engine.mfcc(), librosa.feature.mfcc(y=y, sr=SR, n_mfcc=13)),
+            "tempo": (engine.tempo(), librosa.beat.tempo(y=y, sr=SR)),
+        }
+
+    different = [name for name, (shared, direct) in expected.items()
+                 if np.shape(shared) != np.shape(direct) or not np.allclose(shared, direct, rtol=1e-5, atol=1e-6)]
+    if different:
+        return False, f"differ from librosa: {different}"
+    return True, f"{len(expected)} features match"
+
+
+def main():
+    print("🧪 Spectral Feature Engine Test")
+    print("=" * 50)
+
+    tests = [
+        ("STFT padding", test_pad_mode_follows_librosa),
+        ("Features vs librosa", test_features_match_librosa)
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            success, message = test_func()
+            status = "✅ PASS" if success else "❌ FAIL"
+            print(f"{status} {test_name}: {message}")
+            results.append(success)
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: Exception - {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    passed = sum(results)
+    total = len(results)
+
+    if passed == total:
+        print(f"🎉 ALL TESTS PASSED ({passed}/{total})")
+    else:
+        print(f"⚠️  SOME TESTS FAILED ({passed}/{total})")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)